@@ -1,36 +1,315 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import json
 import argparse
-import tempfile
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any
-import io
+from typing import Optional, Dict, Any, List, Union
 
-from transit_map_generator.transit_map import transit_map, Solver
-from transit_map_generator.svg_transit_map import graph_to_svg
-from transit_map_generator.virtual_dom_stringify import svg_to_string
+from transit_map_generator.transit_map import transit_map, transit_map_anytime, Solver, print_pair_report
+from transit_map_generator.backends import BACKENDS
+from transit_map_generator.batch import batch_jobs, run_batch, stream_output, write_output
+from transit_map_generator.benchmark import (
+    DEFAULT_SYNTHETIC, benchmark_cases, benchmark_results, compare_results, default_inputs, print_record, run_benchmark
+)
+from transit_map_generator.cache import SolutionCache
+from transit_map_generator.parallel import resolve_jobs
+from transit_map_generator.portfolio import PROFILES
+from transit_map_generator.presolve import presolve, presolve_report
+from transit_map_generator.stats import Stats, measure
+from transit_map_generator.writers import model_format, write_lp, write_model
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description='Generate a metro network layout via MILP')
+def add_layout_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments shared by single and batch runs."""
     parser.add_argument('--tmp-dir', '-t', 
-                       help='Directory to store intermediate files. Default: unique tmp dir.')
-    parser.add_argument('--output-file', '-o',
-                       help='File to store result (instead of stdout).')
+                       help='Keep the problem and solution files of the scip backend in this directory, for debugging. '
+                            'Default: pipe the problem to scip and its solution back, without writing files.')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable solver logging to stderr.')
     parser.add_argument('--graph', '-g', action='store_true',
                        help='Return JSON graph instead of SVG map.')
     parser.add_argument('--invert-y', '-y', action='store_true',
                        help='Invert the Y axis in SVG result.')
+    parser.add_argument('--occlusion-radius', type=float,
+                       help='Only separate edges at most this many median edge lengths apart, '
+                            'which may leave distant edges overlapping in the layout. Default: all pairs.')
+    parser.add_argument('--offset', type=float,
+                       help='Solver coordinate of the first node. Default: derived from the network.')
+    parser.add_argument('--max-width', type=float,
+                       help='Range of the solver x coordinates around the offset. Default: derived from the network.')
+    parser.add_argument('--max-height', type=float,
+                       help='Range of the solver y coordinates around the offset. Default: derived from the network.')
+    parser.add_argument('--big-m', type=float,
+                       help='Constant big-M of the product and direction constraints. Default: the tightest valid one per constraint.')
+    parser.add_argument('--no-coordinate-windows', action='store_true',
+                       help='Bound all node coordinates by the whole coordinate range only, instead of per node windows '
+                            'derived from the input geometry.')
+    parser.add_argument('--backend', '-b', choices=list(BACKENDS), default='scip',
+                       help='Solver backend: scip binary in PATH, or in-process via pyscipopt or highspy. Default: scip.')
+    parser.add_argument('--engine', '-e', choices=['milp', 'heuristic'], default='milp',
+                       help='Layout engine: exact MILP solve, or a fast octilinear preview without solver (needs numpy). '
+                            'Default: milp.')
+    parser.add_argument('--lazy-occlusion', action='store_true',
+                       help='Add occlusion constraints lazily, only for edges that conflict in a previous solution.')
+    parser.add_argument('--cache-dir',
+                       help='Reuse layouts of equal networks and settings from this cache directory.')
+    parser.add_argument('--cache-size', type=float, default=256,
+                       help='Size limit of the cache in MB, least recently used layouts are evicted. Default: 256.')
+    parser.add_argument('--contract-chains', action='store_true',
+                       help='Contract chains of degree-2 stations with the same lines into weighted edges before solving, '
+                            'and place their stations evenly along the solved edges.')
+    parser.add_argument('--decompose', action='store_true',
+                       help='Solve the connected components of the network separately, in up to --jobs processes, '
+                            'and stitch their layouts with separated bounding boxes.')
+    parser.add_argument('--presolve', action='store_true',
+                       help='Reduce the model before solving: substitute fixed variables, drop the constraints they '
+                            'make redundant and merge duplicate constraints.')
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                       help='Stop the solver after this wall-clock time and use the best layout found so far.')
+    parser.add_argument('--gap', type=float,
+                       help='Stop the solver once the relative gap to the optimum is below this value, e.g. 0.05.')
+    parser.add_argument('--node-limit', type=int,
+                       help='Stop the solver after this many branch-and-bound nodes.')
+    parser.add_argument('--portfolio', metavar='N|PROFILE,...',
+                       help=f"Race several scip runs on each problem, with the named profiles ({', '.join(PROFILES)}) "
+                            'or the N best ones by --portfolio-stats; the first proven optimum or the best solution wins.')
+    parser.add_argument('--portfolio-stats', metavar='FILE',
+                       help='JSON file recording the races and wins of each portfolio profile.')
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Generate a metro network layout via MILP',
+        epilog='Run "%(prog)s batch --help" to lay out many networks at once, '
+               '"%(prog)s benchmark --help" to measure the performance of the pipeline.'
+    )
+    add_layout_arguments(parser)
+    parser.add_argument('--output-file', '-o',
+                       help='File to store result (instead of stdout).')
     parser.add_argument('--debug', '-d', action='store_true',
-                       help='Output the generated LP and stop.')
+                       help='Output the generated LP and stop. With --output-file, the format follows its '
+                            'extension (.lp, .mps, optionally gzipped as .lp.gz/.mps.gz).')
+    parser.add_argument('--short-names', action='store_true',
+                       help='Use short numeric variable ids in the --debug output.')
+    parser.add_argument('--warm-start', '-w', metavar='input|heuristic|FILE',
+                       help='Start the solver from the closest directions of the input geometry ("input"), '
+                            'from the layout of the heuristic engine ("heuristic") '
+                            'or from a previously solved layout of the same network (JSON graph file).')
+    parser.add_argument('--cache-stats', action='store_true',
+                       help='Log the hit and miss counters of the cache to stderr.')
+    parser.add_argument('--stats', choices=['json', 'text'],
+                       help='Log the wall/CPU time and peak memory of each stage and the model sizes to stderr.')
+    parser.add_argument('--previous', metavar='FILE',
+                       help='Incremental re-layout: previously solved layout (JSON graph, see --graph) of the network before the edit. '
+                            'Only the neighborhood of the changed nodes is re-optimized.')
+    parser.add_argument('--previous-input', metavar='FILE',
+                       help='Input network of the --previous layout, to also detect moved nodes.')
+    parser.add_argument('--hops', type=int, default=2,
+                       help='Re-optimize nodes at most this many edges away from the changed ones. Default: 2.')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Generate the constraints in this many worker processes (0: one per CPU). Default: 1.')
+    parser.add_argument('--solver-threads', type=int,
+                       help='Limit the threads of the solver. Default: solver default.')
+    parser.add_argument('--anytime', action='store_true',
+                       help='Output each improved layout as the solver finds it: replace the --output-file, '
+                            'or print one JSON graph per line with --graph.')
     parser.add_argument('--version', '-V', action='version',
                        version='%(prog)s 1.0.0')
     return parser.parse_args()
 
+def parse_batch_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='transit-map batch',
+        description='Lay out many metro networks concurrently'
+    )
+    parser.add_argument('source',
+                       help='Directory of JSON networks, or JSON-lines manifest with one {"input", "name", "options"} '
+                            'object per job (input paths relative to the manifest).')
+    parser.add_argument('--output-dir', '-O', required=True,
+                       help='Directory to store the results, <name>.svg (or .json with --graph) per job.')
+    parser.add_argument('--svgz', action='store_true',
+                       help='Write gzip-compressed <name>.svgz maps.')
+    parser.add_argument('--summary',
+                       help='JSON-lines file with a status and timing record per job. Default: <output-dir>/summary.jsonl.')
+    parser.add_argument('--workers', '-p', type=int, default=0,
+                       help='Number of jobs processed at the same time (0: one per CPU). Default: 0.')
+    parser.add_argument('--solver-slots', type=int,
+                       help='Maximum number of solvers running at the same time, while other workers prepare '
+                            'their problems. Default: one per worker.')
+    parser.add_argument('--solver-threads', type=int, default=1,
+                       help='Limit the threads of each solver (0: solver default). Default: 1.')
+    add_layout_arguments(parser)
+    return parser.parse_args(argv)
+
+def parse_benchmark_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='transit-map benchmark',
+        description='Measure the time, memory and model size of each pipeline stage'
+    )
+    parser.add_argument('inputs', nargs='*',
+                       help='JSON graph or GeoJSON networks. Default: the bundled examples and Hamburg networks.')
+    parser.add_argument('--synthetic', action='append', metavar='KIND:LINESxSTATIONS',
+                       help='Synthetic grid or radial network, e.g. grid:4x10 or radial:6x15 (repeatable). '
+                            f"Default: {' '.join(DEFAULT_SYNTHETIC)}.")
+    parser.add_argument('--output', '-o',
+                       help='JSON file to store the results. Default: stdout.')
+    parser.add_argument('--compare', metavar='BASELINE',
+                       help='Flag regressions against the results of a previous run and fail if there are any.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                       help='Relative growth of stage time or peak memory that counts as regression. Default: 0.2.')
+    parser.add_argument('--repeat', '-r', type=int, default=1,
+                       help='Run each case this many times and keep the best measurements. Default: 1.')
+    parser.add_argument('--skip-solve', action='store_true',
+                       help='Skip solving, revise and render the input geometry instead.')
+    parser.add_argument('--backend', '-b', choices=list(BACKENDS), default='scip',
+                       help='Solver backend. Default: scip.')
+    parser.add_argument('--time-limit', type=float, default=60,
+                       help='Solver time limit in seconds per case. Default: 60.')
+    parser.add_argument('--check-presolve', action='store_true',
+                       help='Also solve the presolved model of each case and check that its postsolved solution '
+                            'satisfies the full model. Fails if any case fails.')
+    return parser.parse_args(argv)
+
+def benchmark_main(argv: List[str]) -> None:
+    args = parse_benchmark_args(argv)
+    inputs = args.inputs
+    synthetic = args.synthetic
+    if not inputs and synthetic is None:
+        inputs = default_inputs(os.path.dirname(os.path.abspath(__file__)))
+    cases = benchmark_cases(inputs, synthetic if synthetic is not None else DEFAULT_SYNTHETIC)
+    options = {'solve': not args.skip_solve, 'backend': args.backend, 'time_limit': args.time_limit,
+               'check_presolve': args.check_presolve}
+
+    records = []
+    for record in run_benchmark(cases, options, args.repeat):
+        print_record(record)
+        records.append(record)
+    results = benchmark_results(records, options)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+    failed = [record['name'] for record in records if 'error' in record]
+    if args.check_presolve and failed:
+        print(f"Benchmark: presolve check failed for {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.compare:
+        try:
+            baseline = json.loads(Path(args.compare).read_text())
+            regressions = compare_results(baseline, results, args.threshold)
+        except (OSError, ValueError) as e:
+            print(f"Error comparing with {args.compare}: {e}", file=sys.stderr)
+            sys.exit(1)
+        for regression in regressions:
+            print(
+                f"Regression: {regression['case']} {regression['metric']}: {regression['baseline']} -> {regression['value']}",
+                file=sys.stderr
+            )
+        print(f"Benchmark: {len(regressions)} regressions against {args.compare}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+def portfolio_profiles(value: Optional[str]) -> Union[int, List[str], None]:
+    """Profile names or number of profiles of the --portfolio argument."""
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    return value.split(',')
+
+def layout_config(args: argparse.Namespace) -> Dict[str, Any]:
+    """Options of `transit_map` from the shared arguments."""
+    settings = {}
+    if args.occlusion_radius is not None:
+        settings['occlusion_radius'] = args.occlusion_radius
+    for key in ('offset', 'max_width', 'max_height', 'big_m'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    if args.no_coordinate_windows:
+        settings['coordinate_windows'] = False
+
+    return {
+        'work_dir': args.tmp_dir,
+        'verbose': args.verbose,
+        'settings': settings,
+        'lazy_occlusion': args.lazy_occlusion,
+        'backend': args.backend,
+        'engine': args.engine,
+        'presolve': args.presolve,
+        'cache_dir': args.cache_dir,
+        'cache_size': int(args.cache_size * 2**20),
+        'contract_chains': args.contract_chains,
+        'decompose': args.decompose,
+        'solver_threads': args.solver_threads or None,
+        'time_limit': args.time_limit,
+        'gap_limit': args.gap,
+        'node_limit': args.node_limit,
+        'portfolio': portfolio_profiles(args.portfolio),
+        'portfolio_stats': args.portfolio_stats,
+    }
+
+def batch_main(argv: List[str]) -> None:
+    args = parse_batch_args(argv)
+    try:
+        jobs = batch_jobs(args.source)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.source}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    config = layout_config(args)
+    summary_path = args.summary or str(Path(args.output_dir) / 'summary.jsonl')
+    workers = resolve_jobs(args.workers)
+    started = time.perf_counter()
+    failed = 0
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w') as summary:
+        for record in run_batch(jobs, config, args.output_dir, args.graph, args.invert_y, workers, args.solver_slots,
+                                args.svgz):
+            summary.write(json.dumps(record) + '\n')
+            summary.flush()
+            failed += record['status'] != 'ok'
+            if args.verbose or record['status'] != 'ok':
+                print(f"{record['name']}: {record['status']} ({record['seconds']}s) {record.get('error', '')}", file=sys.stderr)
+
+    print(
+        f"Batch: {len(jobs) - failed} ok, {failed} failed in {time.perf_counter() - started:.1f}s, summary in {summary_path}",
+        file=sys.stderr
+    )
+    if failed:
+        sys.exit(1)
+
+def print_stats(stats: Stats, output_format: str) -> None:
+    """Log the collected stats to stderr, as JSON object or as a summary."""
+    if output_format == 'json':
+        print(json.dumps(stats.to_dict()), file=sys.stderr)
+        return
+    for stage, total in stats.totals().items():
+        solver_cpu = f", solver {total['child_cpu_seconds']:.3f}s CPU" if total['child_cpu_seconds'] else ''
+        print(
+            f"{stage}: {total['wall_seconds']:.3f}s wall, {total['cpu_seconds']:.3f}s CPU{solver_cpu}, runs: {total['runs']}",
+            file=sys.stderr
+        )
+    for model in stats.models:
+        families = ', '.join(f"{family} {count}" for family, count in model['constraints'].items())
+        lp_size = f", LP {model['lp_bytes']} bytes" if model['lp_bytes'] is not None else ''
+        presolved = (f", presolved {model['presolved_variables']} variables, {model['presolved_constraints']} constraints"
+                     if 'presolved_variables' in model else '')
+        print(f"Model: {model['num_variables']} variables, {model['num_constraints']} constraints ({families}){presolved}{lp_size}",
+              file=sys.stderr)
+    peak = stats.to_dict()
+    if peak['peak_rss_bytes'] is not None:
+        print(f"Peak RSS: {peak['peak_rss_bytes']} bytes, solver {peak['child_peak_rss_bytes']} bytes", file=sys.stderr)
+
 def main():
+    if sys.argv[1:2] == ['batch']:
+        batch_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['benchmark']:
+        benchmark_main(sys.argv[2:])
+        return
     args = parse_args()
     
     # Read from stdin
@@ -46,37 +325,88 @@ def main():
         print(f"Error reading input: {e}", file=sys.stderr)
         sys.exit(1)
 
-    config = {
-        'work_dir': args.tmp_dir,
-        'verbose': args.verbose,
-    }
+    config = layout_config(args)
+    config['jobs'] = args.jobs
+    config['warm_start'] = args.warm_start
+    config['relayout_hops'] = args.hops
+    config['stats'] = Stats() if args.stats else None
+    for option, path in [('warm_start', args.warm_start if args.warm_start not in ('input', 'heuristic') else None),
+                         ('previous', args.previous), ('previous_input', args.previous_input)]:
+        if path:
+            try:
+                config[option] = json.loads(Path(path).read_text())
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading {path}: {e}", file=sys.stderr)
+                sys.exit(1)
 
     if args.debug:
-        # Generate and output LP only
-        solver = Solver(graph)
-        output = io.StringIO()
-        solver.generate_lp(output)
-        lp = output.getvalue()
-        if args.output_file:
-            Path(args.output_file).write_text(lp)
+        # Generate and stream the model to the output file or stdout
+        solver = Solver(graph, config['settings'], jobs=args.jobs)
+        if args.presolve:
+            # Output the presolved model
+            model, rows, report = solver.stream_problem(None, solver.jobs)
+            presolved = presolve(model, rows)
+            if args.verbose:
+                print(presolve_report(presolved), file=sys.stderr)
+            if args.output_file:
+                write_model(presolved.model, args.output_file, args.short_names)
+            else:
+                write_lp(presolved.model, sys.stdout, args.short_names)
+        elif solver.jobs > 1 and (not args.output_file or model_format(args.output_file) == 'lp'):
+            # Let the workers format the LP lines as well
+            model, blocks, report = solver.stream_problem(None, solver.jobs, args.short_names)
+            if args.output_file:
+                write_model(model, args.output_file, args.short_names, blocks=blocks)
+            else:
+                write_lp(model, sys.stdout, args.short_names, blocks=blocks)
         else:
-            print(lp)
+            model, rows, report = solver.stream_problem(None, solver.jobs)
+            if args.output_file:
+                write_model(model, args.output_file, args.short_names, rows)
+            else:
+                write_lp(model, sys.stdout, args.short_names, rows)
+        if args.verbose:
+            print_pair_report(report)
+        sys.exit(0)
+
+    if args.anytime:
+        if not args.output_file and not args.graph:
+            print("--anytime needs --output-file or --graph", file=sys.stderr)
+            sys.exit(1)
+        for solution in transit_map_anytime(graph, config):
+            with measure(config['stats'], 'render'):
+                if args.output_file:
+                    # Replace the output atomically, readers always see a complete layout
+                    tmp_path = f"{args.output_file}.tmp"
+                    write_output(solution, tmp_path, args.graph, args.invert_y,
+                                 compress=args.output_file.endswith(('.svgz', '.gz')))
+                    os.replace(tmp_path, args.output_file)
+                else:
+                    stream_output(solution, sys.stdout, args.graph, args.invert_y)
+                    print(flush=True)
+        if config['stats'] is not None:
+            print_stats(config['stats'], args.stats)
         sys.exit(0)
 
     # Generate solution
     solution = transit_map(graph, config)
+    if args.cache_stats and args.cache_dir:
+        stats = SolutionCache(args.cache_dir, config['cache_size']).stats()
+        print(
+            f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['entries']} entries ({stats['bytes']} bytes)",
+            file=sys.stderr
+        )
 
-    # Generate output
-    if args.graph:
-        result = json.dumps(graph)
-    else:
-        result = graph_to_svg(solution, args.invert_y)
-
-    # Output result
-    if args.output_file:
-        Path(args.output_file).write_text(result)
-    else:
-        print(result)
+    # Stream the result to the output file (gzip-compressed for .svgz) or stdout
+    with measure(config['stats'], 'render'):
+        if args.output_file:
+            write_output(solution, args.output_file, args.graph, args.invert_y)
+        else:
+            stream_output(solution, sys.stdout, args.graph, args.invert_y)
+            print(flush=True)
+    if config['stats'] is not None:
+        print_stats(config['stats'], args.stats)
 
 if __name__ == '__main__':
     main() 
@@ -10,6 +10,11 @@ setup(
         'svgwrite>=1.4.0',
         'json5>=0.9.0'
     ],
+    extras_require={
+        'pyscipopt': ['pyscipopt>=4.0.0'],
+        'highs': ['highspy>=1.5.0'],
+        'numpy': ['numpy>=1.20'],
+    },
     entry_points={
         'console_scripts': [
             'transit-map=cli:main',
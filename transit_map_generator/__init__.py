@@ -1,8 +1,9 @@
 from .transit_map import transit_map
 from .generate_lp import create_generate_lp
-from .prepare_graph import prepare_graph
+from .prepare_graph import prepare_graph, prepare_network
+from .network import Network, compile_network
 from .util import node_index, edge_index
 
 __version__ = '1.0.0'
 
-__all__ = ['transit_map', 'create_generate_lp', 'prepare_graph', 'node_index', 'edge_index'] 
+__all__ = ['transit_map', 'create_generate_lp', 'prepare_graph', 'prepare_network', 'Network', 'compile_network', 'node_index', 'edge_index'] 
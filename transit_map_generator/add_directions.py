@@ -1,48 +1,31 @@
-from typing import Dict, Any, List
-import math
-import json
-import copy
+from typing import Dict, Any
 
-def mod8(n: int) -> int:
-    """Fix mod 8 for negative numbers close to 0."""
-    return (n + 16) % 8
-
-def ang(vector: Dict[str, float]) -> float:
-    """Calculate angle. 9 o'clock = 0/8, 6 o'clock = 2, 3 o'clock = 4, 12 o'clock = 6."""
-    return 4 * ((math.atan2(vector['y'], vector['x']) / math.pi) + 1)
-
-def closest_number(target: float, numbers: List[int]) -> int:
-    """Find the closest number to target from a list of numbers."""
-    return min(numbers, key=lambda x: abs(x - target))
-
-def closest_direction_ids(angle: float) -> List[int]:
-    """Find closest direction ids (0-7, see `ang`) for a given angle."""
-    closest_directions = []
-    all_directions = list(range(-1, 10))  # -1, 0, 1, ..., 9
-
-    for _ in range(3):  # find the 3 closest directions
-        closest_direction = closest_number(angle, all_directions)
-        closest_directions.append(mod8(closest_direction))
-        all_directions.remove(closest_direction)
-
-    return closest_directions
+from .geometry import direction_ids, mod8
 
 def add_directions(graph: Dict[str, Any]) -> Dict[str, Any]:
-    """Add directions to the graph edges."""
-    # Create a deep copy of the graph to avoid modifying the input
-    graph = copy.deepcopy(graph)
-
+    """Add directions to the graph edges.
+
+    The input graph is left untouched: the result is a new graph dict with new
+    edge dicts, sharing the nodes and all other values with the input.
+    """
+    # Index node metadata by id (first occurrence wins, as in a linear scan)
+    metadata = {}
+    for node in graph['nodes']:
+        metadata.setdefault(node['id'], node['metadata'])
+
+    # Calculate all edge vectors and their closest directions at once
+    dxs, dys = [], []
     for edge in graph['edges']:
-        # Find source and target nodes
-        source = next(n['metadata'] for n in graph['nodes'] if n['id'] == edge['source'])
-        target = next(n['metadata'] for n in graph['nodes'] if n['id'] == edge['target'])
-
-        # Calculate vector and angle
-        vector = {'x': target['x'] - source['x'], 'y': target['y'] - source['y']}
-        angle = ang(vector)
-
-        # Set source and target directions
-        edge['sourceDirections'] = closest_direction_ids(angle)
-        edge['targetDirections'] = [mod8(d + 4) for d in edge['sourceDirections']]
+        source = metadata[edge['source']]
+        target = metadata[edge['target']]
+        dxs.append(target['x'] - source['x'])
+        dys.append(target['y'] - source['y'])
+
+    # Set source and target directions
+    directed = dict(graph)
+    directed['edges'] = [
+        {**edge, 'sourceDirections': source_directions, 'targetDirections': [mod8(d + 4) for d in source_directions]}
+        for edge, source_directions in zip(graph['edges'], direction_ids(dxs, dys))
+    ]
+    return directed
 
-    return graph 
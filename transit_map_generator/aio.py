@@ -0,0 +1,185 @@
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import asyncio
+import io
+import sys
+import tempfile
+from contextlib import nullcontext
+
+from .backends import ScipProcessBackend, ScipRun, get_backend, pipes_supported, scip_command, sol_text
+from .cache import SolutionCache, apply_layout, layout_entry, solution_key
+from .contract import expand_chains
+from .model import Model, NoSolutionError, Row, Solution
+from .parse_scip_solution import parse_scip_solution
+from .presolve import presolve
+from .separation import find_conflicts
+from .spatial import PairReport
+from .svg_transit_map import graph_to_svg
+from .transit_map import DEFAULTS, SETTINGS, Solver, heuristic_map, mip_start, print_pair_report
+from .writers import write_lp
+
+async def communicate(cmd: List[str], cwd: Optional[str] = None, input: Optional[bytes] = None,
+                      capture_stdout: bool = True) -> Tuple[int, bytes, bytes]:
+    """Run a subprocess to completion, killing it if the awaiting task is cancelled."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE if capture_stdout else None,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await process.communicate(input)
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stdout, stderr
+
+async def run_scip_async(cwd: str, verbose: bool = False, warm_start: bool = False, threads: Optional[int] = None,
+                         limits: Optional[Dict[str, float]] = None) -> None:
+    """Run SCIP like `run_scip`, without blocking the event loop. Cancelling kills SCIP."""
+    try:
+        cmd = scip_command(cwd, warm_start, threads, limits)
+        returncode, _, stderr = await communicate(cmd, cwd, capture_stdout=not verbose)
+    except FileNotFoundError:
+        raise RuntimeError("Make sure 'scip' is in your PATH")
+    if returncode != 0:
+        raise RuntimeError(f"SCIP solver failed: {stderr.decode()}")
+
+async def graph_to_svg_async(graph: Dict[str, Any], invert_y: bool = False) -> str:
+    """Render the graph as SVG map like `graph_to_svg`, in a worker thread."""
+    return await asyncio.to_thread(graph_to_svg, graph, invert_y)
+
+async def solve_piped_async(backend: ScipProcessBackend, model: Model, verbose: bool = False,
+                            rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None,
+                            start: Optional[Solution] = None) -> Solution:
+    """Pipe the problem to SCIP and wait for its solution without blocking the event loop. Cancelling kills SCIP.
+
+    The rows are generated and written by the feeder thread of the run, see `ScipRun`.
+    """
+    with tempfile.TemporaryDirectory(prefix='transit-map-') as pipe_dir:
+        run = ScipRun(pipe_dir, verbose, threads=backend.threads, limits=backend.limits,
+                      problem=lambda stream: write_lp(model, stream, short_names=True, rows=rows, blocks=blocks),
+                      start=sol_text(start))
+        try:
+            solution = await asyncio.to_thread(run.wait)
+        except asyncio.CancelledError:
+            run.kill()
+            raise
+    backend.lp_bytes = run.problem_bytes
+    return parse_scip_solution(io.StringIO(solution), model)
+
+async def solve_async(solver: Solver, work_dir: Optional[str], verbose: bool = False,
+                      occlusion_pairs: Optional[Set[Tuple[int, int]]] = None, warm_start: Any = None,
+                      semaphore: Optional[asyncio.Semaphore] = None) -> Tuple[Dict[str, Any], PairReport]:
+    """Async `solve` with the scip backend.
+
+    Without a work dir, the problem is piped to SCIP (see `solve_piped_async`),
+    else it is written in a worker thread and SCIP runs as asyncio subprocess.
+    Building the problem and the MIP start and revising the solution run in
+    worker threads as well. The `semaphore` is held while the problem is
+    written and solved.
+    """
+    backend = solver.backend
+    async with semaphore if semaphore is not None else nullcontext():
+        if solver.jobs > 1 and not solver.presolve:
+            # Let the workers format the LP lines as well
+            model, blocks, report = await asyncio.to_thread(solver.stream_problem, occlusion_pairs, solver.jobs, True)
+            rows = None
+        else:
+            model, rows, report = await asyncio.to_thread(solver.stream_problem, occlusion_pairs, solver.jobs)
+            blocks = None
+        start = await asyncio.to_thread(mip_start, solver, model, warm_start)
+        presolved = None
+        if solver.presolve:
+            presolved = await asyncio.to_thread(presolve, model, rows)
+            model, rows, start = presolved.model, None, start and presolved.reduce(start)
+        if work_dir is None and pipes_supported():
+            solution = await solve_piped_async(backend, model, verbose, rows, blocks, start)
+        else:
+            problem_dir = nullcontext(work_dir) if work_dir is not None else tempfile.TemporaryDirectory(prefix='transit-map-')
+            with problem_dir as problem_dir:
+                await asyncio.to_thread(backend.write_problem, model, problem_dir, rows, blocks, start)
+                await run_scip_async(problem_dir, verbose, start is not None, backend.threads, backend.limits)
+                solution = await asyncio.to_thread(backend.read_solution, model, problem_dir)
+        if presolved is not None:
+            solution = await asyncio.to_thread(presolved.postsolve, solution)
+    if verbose:
+        print_pair_report(report)
+    return await asyncio.to_thread(solver.revise_solution, solution), report
+
+async def solve_lazy_async(solver: Solver, work_dir: Optional[str], verbose: bool = False, warm_start: Any = None,
+                           semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """Async `solve_lazy`: add the occlusion constraints of conflicting edge pairs until the layout is clean."""
+    occlusion_pairs: Set[Tuple[int, int]] = set()
+    while True:
+        solution, _ = await solve_async(solver, work_dir, verbose, occlusion_pairs, warm_start, semaphore)
+        conflicts = await asyncio.to_thread(find_conflicts, solver.network, solution) - occlusion_pairs
+        if not conflicts:
+            return solution
+        occlusion_pairs |= conflicts
+
+async def transit_map_async(network_graph: Dict[str, Any], options: Optional[Dict[str, Any]] = None,
+                            timeout: Optional[float] = None,
+                            semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """Generate a transit map layout like `transit_map`, without blocking the event loop.
+
+    Requires the scip backend, the heuristic engine runs in a worker thread
+    instead. Cancelling the task, or exceeding `timeout`
+    seconds (raising `TimeoutError`), kills SCIP; a given `work_dir` keeps
+    the problem files, otherwise nothing is written to disk. A `semaphore` shared by several
+    calls bounds the number of problems solved at the same time.
+    Graph preparation, cache access and all other blocking work runs in
+    worker threads. Incremental re-layout, decomposition, portfolios and
+    incumbent callbacks are not supported.
+    """
+    options = {**DEFAULTS, **(options or {})}
+    if options['engine'] == 'heuristic':
+        return await asyncio.wait_for(asyncio.to_thread(heuristic_map, network_graph, options), timeout)
+    if options['previous'] is not None or options['decompose']:
+        raise ValueError("Incremental re-layout and decomposition are not supported by transit_map_async")
+    if options['portfolio'] or options['on_incumbent'] is not None:
+        raise ValueError("Portfolios and incumbent callbacks are not supported by transit_map_async")
+    backend = get_backend(
+        options['backend'], options['solver_threads'],
+        limits={'time': options['time_limit'], 'gap': options['gap_limit'], 'nodes': options['node_limit']}
+    )
+    if not isinstance(backend, ScipProcessBackend):
+        raise ValueError("transit_map_async requires the 'scip' backend")
+
+    solver = await asyncio.to_thread(Solver, network_graph, options['settings'], backend, options['jobs'],
+                                     contract=options['contract_chains'], presolve=options['presolve'])
+
+    # Return a cached layout of the same network and settings, as given: the
+    # settings derived from the network depend on its node order
+    cache = SolutionCache(options['cache_dir'], options['cache_size']) if options['cache_dir'] else None
+    if cache is not None:
+        key = solution_key(solver.graph, {**SETTINGS, **(options['settings'] or {})}, options)
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry is not None:
+            return expand_chains(apply_layout(solver.graph, entry))
+
+    async def solve_with(solver: Solver) -> Dict[str, Any]:
+        if options['lazy_occlusion']:
+            return await solve_lazy_async(solver, work_dir, options['verbose'], options['warm_start'], semaphore)
+        return (await solve_async(solver, work_dir, options['verbose'], warm_start=options['warm_start'],
+                                  semaphore=semaphore))[0]
+
+    async def solve_network() -> Dict[str, Any]:
+        try:
+            return await solve_with(solver)
+        except NoSolutionError:
+            # Straightened chains can make the occlusion constraints infeasible
+            if 'contracted' not in solver.graph:
+                raise
+            if options['verbose']:
+                print("Contracted network is infeasible, solving the full network", file=sys.stderr)
+            return await solve_with(await asyncio.to_thread(Solver, network_graph, options['settings'], backend,
+                                                            solver.jobs, presolve=solver.presolve))
+
+    work_dir = options['work_dir']
+    solution = expand_chains(await asyncio.wait_for(solve_network(), timeout))
+
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, layout_entry(solution))
+    return solution
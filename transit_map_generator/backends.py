@@ -0,0 +1,643 @@
+import io
+import os
+import math
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from .model import Model, NoSolutionError, Row, Solution, SENSES, VTYPES
+from .writers import write_lp, write_sol
+from .parse_scip_solution import parse_scip_solution
+from .portfolio import Portfolio
+
+# write buffer size of streamed problem files
+LP_FILE_BUFFER = 1 << 20
+
+# time limit in seconds of the first anytime round of the scip binary, doubled each round
+ANYTIME_SLICE = 1.0
+
+# SCIP parameters of the solver limits: wall-clock seconds, relative gap and nodes
+SCIP_LIMITS = {'time': 'limits/time', 'gap': 'limits/gap', 'nodes': 'limits/nodes'}
+
+# callback receiving each improved incumbent while the solver runs
+IncumbentCallback = Callable[[Solution], None]
+
+def scip_command(cwd: str, warm_start: bool = False, threads: Optional[int] = None,
+                 limits: Optional[Dict[str, float]] = None, commands: Sequence[str] = (),
+                 solution_name: str = 'solution.sol', start_name: str = 'start.sol') -> List[str]:
+    """Command line of the SCIP solver for the problem file in `cwd`, see `run_scip`.
+
+    Additional shell `commands` (e.g. parameter settings) run before reading the problem.
+    """
+    problem_path = os.path.join(cwd, 'problem.lp')
+    solution_path = os.path.join(cwd, solution_name)
+    start_path = os.path.join(cwd, start_name)
+
+    return [
+        'scip',
+        *(['-c', f'set lp threads {threads}'] if threads else []),
+        *(arg for command in commands for arg in ['-c', command]),
+        *(arg for name, value in (limits or {}).items() for arg in ['-c', f"set {SCIP_LIMITS[name].replace('/', ' ')} {value}"]),
+        '-c', f'read {problem_path}',
+        *(['-c', f'read {start_path}'] if warm_start else []),
+        '-c', 'optimize',
+        '-c', f'write solution {solution_path}',
+        '-c', 'quit'
+    ]
+
+def run_scip(cwd: str, verbose: bool = False, warm_start: bool = False, threads: Optional[int] = None,
+             limits: Optional[Dict[str, float]] = None) -> None:
+    """Run SCIP solver on the problem file and generate solution, starting from `start.sol` if `warm_start`.
+
+    `threads` limits the threads of the LP solver, `limits` the solve by
+    time, gap and nodes (see `SCIP_LIMITS`).
+    """
+    ScipRun(cwd, verbose, warm_start, threads, limits).wait()
+
+def pipes_supported() -> bool:
+    """Whether SCIP can read and write its files through pipes (via `/dev/fd`), else temporary files are used."""
+    return os.name == 'posix' and os.path.isdir('/dev/fd')
+
+def drain(stream: TextIO) -> Callable[[], str]:
+    """Read a stream to its end in a background thread, returning a function that waits for its text."""
+    chunks: List[str] = []
+
+    def read() -> None:
+        with stream:
+            chunks.extend(iter(lambda: stream.read(LP_FILE_BUFFER), ''))
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+
+    def text() -> str:
+        thread.join()
+        return ''.join(chunks)
+
+    return text
+
+class CountingStream:
+    """Text stream passing writes through, counting the bytes written in the encoding of the stream."""
+
+    def __init__(self, output_stream: TextIO):
+        self.output_stream = output_stream
+        self.encoding = getattr(output_stream, 'encoding', None) or 'utf-8'
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.bytes += len(text.encode(self.encoding))
+        return self.output_stream.write(text)
+
+class ScipRun:
+    """A running SCIP process, see `scip_command`.
+
+    Without a `problem`, SCIP reads the problem file (and `start.sol` if
+    `warm_start`) in the work dir and writes its solution file there. With
+    `problem`, a function writing the LP to a stream, the LP is piped to the
+    stdin of SCIP, which reads it through a `problem.lp` link in the work dir;
+    the MIP `start` (SOL text) and the solution pass through pipes as well,
+    so the work dir only holds links. Both are written by a feeder thread
+    while SCIP reads them.
+    """
+
+    def __init__(self, cwd: str, verbose: bool = False, warm_start: bool = False, threads: Optional[int] = None,
+                 limits: Optional[Dict[str, float]] = None, commands: Sequence[str] = (),
+                 solution_name: str = 'solution.sol', problem: Optional[Callable[[TextIO], None]] = None,
+                 start: Optional[str] = None):
+        self.solution_path = os.path.join(cwd, solution_name)
+        self.problem_bytes: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.links: List[str] = []
+        self.feeder: Optional[threading.Thread] = None
+        self.solution: Optional[Callable[[], str]] = None
+        start_name = 'start.sol'
+        child_fds: List[int] = []
+        solution_read = start_write = None
+        if problem is not None:
+            problem_link = os.path.join(cwd, 'problem.lp')
+            if not os.path.islink(problem_link):
+                os.symlink('/dev/stdin', problem_link)
+            solution_read, solution_write = os.pipe()
+            child_fds.append(solution_write)
+            solution_name = f"/dev/fd/{solution_write}"
+            if start is not None:
+                start_read, start_write = os.pipe()
+                child_fds.append(start_read)
+                # SCIP recognizes the MIP start by its extension
+                start_name = f"start-{start_read}.sol"
+                self.links.append(os.path.join(cwd, start_name))
+                os.symlink(f"/dev/fd/{start_read}", self.links[-1])
+            warm_start = start is not None
+        try:
+            self.process = subprocess.Popen(
+                scip_command(cwd, warm_start, threads, limits, commands, solution_name, start_name),
+                cwd=cwd,
+                stdin=subprocess.PIPE if problem is not None else None,
+                stdout=subprocess.DEVNULL if not verbose else None,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=LP_FILE_BUFFER,
+                pass_fds=child_fds
+            )
+        except FileNotFoundError:
+            for fd in (solution_read, start_write):
+                if fd is not None:
+                    os.close(fd)
+            self.remove_links()
+            raise RuntimeError("Make sure 'scip' is in your PATH")
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+        self.stderr = drain(self.process.stderr)
+        if problem is not None:
+            self.solution = drain(open(solution_read, 'r'))
+            self.feeder = threading.Thread(target=self.feed, args=(problem, start, start_write), daemon=True)
+            self.feeder.start()
+
+    def feed(self, problem: Callable[[TextIO], None], start: Optional[str], start_fd: Optional[int]) -> None:
+        """Pipe the problem and the MIP start to SCIP, killing it if writing the problem fails."""
+        try:
+            stdin = CountingStream(self.process.stdin)
+            try:
+                problem(stdin)
+            finally:
+                try:
+                    self.process.stdin.close()
+                except BrokenPipeError:
+                    pass
+            self.problem_bytes = stdin.bytes
+            if start_fd is not None:
+                with open(start_fd, 'w') as start_stream:
+                    start_fd = None
+                    start_stream.write(start)
+        except BrokenPipeError:
+            # SCIP stopped reading, its exit status tells why
+            pass
+        except BaseException as e:
+            self.error = e
+            self.process.kill()
+        finally:
+            if start_fd is not None:
+                os.close(start_fd)
+
+    def poll(self) -> Optional[int]:
+        return self.process.poll()
+
+    def kill(self) -> None:
+        """Kill SCIP and wait for it."""
+        self.process.kill()
+        self.wait_process()
+
+    def wait_process(self) -> Tuple[int, str, Optional[str]]:
+        """Wait for SCIP and its pipes, returning its exit status, stderr and piped solution."""
+        returncode = self.process.wait()
+        if self.feeder is not None:
+            self.feeder.join()
+        stderr = self.stderr()
+        solution = self.solution() if self.solution is not None else None
+        self.remove_links()
+        return returncode, stderr, solution
+
+    def wait(self, name: Optional[str] = None) -> str:
+        """Wait for SCIP to finish and return its solution (SOL text), `name` tells the run in errors."""
+        returncode, stderr, solution = self.wait_process()
+        if self.error is not None:
+            raise self.error
+        if returncode != 0:
+            raise RuntimeError(f"SCIP solver failed{f' ({name})' if name else ''}: {stderr}")
+        if solution is None:
+            with open(self.solution_path) as sol_stream:
+                solution = sol_stream.read()
+        return solution
+
+    def remove_links(self) -> None:
+        for link in self.links:
+            if os.path.islink(link):
+                os.remove(link)
+        self.links = []
+
+def sol_text(solution: Optional[Solution]) -> Optional[str]:
+    """Solution in SCIP's solution format with short names, see `write_sol`."""
+    if solution is None:
+        return None
+    text = io.StringIO()
+    write_sol(solution, text, short_names=True)
+    return text.getvalue()
+
+def final_status(status: str) -> bool:
+    """Whether SCIP stopped for another reason than a time or node limit, e.g. proven optimality."""
+    return 'time limit' not in status and 'node limit' not in status
+
+def solution_status(solution: str) -> str:
+    """Status line of a SCIP solution (SOL text), empty if there is none."""
+    line = solution.split('\n', 1)[0]
+    return line.split(':', 1)[1].strip() if line.startswith('solution status:') else ''
+
+def race_scip(cwd: str, profiles: Dict[str, Sequence[str]], verbose: bool = False, warm_start: bool = False,
+              threads: Optional[int] = None, limits: Optional[Dict[str, float]] = None,
+              problem: Optional[Callable[[TextIO], None]] = None, start: Optional[str] = None) -> List[Tuple[str, float, str]]:
+    """Run one SCIP process per profile on the problem, each writing `solution-<profile>.sol`.
+
+    As soon as a run ends for another reason than a time or node limit (e.g.
+    proven optimality), the other runs are killed. Returns the profiles of
+    the finished runs with their seconds and solutions, in finishing order,
+    leaving out failed runs; raises a RuntimeError only if all runs failed.
+    With `problem` and `start`, each run reads them through pipes (see `ScipRun`).
+    """
+    started = time.monotonic()
+    runs: Dict[str, ScipRun] = {}
+    try:
+        for name, commands in profiles.items():
+            runs[name] = ScipRun(cwd, verbose, warm_start, threads, limits, commands, f"solution-{name}.sol", problem, start)
+    except RuntimeError:
+        for run in runs.values():
+            run.kill()
+        raise
+
+    finished: List[Tuple[str, float, str]] = []
+    failures: List[str] = []
+    try:
+        while runs:
+            for name, run in list(runs.items()):
+                if run.poll() is None:
+                    continue
+                del runs[name]
+                try:
+                    solution = run.wait(name)
+                except RuntimeError as e:
+                    # A failed profile leaves the race to the others
+                    failures.append(str(e).strip())
+                    continue
+                finished.append((name, time.monotonic() - started, solution))
+                if final_status(solution_status(solution)):
+                    return finished
+            time.sleep(0.02)
+        if failures and not finished:
+            raise RuntimeError("\n".join(failures))
+        return finished
+    finally:
+        for run in runs.values():
+            run.kill()
+
+class SolverBackend:
+    """Interface of a MILP solver backend."""
+    name = ''
+    # whether the backend accepts constraints as formatted LP text `blocks`
+    writes_lp = False
+    # size of the last LP problem handed to the solver (None: not written)
+    lp_bytes: Optional[int] = None
+
+    def __init__(self, threads: Optional[int] = None, slots: Any = None, limits: Optional[Dict[str, float]] = None,
+                 portfolio: Optional[Portfolio] = None):
+        # limit of solver threads (None: solver default), a semaphore bounding
+        # the number of concurrently running solvers (None: no limit), limits
+        # of the solve (keys of `SCIP_LIMITS`, missing: no limit), and the
+        # solver configurations to race (None: a single solver run)
+        self.threads = threads
+        self.slots = slots
+        self.limits = {name: value for name, value in (limits or {}).items() if value is not None}
+        self.portfolio = portfolio
+
+    def slot(self) -> ContextManager[Any]:
+        """Hold one of the solver slots while the solver runs."""
+        return self.slots if self.slots is not None else nullcontext()
+
+    @contextmanager
+    def slots_for(self, count: int) -> Iterator[int]:
+        """Hold up to `count` solver slots, waiting for the first one only, and yield how many are held."""
+        if self.slots is None:
+            yield count
+            return
+        self.slots.acquire()
+        held = 1
+        try:
+            # Further slots are only taken if free, so partial holders never wait on each other
+            while held < count and self.slots.acquire(False):
+                held += 1
+            yield held
+        finally:
+            for _ in range(held):
+                self.slots.release()
+
+    def solve(self, model: Model, work_dir: Optional[str], verbose: bool = False,
+              rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None,
+              start: Optional[Solution] = None, on_incumbent: Optional[IncumbentCallback] = None) -> Solution:
+        """Solve the model and return the values of all columns.
+
+        If `rows` is given, these are the constraints (streamed), not the rows
+        stored in the model. Backends that write LP files also accept the
+        constraints as `blocks` of LP lines with short names. A `start`
+        solution (NaN for unknown values) is handed to the solver as MIP start.
+        `on_incumbent` is called with each improved solution found. If a limit
+        is reached, the best solution found so far is returned.
+        """
+        raise NotImplementedError
+
+class ScipProcessBackend(SolverBackend):
+    """Run the `scip` binary on the problem in LP format.
+
+    With a work dir, the problem, MIP start and solution are files in it.
+    Without one, the LP is streamed to SCIP through pipes and nothing is
+    written to disk (see `ScipRun`); only a temporary dir of links is used
+    and removed afterwards.
+    """
+    name = 'scip'
+    writes_lp = True
+
+    def write_problem(self, model: Model, work_dir: str, rows: Optional[Iterable[Row]] = None,
+                      blocks: Optional[Iterable[str]] = None, start: Optional[Solution] = None) -> None:
+        """Write the problem file and the MIP start for `run_scip`."""
+        # Stream problem file, with short variable names
+        with open(Path(work_dir) / 'problem.lp', 'w', buffering=LP_FILE_BUFFER) as lp_stream:
+            write_lp(model, lp_stream, short_names=True, rows=rows, blocks=blocks)
+        self.lp_bytes = os.path.getsize(Path(work_dir) / 'problem.lp')
+
+        # Write MIP start
+        if start is not None:
+            with open(Path(work_dir) / 'start.sol', 'w') as sol_stream:
+                write_sol(start, sol_stream, short_names=True)
+
+    def read_solution(self, model: Model, work_dir: str) -> Solution:
+        """Read the solution file written by `run_scip`."""
+        with open(Path(work_dir) / 'solution.sol', 'r') as sol_stream:
+            return parse_scip_solution(sol_stream, model)
+
+    def solve(self, model: Model, work_dir: Optional[str], verbose: bool = False,
+              rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None,
+              start: Optional[Solution] = None, on_incumbent: Optional[IncumbentCallback] = None) -> Solution:
+        if work_dir is not None:
+            self.write_problem(model, work_dir, rows, blocks, start)
+            return self.solve_in(model, work_dir, verbose, start is not None, on_incumbent)
+
+        with tempfile.TemporaryDirectory(prefix='transit-map-') as temp_dir:
+            if not pipes_supported():
+                self.write_problem(model, temp_dir, rows, blocks, start)
+                return self.solve_in(model, temp_dir, verbose, start is not None, on_incumbent)
+
+            def problem(stream: TextIO) -> None:
+                write_lp(model, stream, short_names=True, rows=rows, blocks=blocks)
+
+            if on_incumbent is not None or self.portfolio is not None:
+                # Several runs read the problem, keep its text in memory
+                text = io.StringIO()
+                problem(text)
+                self.lp_bytes = len(text.getvalue().encode())
+                problem = lambda stream: stream.write(text.getvalue())
+            return self.solve_in(model, temp_dir, verbose, start is not None, on_incumbent, problem, sol_text(start))
+
+    def solve_in(self, model: Model, work_dir: str, verbose: bool, warm_start: bool,
+                 on_incumbent: Optional[IncumbentCallback], problem: Optional[Callable[[TextIO], None]] = None,
+                 start: Optional[str] = None) -> Solution:
+        """Solve the problem files in the work dir, or the piped `problem` and `start`."""
+        if on_incumbent is not None:
+            return self.solve_anytime(model, work_dir, verbose, warm_start, on_incumbent, problem, start)
+        if self.portfolio is not None:
+            return self.solve_portfolio(model, work_dir, verbose, warm_start, problem, start)
+
+        # Run solver
+        with self.slot():
+            run = ScipRun(work_dir, verbose, warm_start, self.threads, self.limits, problem=problem, start=start)
+            solution = run.wait()
+        if problem is not None:
+            self.lp_bytes = run.problem_bytes
+        return parse_scip_solution(io.StringIO(solution), model)
+
+    def solve_portfolio(self, model: Model, work_dir: str, verbose: bool, warm_start: bool,
+                        problem: Optional[Callable[[TextIO], None]] = None, start: Optional[str] = None) -> Solution:
+        """Race the profiles of the portfolio and return the best solution, recording the winner.
+
+        The winner is the first run that proves optimality (or another final
+        status), else the run with the best objective, the earliest on ties.
+        Each run holds a solver slot, so with fewer free slots only the first
+        profiles race.
+        """
+        with self.slots_for(len(self.portfolio.profiles)) as held:
+            profiles = dict(list(self.portfolio.profiles.items())[:held])
+            finished = race_scip(work_dir, profiles, verbose, warm_start, self.threads, self.limits, problem, start)
+
+        if not finished:
+            raise NoSolutionError("SCIP found no solution with any profile of the portfolio")
+        # The last finished run decided the race, or the best of all runs wins
+        last_name, last_seconds, last_solution = finished[-1]
+        if final_status(solution_status(last_solution)):
+            name, seconds, solution = last_name, last_seconds, parse_scip_solution(io.StringIO(last_solution), model)
+        else:
+            solutions = []
+            for name, seconds, text in finished:
+                try:
+                    solutions.append((name, seconds, parse_scip_solution(io.StringIO(text), model)))
+                except NoSolutionError:
+                    continue
+            if not solutions:
+                raise NoSolutionError("SCIP found no solution with any profile of the portfolio")
+            name, seconds, solution = min(solutions, key=lambda entry: entry[2].objective)
+        optimal = (solution.status or '').startswith('optimal')
+        if verbose:
+            print(f"Portfolio winner: {name} after {seconds:.2f}s ({solution.status})", file=sys.stderr)
+        self.portfolio.record(name, seconds, optimal, profiles)
+        return solution
+
+    def solve_anytime(self, model: Model, work_dir: str, verbose: bool, warm_start: bool,
+                      on_incumbent: IncumbentCallback, problem: Optional[Callable[[TextIO], None]] = None,
+                      start: Optional[str] = None) -> Solution:
+        """Solve in rounds of doubling time limits, each started from the incumbent of the previous one.
+
+        The scip binary only reports its solution at the end, so this reports
+        the incumbent of each round, until a round ends for another reason
+        than its time limit or the overall time limit is reached.
+        """
+        deadline = time.monotonic() + self.limits['time'] if 'time' in self.limits else math.inf
+        round_limit = ANYTIME_SLICE
+        best = None
+        while True:
+            limit = min(round_limit, deadline - time.monotonic())
+            with self.slot():
+                run = ScipRun(work_dir, verbose, warm_start, self.threads,
+                              {**self.limits, 'time': round(max(limit, 0.1), 3)}, problem=problem, start=start)
+                text = run.wait()
+            try:
+                solution = parse_scip_solution(io.StringIO(text), model)
+            except NoSolutionError as e:
+                if 'time limit' not in str(e) or time.monotonic() >= deadline:
+                    raise
+                solution = None
+            if solution is not None and (best is None or solution.objective < best.objective):
+                best = solution
+                on_incumbent(best)
+                start = sol_text(best)
+                if problem is None:
+                    with open(Path(work_dir) / 'start.sol', 'w') as sol_stream:
+                        sol_stream.write(start)
+                warm_start = True
+            if (solution is not None and 'time limit' not in (solution.status or '')) or time.monotonic() >= deadline:
+                return best
+            round_limit *= 2
+
+class PySCIPOptBackend(SolverBackend):
+    """Build the model in-process through the PySCIPOpt API."""
+    name = 'pyscipopt'
+
+    def solve(self, model: Model, work_dir: Optional[str], verbose: bool = False,
+              rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None,
+              start: Optional[Solution] = None, on_incumbent: Optional[IncumbentCallback] = None) -> Solution:
+        if rows is not None:
+            model.add_rows(rows)
+        try:
+            from pyscipopt import Model as SCIPModel, quicksum
+        except ImportError:
+            raise RuntimeError("Make sure 'pyscipopt' is installed to use the pyscipopt backend")
+
+        scip = SCIPModel()
+        if not verbose:
+            scip.hideOutput()
+        if self.threads:
+            scip.setParam('lp/threads', self.threads)
+        for name, value in self.limits.items():
+            scip.setParam(SCIP_LIMITS[name], int(value) if name == 'nodes' else value)
+
+        # Add variables
+        vtypes = {VTYPES['continuous']: 'C', VTYPES['integer']: 'I', VTYPES['binary']: 'B'}
+        variables = [
+            scip.addVar(
+                name, vtype=vtypes[model.vtype[j]],
+                lb=None if math.isinf(model.lower[j]) else model.lower[j],
+                ub=None if math.isinf(model.upper[j]) else model.upper[j],
+                obj=model.objective[j]
+            )
+            for j, name in enumerate(model.column_names())
+        ]
+
+        # Add constraints
+        starts = model.row_starts()
+        col, coef = model.col, model.coef
+        for r in range(model.num_rows):
+            expression = quicksum(coef[k] * variables[col[k]] for k in range(starts[r], starts[r + 1]))
+            sense, rhs = model.sense[r], model.rhs[r]
+            if sense == SENSES['<=']:
+                scip.addCons(expression <= rhs)
+            elif sense == SENSES['>=']:
+                scip.addCons(expression >= rhs)
+            else:
+                scip.addCons(expression == rhs)
+
+        # Add MIP start, completed by the solver if partial
+        if start is not None:
+            partial = any(math.isnan(value) for value in start.values)
+            sol = scip.createPartialSol() if partial else scip.createSol()
+            for var, value in zip(variables, start.values):
+                if not math.isnan(value):
+                    scip.setSolVal(sol, var, value)
+            scip.addSol(sol, free=True)
+
+        # Report improved solutions while solving
+        if on_incumbent is not None:
+            from pyscipopt import Eventhdlr, SCIP_EVENTTYPE
+
+            class IncumbentHandler(Eventhdlr):
+                def eventinit(self):
+                    self.model.catchEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+                def eventexit(self):
+                    self.model.dropEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+                def eventexec(self, event):
+                    sol = self.model.getBestSol()
+                    values = array('d', (self.model.getSolVal(sol, var) for var in variables))
+                    on_incumbent(Solution(model, values, self.model.getSolObjVal(sol)))
+
+            scip.includeEventhdlr(IncumbentHandler(), 'incumbent', 'reports improved solutions')
+
+        with self.slot():
+            scip.optimize()
+        if scip.getNSols() == 0:
+            raise NoSolutionError(f"SCIP found no solution (status: {scip.getStatus()})")
+        best = scip.getBestSol()
+        return Solution(model, array('d', (best[var] for var in variables)), scip.getSolObjVal(best), scip.getStatus())
+
+class HighsBackend(SolverBackend):
+    """Build the model in-process through the HiGHS API (highspy)."""
+    name = 'highs'
+
+    def solve(self, model: Model, work_dir: Optional[str], verbose: bool = False,
+              rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None,
+              start: Optional[Solution] = None, on_incumbent: Optional[IncumbentCallback] = None) -> Solution:
+        if rows is not None:
+            model.add_rows(rows)
+        try:
+            import highspy
+        except ImportError:
+            raise RuntimeError("Make sure 'highspy' is installed to use the highs backend")
+
+        inf = highspy.kHighsInf
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', verbose)
+        if self.threads:
+            highs.setOptionValue('threads', self.threads)
+        for name, option in [('time', 'time_limit'), ('gap', 'mip_rel_gap'), ('nodes', 'mip_max_nodes')]:
+            if name in self.limits:
+                highs.setOptionValue(option, int(self.limits[name]) if name == 'nodes' else float(self.limits[name]))
+
+        # Add variables
+        num_columns = model.num_columns
+        highs.addVars(
+            num_columns,
+            [max(lower, -inf) for lower in model.lower],
+            [min(upper, inf) for upper in model.upper]
+        )
+        integer_columns = [j for j in range(num_columns) if model.vtype[j] != VTYPES['continuous']]
+        if integer_columns:
+            highs.changeColsIntegrality(
+                len(integer_columns), integer_columns,
+                [highspy.HighsVarType.kInteger] * len(integer_columns)
+            )
+        highs.changeColsCost(num_columns, list(range(num_columns)), list(model.objective))
+
+        # Add constraints
+        lower = [model.rhs[r] if model.sense[r] != SENSES['<='] else -inf for r in range(model.num_rows)]
+        upper = [model.rhs[r] if model.sense[r] != SENSES['>='] else inf for r in range(model.num_rows)]
+        starts = model.row_starts()
+        highs.addRows(
+            model.num_rows, lower, upper, len(model.coef),
+            list(starts[:-1]), list(model.col), list(model.coef)
+        )
+
+        # Add MIP start, completed by the solver if partial
+        if start is not None:
+            known = [j for j, value in enumerate(start.values) if not math.isnan(value)]
+            highs.setSolution(len(known), known, [start.values[j] for j in known])
+
+        # Report improved solutions while solving
+        if on_incumbent is not None:
+            def improving_solution(callback_type, message, data_out, data_in, user_data):
+                on_incumbent(Solution(model, array('d', data_out.mip_solution), data_out.objective_function_value))
+
+            highs.setCallback(improving_solution, None)
+            highs.startCallback(highspy.cb.HighsCallbackType.kCallbackMipImprovingSolution)
+
+        with self.slot():
+            highs.run()
+        status = highs.modelStatusToString(highs.getModelStatus())
+        if highs.getInfo().primal_solution_status != 2:
+            raise NoSolutionError(f"HiGHS found no solution (status: {status})")
+        return Solution(model, array('d', highs.getSolution().col_value), highs.getInfo().objective_function_value, status)
+
+BACKENDS = {
+    backend.name: backend
+    for backend in [ScipProcessBackend, PySCIPOptBackend, HighsBackend]
+}
+
+def get_backend(name: Union[str, SolverBackend], threads: Optional[int] = None, slots: Any = None,
+                limits: Optional[Dict[str, float]] = None, portfolio: Optional[Portfolio] = None) -> SolverBackend:
+    """Get a solver backend by name, or the given backend instance."""
+    if isinstance(name, SolverBackend):
+        return name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown solver backend '{name}', use one of: {', '.join(BACKENDS)}")
+    if portfolio is not None and name != ScipProcessBackend.name:
+        raise ValueError("Portfolio racing requires the 'scip' backend")
+    return BACKENDS[name](threads, slots, limits, portfolio)
@@ -0,0 +1,143 @@
+from typing import Dict, Any, Iterator, List, Optional, TextIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+from .transit_map import transit_map
+from .svg_transit_map import graph_to_svg, write_svg
+
+# state of a batch worker process, set by `init_batch_worker`
+_worker: Dict[str, Any] = {}
+
+def batch_jobs(source: str) -> List[Dict[str, Any]]:
+    """Jobs of a batch: the JSON files of a directory, or the lines of a JSON-lines manifest.
+
+    Each job has a `name` (the file stem by default), an `input` path and
+    optional `options` overriding those of the batch (`settings` are
+    merged). Manifest lines are objects with these keys, and input paths are
+    relative to the manifest.
+    """
+    path = Path(source)
+    if path.is_dir():
+        jobs = [{'name': input_path.stem, 'input': str(input_path)} for input_path in sorted(path.glob('*.json'))]
+    else:
+        jobs = []
+        with open(path) as stream:
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                job = json.loads(line)
+                if 'input' not in job:
+                    raise ValueError(f"{source}:{number}: missing 'input'")
+                job['input'] = str(path.parent / job['input'])
+                job.setdefault('name', Path(job['input']).stem)
+                jobs.append(job)
+
+    check_job_names(jobs)
+    return jobs
+
+def check_job_names(jobs: List[Dict[str, Any]]) -> None:
+    """Raise a ValueError for job names that are duplicates or not plain file names.
+
+    Names end up in the output and work paths, so they must not be empty or
+    absolute and must not contain path separators or `..`.
+    """
+    names = [job['name'] for job in jobs]
+    invalid = sorted({
+        repr(name) for name in names
+        if not isinstance(name, str) or not name or os.path.isabs(name) or '..' in name or
+        any(separator and separator in name for separator in (os.sep, os.altsep))
+    })
+    if invalid:
+        raise ValueError(f"Invalid job names: {', '.join(invalid)}")
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names: {', '.join(duplicates)}")
+
+def render_output(solution: Dict[str, Any], graph_output: bool = False, invert_y: bool = False) -> str:
+    """Render a solved layout as SVG map, or as JSON graph if `graph_output`."""
+    if graph_output:
+        return json.dumps(solution)
+    return graph_to_svg(solution, invert_y)
+
+def stream_output(solution: Dict[str, Any], output_stream: TextIO, graph_output: bool = False,
+                  invert_y: bool = False) -> None:
+    """Write a solved layout to a stream like `render_output`, without building the whole text first."""
+    if graph_output:
+        json.dump(solution, output_stream)
+    else:
+        write_svg(solution, output_stream, invert_y)
+
+def write_output(solution: Dict[str, Any], path: str, graph_output: bool = False, invert_y: bool = False,
+                 compress: Optional[bool] = None) -> None:
+    """Stream a solved layout to a file like `render_output`.
+
+    The output is gzip-compressed if `compress`, by default for `.svgz` and
+    `.gz` files.
+    """
+    if compress is None:
+        compress = str(path).endswith(('.svgz', '.gz'))
+    with (gzip.open(path, 'wt', encoding='utf-8') if compress else open(path, 'w', encoding='utf-8')) as stream:
+        stream_output(solution, stream, graph_output, invert_y)
+
+def init_batch_worker(slots: Any) -> None:
+    """Set up a batch worker process with the solver slots shared by all workers."""
+    _worker['slots'] = slots
+
+def run_job(job: Dict[str, Any], options: Dict[str, Any], output_path: str,
+            graph_output: bool = False, invert_y: bool = False) -> Dict[str, Any]:
+    """Lay out the network of one job and write its output, returning its status record."""
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    record = {'name': job['name'], 'input': job['input'], 'output': output_path}
+    try:
+        graph = json.loads(Path(job['input']).read_text())
+        job_options = {**options, **job.get('options', {})}
+        job_options['settings'] = {**(options.get('settings') or {}), **job.get('options', {}).get('settings', {})}
+        if options.get('work_dir'):
+            job_options['work_dir'] = os.path.join(options['work_dir'], job['name'])
+            os.makedirs(job_options['work_dir'], exist_ok=True)
+        # Constraints are generated in the job process, solvers share the slots
+        job_options['jobs'] = 1
+        job_options['solver_slots'] = _worker.get('slots')
+        solution = transit_map(graph, job_options)
+        write_output(solution, output_path, graph_output, invert_y)
+        record.update(status='ok', nodes=len(solution['nodes']), edges=len(solution['edges']))
+    except Exception as e:
+        record.update(status='failed', error=f"{type(e).__name__}: {e}")
+        if options.get('verbose'):
+            traceback.print_exc(file=sys.stderr)
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    record['cpu_seconds'] = round(time.process_time() - cpu_started, 3)
+    return record
+
+def run_batch(jobs: List[Dict[str, Any]], options: Dict[str, Any], output_dir: str,
+              graph_output: bool = False, invert_y: bool = False,
+              workers: int = 1, solver_slots: Optional[int] = None,
+              compress: bool = False) -> Iterator[Dict[str, Any]]:
+    """Run the jobs in `workers` processes, yielding their status records as they finish.
+
+    Outputs are written to `<output_dir>/<name>.svg` (or `.json` with
+    `graph_output`, `.svgz` with `compress`). At most `solver_slots` solvers (default: one per worker)
+    run at the same time, while the other workers prepare and generate their
+    problems.
+    """
+    check_job_names(jobs)
+    os.makedirs(output_dir, exist_ok=True)
+    extension = 'json' if graph_output else 'svgz' if compress else 'svg'
+    slots = multiprocessing.BoundedSemaphore(solver_slots) if solver_slots else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker, initargs=(slots,)) as executor:
+        futures = [
+            executor.submit(
+                run_job, job, options, os.path.join(output_dir, f"{job['name']}.{extension}"), graph_output, invert_y
+            )
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,294 @@
+from typing import Dict, Any, Iterator, List, Optional, TextIO
+from array import array
+from pathlib import Path
+import json
+import multiprocessing
+import platform
+import sys
+
+from .backends import SolverBackend, get_backend
+from .bounds import resolve_settings
+from .generate_lp import create_stream_problem
+from .model import Model, Solution
+from .prepare_graph import prepare_network
+from .presolve import max_violation, presolve
+from .revise_solution import create_revise_solution
+from .stats import Stats
+from .svg_transit_map import write_svg
+from .synthetic import synthetic_network
+from .transit_map import SETTINGS
+from .writers import write_lp
+
+# bump when the records change incompatibly, results of other versions are not compared
+BENCHMARK_VERSION = 1
+
+# synthetic networks benchmarked by default, to see how the stages scale with the network size
+DEFAULT_SYNTHETIC = ['grid:2x6', 'grid:4x10', 'grid:6x16', 'radial:3x9', 'radial:6x15']
+
+# largest violation of the full model by a postsolved solution that `check_presolve` accepts
+PRESOLVE_TOLERANCE = 1e-6
+
+class CountingSink:
+    """Text stream that only counts the bytes written to it."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.bytes += len(text.encode())
+        return len(text)
+
+def geojson_network(collection: Dict[str, Any]) -> Dict[str, Any]:
+    """Network graph of a GeoJSON feature collection of stations (points) and line segments (line strings).
+
+    Line strings reference their end stations by `from` and `to` and carry
+    their `lines`; segments between the same stations are merged.
+    """
+    network: Dict[str, Any] = {'nodes': [], 'edges': [], 'lines': []}
+    lines: Dict[str, Dict[str, Any]] = {}
+    edges: Dict[frozenset, Dict[str, Any]] = {}
+    for feature in collection['features']:
+        properties = feature['properties']
+        if feature['geometry']['type'] == 'Point':
+            x, y = feature['geometry']['coordinates'][:2]
+            network['nodes'].append({
+                'id': properties['id'],
+                'label': properties.get('station_label') or properties['id'],
+                'metadata': {'x': x, 'y': y}
+            })
+    for feature in collection['features']:
+        properties = feature['properties']
+        if feature['geometry']['type'] != 'LineString':
+            continue
+        line_ids = []
+        for line in properties.get('lines', []):
+            if line['id'] not in lines:
+                color = line.get('color', '000000')
+                lines[line['id']] = {'id': line['id'], 'label': line.get('label'),
+                                     'color': color if color.startswith('#') else f"#{color}"}
+                network['lines'].append(lines[line['id']])
+            line_ids.append(line['id'])
+        key = frozenset((properties['from'], properties['to']))
+        if key not in edges:
+            edges[key] = {'source': properties['from'], 'target': properties['to'], 'metadata': {'lines': []}}
+            network['edges'].append(edges[key])
+        edge_lines = edges[key]['metadata']['lines']
+        edge_lines.extend(line_id for line_id in line_ids if line_id not in edge_lines)
+    return network
+
+def inline_line_references(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Graph with edge lines given as line objects (like `{'id': ..., 'color': ...}`) replaced by their ids.
+
+    Converted networks may carry the line objects instead of their ids, the
+    graph's lines then use the objects as ids and their own colour is lost.
+    """
+    if not any(isinstance(line, dict) for edge in graph['edges'] for line in edge['metadata'].get('lines', [])):
+        return graph
+    lines: Dict[str, Dict[str, Any]] = {}
+    edges = []
+    for edge in graph['edges']:
+        line_ids = []
+        for line in edge['metadata'].get('lines', []):
+            if isinstance(line, dict):
+                color = line.get('color', '000000')
+                lines.setdefault(line['id'], {'id': line['id'], 'label': line.get('label'),
+                                              'color': color if color.startswith('#') else f"#{color}"})
+                line = line['id']
+            line_ids.append(line)
+        edges.append({**edge, 'metadata': {**edge['metadata'], 'lines': line_ids}})
+    return {**graph, 'edges': edges, 'lines': list(lines.values())}
+
+def load_network(path: str) -> Dict[str, Any]:
+    """Network graph of a JSON graph or GeoJSON file."""
+    data = json.loads(Path(path).read_text())
+    if data.get('type') == 'FeatureCollection':
+        return geojson_network(data)
+    return inline_line_references(data)
+
+def benchmark_cases(inputs: List[str], synthetic: List[str]) -> List[Dict[str, Any]]:
+    """Benchmark cases of the input files (named by file name) and synthetic network specs."""
+    cases = []
+    for path in inputs:
+        name = Path(path).name
+        for suffix in ('.input.json', '.json'):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        cases.append({'name': name, 'input': str(path)})
+    cases.extend({'name': spec, 'synthetic': spec} for spec in synthetic)
+    return cases
+
+def default_inputs(root: str) -> List[str]:
+    """The bundled example networks, the converted Hamburg network and its GeoJSON source, where present."""
+    root_path = Path(root)
+    inputs = sorted(str(path) for path in root_path.glob('examples/*.input.json'))
+    for name in ('converted-network.json', 'hamburg-overlapfree.json'):
+        if (root_path / name).exists():
+            inputs.append(str(root_path / name))
+    return inputs
+
+def check_presolve(model: Model, backend: SolverBackend, solution: Optional[Solution] = None) -> float:
+    """Check the presolve of a model, returning the largest violation of the model by the postsolved solution.
+
+    The presolved model is solved and its solution postsolved to the full
+    model, which must satisfy all rows, bounds and integralities (see
+    `presolve.max_violation`) up to `PRESOLVE_TOLERANCE`. Given an optimal
+    `solution` of the full model, the optimal objectives must agree as well.
+    Raises a RuntimeError otherwise.
+    """
+    presolved = presolve(model)
+    postsolved = presolved.postsolve(backend.solve(presolved.model, None))
+    violation = max_violation(model, postsolved)
+    if violation > PRESOLVE_TOLERANCE:
+        raise RuntimeError(f"Postsolved solution violates the model by {violation:g}")
+    optimal = all((result.status or '').startswith('optimal') for result in (solution, postsolved) if result is not None)
+    if solution is not None and optimal and abs(postsolved.objective - solution.objective) > PRESOLVE_TOLERANCE * max(1.0, abs(solution.objective)):
+        raise RuntimeError(f"Presolved objective {postsolved.objective} differs from the objective {solution.objective}")
+    return violation
+
+def run_case(case: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run all stages on one network, returning the case record with the stats of each stage.
+
+    The problem is built in memory (`generate`), written as LP text to a
+    counting sink (`write`), solved (`solve`, including the backend's own
+    problem I/O), revised to a layout (`revise`) and rendered as SVG map
+    (`render`). Without solving, the layout is revised from the input
+    coordinates. With `check_presolve`, the presolve of the model is checked
+    as well (see `check_presolve`), outside the measured stages.
+    """
+    graph = synthetic_network(case['synthetic']) if 'synthetic' in case else load_network(case['input'])
+    settings = {**SETTINGS, **(options.get('settings') or {})}
+    stats = Stats()
+    record: Dict[str, Any] = {**case, 'nodes': len(graph['nodes']), 'edges': len(graph['edges'])}
+
+    with stats.stage('prepare'):
+        network = prepare_network(graph)
+        settings = resolve_settings(network, settings)
+    with stats.stage('generate'):
+        model, rows, report = create_stream_problem(network, settings)()
+        model.add_rows(rows)
+    sink = CountingSink()
+    with stats.stage('write'):
+        write_lp(model, sink, short_names=True)
+    stats.add_model(model, report, sink.bytes)
+
+    backend = get_backend(options.get('backend', 'scip'), limits={'time': options.get('time_limit')})
+    if options.get('solve', True):
+        with stats.stage('solve'):
+            solution = backend.solve(model, None)
+        record['objective'] = solution.objective
+        record['status'] = solution.status
+    else:
+        values = array('d', bytes(8 * model.num_columns))
+        for i, node in enumerate(network.graph['nodes']):
+            values[model.column('vx', i)] = node['metadata']['x'] + settings['offset']
+            values[model.column('vy', i)] = node['metadata']['y'] + settings['offset']
+        solution = Solution(model, values)
+    if options.get('check_presolve'):
+        record['presolve_violation'] = check_presolve(model, backend, solution if options.get('solve', True) else None)
+
+    revise_solution = create_revise_solution(network.graph, settings)
+    with stats.stage('revise'):
+        layout = revise_solution(solution)
+    with stats.stage('render'):
+        write_svg(layout, CountingSink())
+
+    model_record = stats.models[0]
+    record.update(
+        variables=model_record['num_variables'],
+        constraints=model_record['num_constraints'],
+        constraint_families=model_record['constraints'],
+        lp_bytes=model_record['lp_bytes'],
+        stages={
+            entry['stage']: {key: entry[key] for key in ('wall_seconds', 'cpu_seconds', 'child_cpu_seconds', 'peak_rss_bytes')}
+            for entry in stats.stages
+        }
+    )
+    return record
+
+def run_case_safely(case: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a case, recording its error instead of failing the benchmark."""
+    try:
+        return run_case(case, options)
+    except Exception as e:
+        return {**case, 'error': f"{type(e).__name__}: {e}"}
+
+def best_of(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine repeated runs of a case, keeping the minimum of each stage measurement."""
+    best = dict(records[0])
+    if 'error' in best:
+        return best
+    best['stages'] = {
+        stage: {key: min(record['stages'][stage][key] or 0 for record in records) for key in values}
+        for stage, values in records[0]['stages'].items()
+    }
+    best['runs'] = len(records)
+    return best
+
+def run_benchmark(cases: List[Dict[str, Any]], options: Dict[str, Any], repeat: int = 1) -> Iterator[Dict[str, Any]]:
+    """Run each case `repeat` times, yielding the combined record of each case.
+
+    Every run takes place in a fresh worker process, so that the peak RSS of
+    a run only depends on its own case.
+    """
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            runs = [pool.apply(run_case_safely, (case, options)) for _ in range(max(repeat, 1))]
+            yield best_of(runs)
+
+def benchmark_results(records: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Benchmark results file content, with the environment of the run."""
+    return {
+        'version': BENCHMARK_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {key: value for key, value in options.items() if key != 'settings'},
+        'cases': records
+    }
+
+def compare_results(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float = 0.2,
+                    min_seconds: float = 0.01) -> List[Dict[str, Any]]:
+    """Regressions of the results against a baseline.
+
+    A stage regresses if its wall time grew by more than `threshold` (a
+    fraction) and by more than `min_seconds`, or its peak RSS by more than
+    `threshold`. A model regresses if it has more variables, constraints or
+    LP bytes. Cases failing now but not in the baseline regress as well.
+    """
+    if baseline.get('version') != results.get('version'):
+        raise ValueError(f"Cannot compare benchmark version {results.get('version')} with baseline version {baseline.get('version')}")
+    previous = {case['name']: case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        base = previous.get(case['name'])
+        if base is None or 'error' in base:
+            continue
+        if 'error' in case:
+            regressions.append({'case': case['name'], 'metric': 'error', 'baseline': None, 'value': case['error']})
+            continue
+        for stage, values in case['stages'].items():
+            base_values = base['stages'].get(stage)
+            if base_values is None:
+                continue
+            wall, base_wall = values['wall_seconds'], base_values['wall_seconds']
+            if wall > base_wall * (1 + threshold) and wall - base_wall > min_seconds:
+                regressions.append({'case': case['name'], 'metric': f"{stage}.wall_seconds", 'baseline': base_wall, 'value': wall})
+            rss, base_rss = values.get('peak_rss_bytes'), base_values.get('peak_rss_bytes')
+            if rss and base_rss and rss > base_rss * (1 + threshold):
+                regressions.append({'case': case['name'], 'metric': f"{stage}.peak_rss_bytes", 'baseline': base_rss, 'value': rss})
+        for metric in ('variables', 'constraints', 'lp_bytes'):
+            if case.get(metric) is not None and base.get(metric) is not None and case[metric] > base[metric]:
+                regressions.append({'case': case['name'], 'metric': metric, 'baseline': base[metric], 'value': case[metric]})
+    return regressions
+
+def print_record(record: Dict[str, Any], output_stream: TextIO = sys.stderr) -> None:
+    """Log the stage times of a case record."""
+    if 'error' in record:
+        print(f"{record['name']}: {record['error']}", file=output_stream)
+        return
+    stages = ', '.join(f"{stage} {values['wall_seconds']:.3f}s" for stage, values in record['stages'].items())
+    print(
+        f"{record['name']} ({record['nodes']} nodes, {record['edges']} edges, {record['variables']} variables, "
+        f"{record['constraints']} constraints, LP {record['lp_bytes']} bytes): {stages}",
+        file=output_stream
+    )
@@ -0,0 +1,148 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import math
+
+from .network import Network, EdgeRecord
+from .octolinearity import fixed_binaries
+
+# settings derived per network if None (see `resolve_settings`)
+DERIVED_SETTINGS = ('offset', 'max_width', 'max_height')
+
+# arcs of a difference constraint graph per node: (node, length), an arc u -> v meaning x_v <= x_u + length
+Arcs = List[List[Tuple[int, float]]]
+
+def shortest_distances(arcs: Arcs, sources: Dict[int, float]) -> Optional[List[float]]:
+    """Shortest path distances from the sources (starting at their given distances), inf if unreachable.
+
+    Arc lengths may be negative. Returns None if a negative cycle is
+    reachable, i.e. the difference constraints are infeasible.
+    """
+    num_nodes = len(arcs)
+    distances = [math.inf] * num_nodes
+    queued = [False] * num_nodes
+    relaxations = [0] * num_nodes
+    queue = deque()
+    for node, distance in sources.items():
+        distances[node] = distance
+        queued[node] = True
+        queue.append(node)
+    while queue:
+        u = queue.popleft()
+        queued[u] = False
+        for v, length in arcs[u]:
+            if distances[u] + length < distances[v] - 1e-9:
+                distances[v] = distances[u] + length
+                if not queued[v]:
+                    relaxations[v] += 1
+                    if relaxations[v] > num_nodes:
+                        return None
+                    queued[v] = True
+                    queue.append(v)
+    return distances
+
+def difference_range(edge: EdgeRecord, settings: Dict[str, Any], axis: str) -> Tuple[float, float]:
+    """Range of the x (`axis` 'x') or y coordinate difference of the target and source of an edge.
+
+    The difference is `l (a - b)` or `l (c - d)`, so its sign follows the
+    direction variables fixed by the input geometry of the edge.
+    """
+    positive, negative = ('a', 'b') if axis == 'x' else ('c', 'd')
+    fixed = dict(fixed_binaries(edge.source_directions))
+    signs = {
+        p - n for p in ([fixed[positive]] if positive in fixed else [0, 1])
+        for n in ([fixed[negative]] if negative in fixed else [0, 1]) if p + n <= 1
+    }
+    lower_length = settings['min_edge_length'] * edge.weight
+    upper_length = settings['max_edge_length'] * edge.weight
+    lower = -upper_length if -1 in signs else 0 if 0 in signs else lower_length
+    upper = upper_length if 1 in signs else 0 if 0 in signs else -lower_length
+    return lower, upper
+
+def coordinate_windows(network: Network, settings: Dict[str, Any], axis: str,
+                       sources: Dict[int, float]) -> Optional[List[Tuple[float, float]]]:
+    """Window of the x or y coordinate of each node, given the coordinates of the `sources`.
+
+    Every edge bounds the coordinate difference of its nodes (see
+    `difference_range`), so the coordinates of a node are bounded by the
+    shortest paths from the sources in this difference constraint graph.
+    Nodes without a path to a source get an infinite window. Returns None if
+    the constraints are infeasible.
+    """
+    upper_arcs: Arcs = [[] for _ in network.node_ids]
+    lower_arcs: Arcs = [[] for _ in network.node_ids]
+    for edge in network.edges:
+        lower, upper = difference_range(edge, settings, axis)
+        upper_arcs[edge.source].append((edge.target, upper))
+        upper_arcs[edge.target].append((edge.source, -lower))
+        # Lower bounds are the negated upper bounds of the negated coordinates
+        lower_arcs[edge.source].append((edge.target, -lower))
+        lower_arcs[edge.target].append((edge.source, upper))
+    uppers = shortest_distances(upper_arcs, sources)
+    lowers = shortest_distances(lower_arcs, {node: -value for node, value in sources.items()})
+    if uppers is None or lowers is None:
+        return None
+    return [(-lower, upper) for lower, upper in zip(lowers, uppers)]
+
+def network_radius(network: Network, settings: Dict[str, Any]) -> float:
+    """Maximum coordinate distance of any node from the first node of the network.
+
+    Each connected component is at most its eccentricity (in maximum edge
+    lengths of its possibly contracted edges) away from its first node, and
+    the components are placed side by side, one maximum edge length apart.
+    """
+    arcs: Arcs = [[] for _ in network.node_ids]
+    for edge in network.edges:
+        length = settings['max_edge_length'] * edge.weight
+        arcs[edge.source].append((edge.target, length))
+        arcs[edge.target].append((edge.source, length))
+    radius = 0.0
+    reached = [False] * len(arcs)
+    for node in range(len(arcs)):
+        if reached[node]:
+            continue
+        distances = shortest_distances(arcs, {node: 0.0}) or []
+        component = [distance for distance in distances if distance < math.inf]
+        for other, distance in enumerate(distances):
+            reached[other] = reached[other] or distance < math.inf
+        radius += (settings['max_edge_length'] if radius else 0) + max(component)
+    return radius
+
+def resolve_settings(network: Network, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Settings with the `DERIVED_SETTINGS` that are None derived from the network.
+
+    The coordinate range (`max_width`, `max_height`) is twice the network
+    radius (see `network_radius`), at least one maximum edge length, and the
+    `offset` keeps all coordinates positive.
+    """
+    if all(settings.get(key) is not None for key in DERIVED_SETTINGS):
+        return settings
+    settings = dict(settings)
+    extent = 2 * math.ceil(max(network_radius(network, settings), settings['max_edge_length']))
+    for key in ('max_width', 'max_height'):
+        if settings.get(key) is None:
+            settings[key] = extent
+    if settings.get('offset') is None:
+        settings['offset'] = math.ceil(max(settings['max_width'], settings['max_height']) / 2)
+    return settings
+
+def create_coordinate_windows(network: Network, settings: Dict[str, Any],
+                              fixed: Optional[Dict[int, Tuple[float, float]]] = None) -> Dict[str, List[Tuple[float, float]]]:
+    """Windows of the `vx` and `vy` columns of each node, within the coordinate range of the settings.
+
+    The windows follow from the fixed first node (at the offset), or the
+    `fixed` nodes, and the edge directions of the input geometry (see
+    `coordinate_windows`). With the `coordinate_windows` setting disabled or
+    infeasible edge constraints, all nodes get the whole coordinate range.
+    """
+    windows = {}
+    for axis, size in (('x', settings['max_width']), ('y', settings['max_height'])):
+        lower, upper = settings['offset'] - size / 2, settings['offset'] + size / 2
+        nodes = None
+        if settings.get('coordinate_windows', True) and network.node_ids:
+            position = 0 if axis == 'x' else 1
+            sources = {node: coordinates[position] for node, coordinates in fixed.items()} if fixed else {0: settings['offset']}
+            nodes = coordinate_windows(network, settings, axis, sources)
+        windows[f"v{axis}"] = [
+            (max(lower, node_lower), min(upper, node_upper)) for node_lower, node_upper in nodes
+        ] if nodes is not None else [(lower, upper)] * len(network.node_ids)
+    return windows
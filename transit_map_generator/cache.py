@@ -0,0 +1,167 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # no inter-process locking, entries are still replaced atomically
+    fcntl = None
+
+from .revise_solution import with_coordinates
+
+# bump to invalidate all entries when the model changes
+CACHE_VERSION = 2
+
+def canonical_graph(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Order-insensitive form of the parts of a prepared graph that determine its layout.
+
+    Nodes are sorted, edges are undirected with sorted line ids, and labels,
+    line colors and other style metadata are left out.
+    """
+    nodes = sorted(
+        (node['id'], node['metadata']['x'], node['metadata']['y'])
+        for node in graph['nodes']
+    )
+    edges = sorted(
+        (*sorted((edge['source'], edge['target'])), sorted(edge['metadata']['lines']))
+        for edge in graph['edges']
+    )
+    return {'nodes': nodes, 'edges': edges}
+
+# options that change the solved layout besides the graph and settings: lazy
+# occlusion, contracted chains, decomposition into separately solved
+# components, and the solver limits that may cut the solve short of the optimum
+KEY_OPTIONS = ['lazy_occlusion', 'contract_chains', 'decompose', 'time_limit', 'gap_limit', 'node_limit']
+
+def solution_key(graph: Dict[str, Any], settings: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """Content hash of a prepared graph, the solver settings and the `KEY_OPTIONS` of the layout options."""
+    canonical = {
+        'version': CACHE_VERSION,
+        'graph': canonical_graph(graph),
+        'settings': sorted(settings.items()),
+        'options': [[name, (options or {}).get(name)] for name in KEY_OPTIONS]
+    }
+    return hashlib.sha256(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
+
+def layout_entry(solution: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache entry of a revised solution: the coordinates of each node by id."""
+    return {'nodes': [[node['id'], node['metadata']['x'], node['metadata']['y']] for node in solution['nodes']]}
+
+def apply_layout(graph: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Layout of the prepared graph with the cached coordinates (see `with_coordinates`).
+
+    The layout is translated to put the first node at the origin, as the
+    solver would for this node order.
+    """
+    coordinates: Dict[str, List[List[float]]] = {}
+    for node_id, x, y in entry['nodes']:
+        coordinates.setdefault(node_id, []).append([x, y])
+
+    assigned: Dict[str, int] = {}
+    positions = []
+    for node in graph['nodes']:
+        occurrence = assigned.get(node['id'], 0)
+        assigned[node['id']] = occurrence + 1
+        positions.append(coordinates[node['id']][occurrence])
+
+    x0, y0 = positions[0] if positions else (0, 0)
+    return with_coordinates(graph, ((round(x - x0, 5), round(y - y0, 5)) for x, y in positions))
+
+class SolutionCache:
+    """On-disk cache of solved layouts with LRU eviction.
+
+    Each entry is a JSON file named by its key. Lookups and writes take an
+    exclusive lock on the cache directory (lookups update the counters), so
+    several processes can use it at once. Hits refresh the modification
+    time, which orders the eviction once the entries exceed `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 2**20):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _lock(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _write_json(self, path: Path, data: Any) -> None:
+        """Replace a file atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as stream:
+                json.dump(data, stream)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _count(self, counter: str) -> None:
+        stats_path = self.directory / 'stats.json'
+        try:
+            stats = json.loads(stats_path.read_text())
+        except (OSError, ValueError):
+            stats = {'hits': 0, 'misses': 0}
+        stats[counter] = stats.get(counter, 0) + 1
+        self._write_json(stats_path, stats)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an entry and count the hit or miss, None if not cached."""
+        with self._lock(exclusive=True):
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                self._count('misses')
+                return None
+            os.utime(path)
+            self._count('hits')
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, evicting the least recently used ones beyond the size limit."""
+        with self._lock(exclusive=True):
+            self._write_json(self._path(key), entry)
+            self._evict()
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        return [(path, path.stat()) for path in self.directory.glob('*.json') if path.name != 'stats.json']
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            path.unlink()
+            total -= stat.st_size
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters, number of entries and their total size."""
+        with self._lock(exclusive=False):
+            try:
+                stats = json.loads((self.directory / 'stats.json').read_text())
+            except (OSError, ValueError):
+                stats = {}
+            entries = self._entries()
+        return {
+            'hits': stats.get('hits', 0),
+            'misses': stats.get('misses', 0),
+            'entries': len(entries),
+            'bytes': sum(stat.st_size for _, stat in entries)
+        }
@@ -0,0 +1,119 @@
+from typing import Dict, Any, List, Set
+
+from .revise_solution import with_coordinates
+
+def contractible_nodes(graph: Dict[str, Any]) -> Set[str]:
+    """Nodes of degree 2 whose two edges serve the same lines."""
+    incident: Dict[str, List[Dict[str, Any]]] = {}
+    for edge in graph['edges']:
+        incident.setdefault(edge['source'], []).append(edge)
+        if edge['target'] != edge['source']:
+            incident.setdefault(edge['target'], []).append(edge)
+    return {
+        node_id for node_id, edges in incident.items()
+        if len(edges) == 2 and set(edges[0]['metadata']['lines']) == set(edges[1]['metadata']['lines'])
+    }
+
+def contract_chains(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Contract maximal chains of degree-2 nodes with identical lines into weighted edges.
+
+    Each chain edge gets the number of contracted edges as `weight` and the
+    ids of its intermediate nodes as `chain` in its metadata. Chains that would
+    close a loop or duplicate another edge keep some intermediate nodes. The
+    original graph is kept as `contracted` for `expand_chains`.
+    """
+    inner = contractible_nodes(graph)
+    node_ids = {node['id'] for node in graph['nodes']}
+    ends = [node['id'] for node in graph['nodes'] if node['id'] not in inner]
+    neighbors: Dict[str, List[Any]] = {}
+    for index, edge in enumerate(graph['edges']):
+        neighbors.setdefault(edge['source'], []).append((index, edge['target']))
+        neighbors.setdefault(edge['target'], []).append((index, edge['source']))
+
+    visited_edges: Set[int] = set()
+    chains: List[List[Any]] = []
+
+    def walk(start: str) -> None:
+        for index, node in neighbors.get(start, []):
+            if index in visited_edges:
+                continue
+            visited_edges.add(index)
+            path, edges = [start], [index]
+            while node in inner and node != start:
+                path.append(node)
+                index, node = next((i, n) for i, n in neighbors[node] if i not in visited_edges)
+                visited_edges.add(index)
+                edges.append(index)
+            path.append(node)
+            chains.append([path, edges])
+
+    for node_id in ends:
+        walk(node_id)
+    # Keep one node of each cycle consisting of contractible nodes only
+    for node in graph['nodes']:
+        if node['id'] in inner and any(i not in visited_edges for i, _ in neighbors[node['id']]):
+            inner.discard(node['id'])
+            walk(node['id'])
+
+    # Split chains into segments between kept nodes, single edges first
+    pairs = set()
+    segments = []
+    for path, edges in sorted(chains, key=lambda chain: len(chain[1]) > 1):
+        if len(path) > 2 and (path[0] == path[-1] or frozenset((path[0], path[-1])) in pairs):
+            # Keep two nodes of a loop or one node of a duplicate, where possible
+            cuts = [len(path) // 3, 2 * len(path) // 3] if path[0] == path[-1] else [len(path) // 2]
+            cuts = [c for c in cuts if 0 < c < len(path) - 1]
+            bounds = [0] + sorted(set(cuts)) + [len(path) - 1]
+        else:
+            bounds = [0, len(path) - 1]
+        for start, end in zip(bounds, bounds[1:]):
+            segments.append((path[start:end + 1], edges[start:end]))
+            pairs.add(frozenset((path[start], path[end])))
+
+    # Build the contracted graph, keeping the node and edge order
+    kept = {path[0] for path, _ in segments} | {path[-1] for path, _ in segments}
+    kept |= node_ids - inner
+    first_edge = {edges[0]: (path, edges) for path, edges in segments}
+    contracted = {key: value for key, value in graph.items() if key not in ('nodes', 'edges')}
+    contracted['nodes'] = [node for node in graph['nodes'] if node['id'] in kept]
+    contracted['edges'] = []
+    for index, edge in enumerate(graph['edges']):
+        if index not in first_edge:
+            continue
+        path, edges = first_edge[index]
+        if len(edges) == 1:
+            contracted['edges'].append(edge)
+            continue
+        contracted['edges'].append({
+            'source': path[0],
+            'target': path[-1],
+            'metadata': {
+                **edge['metadata'],
+                'weight': len(edges),
+                'chain': path[1:-1]
+            }
+        })
+    contracted['contracted'] = graph
+    return contracted
+
+def expand_chains(layout: Dict[str, Any]) -> Dict[str, Any]:
+    """Place the nodes of contracted chains evenly along their solved edges.
+
+    Returns a layout of the original graph (see `with_coordinates`) with the
+    coordinates of the kept nodes from the contracted `layout`.
+    """
+    if 'contracted' not in layout:
+        return layout
+    graph = layout['contracted']
+    coordinates: Dict[str, Any] = {}
+    for node in layout['nodes']:
+        coordinates.setdefault(node['id'], (node['metadata']['x'], node['metadata']['y']))
+    for edge in layout['edges']:
+        chain = edge['metadata'].get('chain', [])
+        (sx, sy), (tx, ty) = coordinates[edge['source']], coordinates[edge['target']]
+        for j, node_id in enumerate(chain, 1):
+            t = j / (len(chain) + 1)
+            coordinates.setdefault(node_id, (round(sx + t * (tx - sx), 5), round(sy + t * (ty - sy), 5)))
+    return with_coordinates(graph, (
+        coordinates.get(node['id'], (node['metadata']['x'], node['metadata']['y'])) for node in graph['nodes']
+    ))
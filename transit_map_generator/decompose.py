@@ -0,0 +1,103 @@
+from typing import Dict, Any, Iterable, List, Tuple
+import math
+
+from .incremental import node_coordinates
+from .revise_solution import with_coordinates
+
+Box = Tuple[float, float, float, float]
+
+def connected_components(graph: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a graph into its connected components.
+
+    Components are ordered by their first node, and nodes and edges keep
+    their order in the graph.
+    """
+    parent: Dict[str, str] = {node['id']: node['id'] for node in graph['nodes']}
+
+    def find(node_id: str) -> str:
+        while parent[node_id] != node_id:
+            parent[node_id] = parent[parent[node_id]]
+            node_id = parent[node_id]
+        return node_id
+
+    for edge in graph['edges']:
+        parent[find(edge['source'])] = find(edge['target'])
+
+    index: Dict[str, int] = {}
+    components: List[Dict[str, Any]] = []
+    for node in graph['nodes']:
+        root = find(node['id'])
+        if root not in index:
+            index[root] = len(components)
+            component = {key: value for key, value in graph.items() if key not in ('nodes', 'edges')}
+            component['nodes'], component['edges'] = [], []
+            components.append(component)
+        components[index[root]]['nodes'].append(node)
+    for edge in graph['edges']:
+        components[index[find(edge['source'])]]['edges'].append(edge)
+    return components
+
+def bounding_box(coordinates: Iterable[Tuple[float, float]]) -> Box:
+    """Bounding box (min x, min y, max x, max y) of some points."""
+    xs, ys = zip(*coordinates)
+    return min(xs), min(ys), max(xs), max(ys)
+
+def edge_length_sum(graph: Dict[str, Any], coordinates: Dict[str, Tuple[float, float]]) -> float:
+    """Total euclidean length of the edges of a graph at the given coordinates."""
+    return sum(
+        math.dist(coordinates[edge['source']], coordinates[edge['target']])
+        for edge in graph['edges']
+    )
+
+def separate_boxes(targets: List[Tuple[float, float]], sizes: List[Tuple[float, float]],
+                   input_boxes: List[Box], gap: float) -> List[Tuple[float, float]]:
+    """Move boxes from their target corners as little as needed to separate them.
+
+    Each pair of boxes is separated along the axis on which their input boxes
+    are further apart, in their input order, by at least `gap`. Boxes only
+    move in positive direction, in input order along each axis (a longest
+    path in the acyclic separation graph).
+    """
+    count = len(targets)
+    positions = [list(target) for target in targets]
+    for axis in (0, 1):
+        center = [(box[axis] + box[axis + 2]) / 2 for box in input_boxes]
+        order = sorted(range(count), key=lambda k: (center[k], k))
+        for n, j in enumerate(order):
+            for i in order[:n]:
+                a, b = input_boxes[i], input_boxes[j]
+                distance_x = max(b[0] - a[2], a[0] - b[2])
+                distance_y = max(b[1] - a[3], a[1] - b[3])
+                if (distance_x >= distance_y) == (axis == 0):
+                    positions[j][axis] = max(positions[j][axis], positions[i][axis] + sizes[i][axis] + gap)
+    return [(x, y) for x, y in positions]
+
+def stitch_components(graph: Dict[str, Any], components: List[Dict[str, Any]],
+                      layouts: List[Dict[str, Any]], gap: float) -> Dict[str, Any]:
+    """Combine the solved layouts of the components into one coordinate frame.
+
+    The components keep their relative input positions (scaled to the solved
+    edge lengths), with their bounding boxes separated by at least `gap`. The
+    first node of the graph is at the origin, as for a single solve.
+    """
+    inputs = [node_coordinates(component) for component in components]
+    solved = [node_coordinates(layout) for layout in layouts]
+    input_length = sum(edge_length_sum(c, xy) for c, xy in zip(components, inputs))
+    solved_length = sum(edge_length_sum(c, xy) for c, xy in zip(components, solved))
+    scale = solved_length / input_length if input_length > 0 else 1
+
+    input_boxes = [bounding_box(xy.values()) for xy in inputs]
+    solved_boxes = [bounding_box(xy.values()) for xy in solved]
+    targets = [(box[0] * scale, box[1] * scale) for box in input_boxes]
+    sizes = [(box[2] - box[0], box[3] - box[1]) for box in solved_boxes]
+    corners = separate_boxes(targets, sizes, input_boxes, gap)
+
+    coordinates: Dict[str, Tuple[float, float]] = {}
+    for xy, box, (x, y) in zip(solved, solved_boxes, corners):
+        for node_id, (nx, ny) in xy.items():
+            coordinates.setdefault(node_id, (nx - box[0] + x, ny - box[1] + y))
+
+    x0, y0 = coordinates[graph['nodes'][0]['id']] if graph['nodes'] else (0, 0)
+    return with_coordinates(graph, (
+        (round(coordinates[node['id']][0] - x0, 5), round(coordinates[node['id']][1] - y0, 5)) for node in graph['nodes']
+    ))
@@ -1,213 +1,342 @@
-from typing import Dict, Any, List, TextIO, Callable
-from dataclasses import dataclass
-import io
-
-from .util import node_index, edge_index
-from .occlusion import create_occlusion_constraints
-from .octolinearity import create_octolinearity_constraints
-
-def create_not_equal(settings: Dict[str, Any]) -> Callable[[str, str, str], List[str]]:
-    """Create constraints to ensure left != right using a boolean variable."""
-    def not_equal(left: str, negative_right: str, boolean: str) -> List[str]:
-        upper_bound = settings['max_edge_length'] + 1
+from typing import Dict, Any, Iterable, Iterator, List, TextIO, Callable, Optional, Set, Tuple
+import itertools
+
+from .network import Network, EdgeRecord
+from .model import Term, Row, Family, Model
+from .writers import format_rows, write_lp
+from .parallel import chunked, ordered_map
+from .spatial import PairReport, adjacent_pairs, occlusion_candidates
+from .occlusion import separation_rows
+from .geometry import classify_pairs
+from .octolinearity import create_octolinearity_constraints, fixed_binaries
+from .bounds import create_coordinate_windows, resolve_settings
+
+def expression_range(terms: Tuple[Term, ...], fixed: Dict[Tuple[str, int], int]) -> Tuple[float, float]:
+    """Range of a linear expression of binary variables, some of them `fixed` to a value."""
+    lower = upper = 0.0
+    for coefficient, family, index in terms:
+        if (family, index) in fixed:
+            lower += coefficient * fixed[(family, index)]
+            upper += coefficient * fixed[(family, index)]
+        else:
+            lower += min(coefficient, 0)
+            upper += max(coefficient, 0)
+    return lower, upper
+
+def create_not_equal(settings: Dict[str, Any]) -> Callable[..., List[Row]]:
+    """Create constraints to ensure left != right using a boolean variable.
+
+    Each of both constraints gets the tightest big-M for the range of
+    left - right, given the `fixed` binaries, unless the `big_m` setting
+    gives a constant.
+    """
+    def not_equal(left: Tuple[Term, ...], negative_right: Tuple[Term, ...], boolean: str, index: int,
+                  fixed: Optional[Dict[Tuple[str, int], int]] = None) -> List[Row]:
+        difference = left + negative_right
+        if settings.get('big_m'):
+            below = above = settings['big_m']
+        else:
+            # left - right must stay below -0.5 unless the boolean is set, and above 0.5 if it is
+            lower, upper = expression_range(difference, fixed or {})
+            below, above = max(upper + 0.5, 0), max(0.5 - lower, 0)
+        # A big-M of 0 leaves the boolean out: the constraint holds either way
         return [
-            f"{left} {negative_right} - {upper_bound} {boolean} <= -0.5",
-            f"{left} {negative_right} - {upper_bound} {boolean} >= {0.5 - upper_bound}"
+            (difference + (((-below, boolean, index),) if below else ()), '<=', -0.5),
+            (difference + (((-above, boolean, index),) if above else ()), '>=', 0.5 - above)
         ]
     return not_equal
 
-@dataclass
-class Variables:
-    """Container for LP variables."""
-    continuous: Dict[str, List[str]]
-    integer: Dict[str, List[str]]
-    binary: Dict[str, List[str]]
-    coefficients: Dict[str, List[float]]
-
-def create_generate_lp(graph: Dict[str, Any], settings: Dict[str, Any]) -> Callable[[TextIO], None]:
-    """Create a function that generates the LP problem for the given graph."""
-    
-    def generate_lp(output_stream: TextIO) -> None:
-        # Initialize constraints
-        constraints: List[str] = []
-        lazy_constraints: List[str] = []
-        
-        # Create constraint generators
-        occlusion_constraints = create_occlusion_constraints(settings)
-        octolinearity_constraints = create_octolinearity_constraints(settings)
-        not_equal = create_not_equal(settings)
-        
-        # Initialize variables
-        variables = Variables(
-            continuous={
-                'vx': [f"vx{node_index(graph, n['id'])}" for n in graph['nodes']],
-                'vy': [f"vy{node_index(graph, n['id'])}" for n in graph['nodes']],
-                'l': [f"l{i}" for i in range(len(graph['edges']))],
-                'pa': [f"pa{i}" for i in range(len(graph['edges']))],
-                'pb': [f"pb{i}" for i in range(len(graph['edges']))],
-                'pc': [f"pc{i}" for i in range(len(graph['edges']))],
-                'pd': [f"pd{i}" for i in range(len(graph['edges']))]
-            },
-            integer={'q': []},
-            binary={
-                'a': [f"a{i}" for i in range(len(graph['edges']))],
-                'b': [f"b{i}" for i in range(len(graph['edges']))],
-                'c': [f"c{i}" for i in range(len(graph['edges']))],
-                'd': [f"d{i}" for i in range(len(graph['edges']))],
-                'h': [], 'oa': [], 'ob': [], 'oc': [], 'od': [],
-                'ua': [], 'ub': [], 'uc': [], 'ud': []
-            },
-            coefficients={'q': []}
+def direction(edge: int, sign: int = 1) -> Tuple[Term, ...]:
+    """Linear expression encoding the direction of an edge (`3 a - 3 b + c - d`)."""
+    return ((3 * sign, 'a', edge), (-3 * sign, 'b', edge), (sign, 'c', edge), (-sign, 'd', edge))
+
+# variables of each adjacent edge pair
+ADJACENCY_FAMILIES = ['h', 'oa', 'ob', 'oc', 'od', 'ua', 'ub', 'uc', 'ud']
+
+def is_consecutive(outer: EdgeRecord, inner: EdgeRecord) -> bool:
+    """Check if one edge continues where the other ends."""
+    return outer.target == inner.source or outer.source == inner.target
+
+# number of occlusion candidate pairs classified at once
+PAIR_BATCH = 1024
+
+def octolinearity_rows(network: Network, settings: Dict[str, Any], start: int = 0,
+                       stop: Optional[int] = None) -> Iterator[Row]:
+    """Produce the octolinearity constraints of all edges, or of the edges `start` to `stop`."""
+    octolinearity_constraints = create_octolinearity_constraints(settings)
+    for edge in network.edges[start:stop]:
+        yield from octolinearity_constraints(network, edge)
+
+def adjacency_rows(network: Network, adjacent: List[Tuple[int, int]], start: int = 0,
+                   stop: Optional[int] = None) -> Iterator[Row]:
+    """Produce the angle constraints of adjacent edge pairs, numbered in the given order.
+
+    With `start` and `stop`, only the pairs with these suffixes are produced.
+    """
+    edges = network.edges
+    for suffix, (o, i) in enumerate(adjacent[start:stop], start):
+        yield (
+            ((1, 'q', suffix), (-1, 'oa', suffix), (-1, 'ob', suffix), (-1, 'oc', suffix), (-1, 'od', suffix)),
+            '=', 0
         )
-        
-        # Generate octolinearity constraints
-        for i, edge in enumerate(graph['edges']):
-            constraints.extend(octolinearity_constraints(graph, edge))
-        
-        # Generate edge occlusion constraints
-        num_adjacent_edge_constraints = 0
-        edges = graph['edges']
-        for o in range(len(edges)):
-            for i in range(o + 1, len(edges)):
-                outer = edges[o]
-                inner = edges[i]
-                
-                # Check if edges are adjacent
-                outer_nodes = {outer['source'], outer['target']}
-                inner_nodes = {inner['source'], inner['target']}
-                if len(outer_nodes & inner_nodes) > 0:  # intersection
-                    # Handle adjacent edges
-                    suffix = str(num_adjacent_edge_constraints)
-                    
-                    # Add variables
-                    for var_type in ['h', 'oa', 'ob', 'oc', 'od', 'ua', 'ub', 'uc', 'ud']:
-                        variables.binary[var_type].append(f"{var_type}{suffix}")
-                    variables.integer['q'].append(f"q{suffix}")
-                    
-                    # Set coefficients for same/different lines
-                    outer_lines = set(outer['metadata']['lines'])
-                    inner_lines = set(inner['metadata']['lines'])
-                    share_lines = bool(outer_lines & inner_lines)
-                    variables.coefficients['q'].append(1.0 if share_lines else 0.25)
-                    
-                    # For edges sharing lines, limit angle to >= 90°
-
-                    # TODO: remove this
-                    # if share_lines:
-                    #     constraints.append(f"q{suffix} <= 2")
-                    
-                    # Add constraints
-                    constraints.append(
-                        f"q{suffix} - oa{suffix} - ob{suffix} - oc{suffix} - od{suffix} = 0"
-                    )
-                    
-                    # Handle edge direction constraints
-                    if outer['target'] == inner['source'] or outer['source'] == inner['target']:
-                        lazy_constraints.extend(
-                            not_equal(
-                                f"3 a{o} - 3 b{o} + c{o} - d{o}",
-                                f"+ 3 a{i} - 3 b{i} + c{i} - d{i}",
-                                f"h{suffix}"
-                            )
-                        )
-                        # Add direction-specific constraints
-                        for dir_var in ['a', 'b', 'c', 'd']:
-                            constraints.append(
-                                f"{dir_var}{o} + {dir_var}{i} - 2 u{dir_var}{suffix} - "
-                                f"o{dir_var}{suffix} = 0"
-                            )
-                    else:
-                        lazy_constraints.extend(
-                            not_equal(
-                                f"3 a{o} - 3 b{o} + c{o} - d{o}",
-                                f"- 3 a{i} + 3 b{i} - c{i} + d{i}",
-                                f"h{suffix}"
-                            )
-                        )
-                        # Add opposite direction constraints
-                        constraints.extend([
-                            f"a{o} + b{i} - 2 ua{suffix} - oa{suffix} = 0",
-                            f"b{o} + a{i} - 2 ub{suffix} - ob{suffix} = 0",
-                            f"c{o} + d{i} - 2 uc{suffix} - oc{suffix} = 0",
-                            f"d{o} + c{i} - 2 ud{suffix} - od{suffix} = 0"
-                        ])
-                    
-                    num_adjacent_edge_constraints += 1
-                else:
-                    # Handle non-adjacent edges
-                    constraints.extend(occlusion_constraints(graph, outer, inner))
-        
-        # Write LP file
-        def write(text: str) -> None:
-            output_stream.write(text + '\n')
-            
-        def write_tab(text: str) -> None:
-            output_stream.write(' ' + text + '\n')
-            
-        # 1. Objective function
-        write('Minimize')
-        
-        # Linearized sum of edge lengths
-        lengths = ' + '.join(f"3 {l}" for l in variables.continuous['l'])
-        
-        # Sum of angle differences
-        angles = ' + '.join(
-            f"{4 * coef} {q}"
-            for q, coef in zip(variables.integer['q'], variables.coefficients['q'])
+
+        # For edges sharing lines, limit angle to >= 90°
+
+        # TODO: remove this
+        # if edges[o].shares_lines(edges[i]):
+        #     yield (((1, 'q', suffix),), '<=', 2)
+
+        # Handle edge direction constraints
+        if is_consecutive(edges[o], edges[i]):
+            # Add direction-specific constraints
+            for dir_var in ['a', 'b', 'c', 'd']:
+                yield (
+                    ((1, dir_var, o), (1, dir_var, i), (-2, f"u{dir_var}", suffix), (-1, f"o{dir_var}", suffix)),
+                    '=', 0
+                )
+        else:
+            # Add opposite direction constraints
+            for dir_var, opposite in [('a', 'b'), ('b', 'a'), ('c', 'd'), ('d', 'c')]:
+                yield (
+                    ((1, dir_var, o), (1, opposite, i), (-2, f"u{dir_var}", suffix), (-1, f"o{dir_var}", suffix)),
+                    '=', 0
+                )
+
+def occlusion_rows(network: Network, settings: Dict[str, Any], pairs: Iterable[Tuple[int, int]],
+                   report: PairReport) -> Iterator[Row]:
+    """Produce the occlusion constraints of non-adjacent edge pairs, classifying them in batches."""
+    edges = network.edges
+    for batch in chunked(pairs, PAIR_BATCH):
+        directions, ahead, _ = classify_pairs(network, batch)
+        for (o, i), direction, first_ahead in zip(batch, directions, ahead):
+            if direction < 0:
+                continue
+            rows = separation_rows(edges[o], edges[i], direction, first_ahead)
+            report.occlusion_constraints += len(rows)
+            yield from rows
+
+def not_equal_rows(network: Network, settings: Dict[str, Any], adjacent: List[Tuple[int, int]], start: int = 0,
+                   stop: Optional[int] = None) -> Iterator[Row]:
+    """Produce the constraints forcing different directions of adjacent edges (lazy constraints)."""
+    not_equal = create_not_equal(settings)
+    edges = network.edges
+    for suffix, (o, i) in enumerate(adjacent[start:stop], start):
+        fixed = {(family, e): value for e in (o, i) for family, value in fixed_binaries(edges[e].source_directions)}
+        if is_consecutive(edges[o], edges[i]):
+            yield from not_equal(direction(o), direction(i), 'h', suffix, fixed)
+        else:
+            yield from not_equal(direction(o), direction(i, -1), 'h', suffix, fixed)
+
+def counted_rows(rows: Iterable[Any], report: PairReport, family: str) -> Iterator[Any]:
+    """Pass rows through, counting them as rows of the constraint family in the report."""
+    count = 0
+    for row in rows:
+        count += 1
+        yield row
+    report.rows[family] = count
+
+# number of edges, adjacent pairs or occlusion candidate pairs per shard of parallel generation
+SHARD_SIZE = 4096
+
+# state of a shard worker process, see `init_shard_worker`
+_worker: Dict[str, Any] = {}
+
+def init_shard_worker(network: Network, settings: Dict[str, Any], adjacent: List[Tuple[int, int]],
+                      names: Optional[List[str]], offsets: Dict[str, int]) -> None:
+    """Receive the network once per worker process, instead of with every shard."""
+    _worker.update(network=network, settings=settings, adjacent=adjacent, names=names, offsets=offsets)
+
+def produce_shard(task: Tuple[str, Any]) -> Tuple[Any, int, str, int]:
+    """Produce the rows of one shard in a worker process.
+
+    Returns the rows, or their LP lines if the worker knows the column names,
+    the number of occlusion constraints among them, and the constraint family
+    and number of the rows.
+    """
+    kind, shard = task
+    network, settings, adjacent = _worker['network'], _worker['settings'], _worker['adjacent']
+    report = PairReport(total_pairs=0, adjacent_pairs=0)
+    if kind == 'octolinearity':
+        rows: Iterator[Row] = octolinearity_rows(network, settings, *shard)
+    elif kind == 'adjacency':
+        rows = adjacency_rows(network, adjacent, *shard)
+    elif kind == 'occlusion':
+        rows = occlusion_rows(network, settings, shard, report)
+    else:
+        rows = not_equal_rows(network, settings, adjacent, *shard)
+
+    if _worker['names'] is None:
+        result: Any = list(rows)
+        count = len(result)
+    else:
+        lines = list(format_rows(rows, _worker['names'], _worker['offsets']))
+        count = len(lines)
+        lines.append('')
+        result = '\n'.join(lines)
+    return result, report.occlusion_constraints, kind, count
+
+def shard_tasks(network: Network, adjacent: List[Tuple[int, int]],
+                candidates: Iterator[Tuple[int, int]]) -> Iterator[Tuple[str, Any]]:
+    """Split the row families into shards, in the order of the serial row stream."""
+    def ranges(count: int) -> Iterator[Tuple[int, int]]:
+        for start in range(0, count, SHARD_SIZE):
+            yield start, min(start + SHARD_SIZE, count)
+
+    for shard in ranges(len(network.edges)):
+        yield 'octolinearity', shard
+    for shard in ranges(len(adjacent)):
+        yield 'adjacency', shard
+    for pairs in chunked(candidates, SHARD_SIZE):
+        yield 'occlusion', pairs
+    for shard in ranges(len(adjacent)):
+        yield 'not_equal', shard
+
+def sharded_results(network: Network, settings: Dict[str, Any], adjacent: List[Tuple[int, int]],
+                    candidates: Iterator[Tuple[int, int]], report: PairReport, jobs: int,
+                    names: Optional[List[str]] = None, offsets: Optional[Dict[str, int]] = None) -> Iterator[Any]:
+    """Produce all rows except the fixed coordinates in worker processes, yielding the shards in serial order."""
+    results = ordered_map(
+        produce_shard, shard_tasks(network, adjacent, candidates), jobs,
+        init_shard_worker, (network, settings, adjacent, names, offsets or {})
+    )
+    for family in ('octolinearity', 'adjacency', 'occlusion', 'not_equal'):
+        report.rows.setdefault(family, 0)
+    for result, occlusion_constraints, family, count in results:
+        report.occlusion_constraints += occlusion_constraints
+        report.rows[family] += count
+        yield result
+
+def create_stream_problem(network: Network, settings: Dict[str, Any],
+                          fixed: Optional[Dict[int, Tuple[float, float]]] = None) -> Callable[..., Tuple[Model, Iterator[Row], PairReport]]:
+    """Create a function that declares the MILP columns for the given network and streams its rows.
+
+    Nodes in `fixed` (by index) keep the given solver coordinates through their
+    bounds, which then also replace fixing the first node at the offset. The
+    coordinate columns are bounded by the windows of `create_coordinate_windows`.
+    """
+    settings = resolve_settings(network, settings)
+    windows: Dict[str, List[Tuple[float, float]]] = {}
+
+    def stream_problem(occlusion_pairs: Optional[Set[Tuple[int, int]]] = None, jobs: int = 1,
+                       short_names: Optional[bool] = None) -> Tuple[Model, Iterator[Any], PairReport]:
+        """Declare the columns and objective, and return a lazy stream of all constraint rows.
+
+        Occlusion constraints are produced for nearby edge pairs, or only for
+        `occlusion_pairs` if given. The report is complete once the rows are consumed.
+        With `jobs` > 1, the rows are produced by that many worker processes; if
+        `short_names` is also given, the stream contains their LP lines as text
+        blocks instead (see `write_lp`).
+        """
+        edges = network.edges
+        adjacent = adjacent_pairs(network)
+        candidates, report = occlusion_candidates(network, settings.get('occlusion_radius'), adjacent, occlusion_pairs)
+
+        # Initialize variables
+        num_nodes = len(network.node_ids)
+        num_edges = len(edges)
+        num_adjacent = len(adjacent)
+        model = Model([
+            Family('l', num_edges, settings['min_edge_length'], settings['max_edge_length']),
+            Family('vx', num_nodes, settings['offset'] - settings['max_width']/2, settings['offset'] + settings['max_width']/2),
+            Family('vy', num_nodes, settings['offset'] - settings['max_height']/2, settings['offset'] + settings['max_height']/2),
+            Family('pa', num_edges, 0, None),
+            Family('pb', num_edges, 0, None),
+            Family('pc', num_edges, 0, None),
+            Family('pd', num_edges, 0, None),
+            Family('q', num_adjacent, 0, 3, 'integer'),
+        ] + [
+            Family(name, num_edges, 0, 1, 'binary') for name in ['a', 'b', 'c', 'd']
+        ] + [
+            Family(name, num_adjacent, 0, 1, 'binary') for name in ADJACENCY_FAMILIES
+        ])
+
+        # Bound the coordinates of each node by its window
+        if not windows:
+            windows.update(create_coordinate_windows(network, settings, fixed))
+        for family, family_windows in windows.items():
+            for node, (lower, upper) in enumerate(family_windows):
+                model.lower[model.column(family, node)] = lower
+                model.upper[model.column(family, node)] = upper
+
+        # Scale the length bounds of contracted chain edges
+        for edge in edges:
+            if edge.weight != 1:
+                model.lower[model.column('l', edge.index)] = settings['min_edge_length'] * edge.weight
+                model.upper[model.column('l', edge.index)] = settings['max_edge_length'] * edge.weight
+
+        # Minimize the sum of angle differences, weighted by same/different lines,
+        # and the linearized sum of edge lengths
+        model.add_objective(
+            (4 * (1.0 if edges[o].shares_lines(edges[i]) else 0.25), 'q', suffix)
+            for suffix, (o, i) in enumerate(adjacent)
         )
-        
-        # Write objective function
-        write_tab(f"{angles} + {lengths}")
-        
-        # 2. Constraints
-        write('Subject To')
-        # Fix one coordinate pair
-        write_tab(f"vx0 = {settings['offset']}")
-        write_tab(f"vy0 = {settings['offset']}")
-        
-        # Write all constraints
-        for c in constraints + lazy_constraints:
-            write_tab(c)
-            
-        # 3. Bounds
-        write('Bounds')
-        # Edge length variables
-        for l in variables.continuous['l']:
-            write_tab(f"{settings['min_edge_length']} <= {l} <= {settings['max_edge_length']}")
-            
-        # Node coordinates
-        for vx in variables.continuous['vx']:
-            write_tab(
-                f"{settings['offset'] - settings['max_width']/2} <= {vx} <= "
-                f"{settings['offset'] + settings['max_width']/2}"
+        model.add_objective((3, 'l', e) for e in range(num_edges))
+
+        # Fix one coordinate pair, or all given ones
+        if fixed:
+            for node, (x, y) in fixed.items():
+                model.lower[model.column('vx', node)] = model.upper[model.column('vx', node)] = x
+                model.lower[model.column('vy', node)] = model.upper[model.column('vy', node)] = y
+            fixed_rows: List[Row] = []
+        else:
+            fixed_rows = [
+                (((1, 'vx', 0),), '=', settings['offset']),
+                (((1, 'vy', 0),), '=', settings['offset'])
+            ]
+        report.rows['fixed'] = len(fixed_rows)
+        if jobs <= 1:
+            rows: Iterator[Any] = itertools.chain(
+                fixed_rows,
+                counted_rows(octolinearity_rows(network, settings), report, 'octolinearity'),
+                counted_rows(adjacency_rows(network, adjacent), report, 'adjacency'),
+                counted_rows(occlusion_rows(network, settings, candidates, report), report, 'occlusion'),
+                counted_rows(not_equal_rows(network, settings, adjacent), report, 'not_equal')
             )
-        for vy in variables.continuous['vy']:
-            write_tab(
-                f"{settings['offset'] - settings['max_height']/2} <= {vy} <= "
-                f"{settings['offset'] + settings['max_height']/2}"
+        elif short_names is None:
+            rows = itertools.chain(
+                fixed_rows,
+                itertools.chain.from_iterable(
+                    sharded_results(network, settings, adjacent, candidates, report, jobs)
+                )
             )
-            
-        # Helper variables
-        for var_type in ['pa', 'pb', 'pc', 'pd']:
-            for var in variables.continuous[var_type]:
-                write_tab(f"0 <= {var}")
-                
-        # Edge angle variables
-        for q in variables.integer['q']:
-            write_tab(f"0 <= {q} <= 3")
-            
-        # 4. Integer variables
-        write('General')
-        for q in variables.integer['q']:
-            write_tab(q)
-            
-        # 5. Binary variables
-        write('Binary')
-        for var_type, vars_list in variables.binary.items():
-            for var in vars_list:
-                write_tab(var)
-
-        # 6. End
-        write('End')
-
-    return generate_lp 
+        else:
+            names = model.column_names(short_names)
+            fixed_lines = list(format_rows(fixed_rows, names, model.offsets))
+            rows = itertools.chain(
+                ['\n'.join(fixed_lines + [''])],
+                sharded_results(network, settings, adjacent, candidates, report, jobs, names, model.offsets)
+            )
+        return model, rows, report
+
+    return stream_problem
+
+def create_build_problem(network: Network, settings: Dict[str, Any],
+                         fixed: Optional[Dict[int, Tuple[float, float]]] = None) -> Callable[..., Tuple[Model, PairReport]]:
+    """Create a function that builds the MILP for the given network, with all rows in memory."""
+    stream_problem = create_stream_problem(network, settings, fixed)
+
+    def build_problem(occlusion_pairs: Optional[Set[Tuple[int, int]]] = None, jobs: int = 1) -> Tuple[Model, PairReport]:
+        """Build the MILP, with occlusion constraints for nearby edge pairs or only for `occlusion_pairs` if given."""
+        model, rows, report = stream_problem(occlusion_pairs, jobs)
+        model.add_rows(rows)
+        return model, report
+
+    return build_problem
+
+def create_generate_lp(network: Network, settings: Dict[str, Any],
+                       fixed: Optional[Dict[int, Tuple[float, float]]] = None) -> Callable[..., PairReport]:
+    """Create a function that generates the LP problem for the given network."""
+    stream_problem = create_stream_problem(network, settings, fixed)
+
+    def generate_lp(output_stream: TextIO, occlusion_pairs: Optional[Set[Tuple[int, int]]] = None,
+                    short_names: bool = False, jobs: int = 1) -> PairReport:
+        """Stream the LP to the output, with occlusion constraints for nearby edge pairs or only for `occlusion_pairs` if given."""
+        if jobs > 1:
+            model, blocks, report = stream_problem(occlusion_pairs, jobs, short_names)
+            write_lp(model, output_stream, short_names, blocks=blocks)
+        else:
+            model, rows, report = stream_problem(occlusion_pairs)
+            write_lp(model, output_stream, short_names, rows)
+        return report
+
+    return generate_lp
@@ -0,0 +1,117 @@
+from typing import List, Sequence, Tuple
+import math
+
+from .network import Network
+
+try:
+    import numpy
+except ImportError:  # fall back to the pure Python kernels
+    numpy = None
+
+# separation directions of edge pairs, in order of preference on equal gaps
+DIRECTIONS = ['west-east', 'south-north', 'southwest-northeast', 'northwest-southeast']
+
+# direction ids around the full circle, including the neighbours -1 and 9 of 0 and 8
+DIRECTION_CANDIDATES = list(range(-1, 10))
+
+def mod8(n: int) -> int:
+    """Fix mod 8 for negative numbers close to 0."""
+    return (n + 16) % 8
+
+def ang(x: float, y: float) -> float:
+    """Calculate angle. 9 o'clock = 0/8, 6 o'clock = 2, 3 o'clock = 4, 12 o'clock = 6."""
+    return 4 * ((math.atan2(y, x) / math.pi) + 1)
+
+def closest_direction_ids(angle: float) -> List[int]:
+    """Find the 3 closest direction ids (0-7, see `ang`) for a given angle, nearest first."""
+    # Stable sort, ties are won by the smaller direction like `min` over the candidates would
+    ranked = sorted(DIRECTION_CANDIDATES, key=lambda d: abs(d - angle))
+    return [mod8(d) for d in ranked[:3]]
+
+def direction_ids(dxs: Sequence[float], dys: Sequence[float]) -> List[List[int]]:
+    """Find the 3 closest direction ids of all edge vectors (dx, dy) in one pass."""
+    if numpy is None:
+        return [closest_direction_ids(ang(dx, dy)) for dx, dy in zip(dxs, dys)]
+
+    angles = 4 * ((numpy.arctan2(numpy.asarray(dys, dtype=float), numpy.asarray(dxs, dtype=float)) / math.pi) + 1)
+    candidates = numpy.array(DIRECTION_CANDIDATES)
+    distances = numpy.abs(candidates[numpy.newaxis, :] - angles[:, numpy.newaxis])
+    ranked = candidates[numpy.argsort(distances, axis=1, kind='stable')[:, :3]]
+    return ((ranked + 16) % 8).tolist()
+
+def classify_pair(network: Network, o: int, i: int) -> Tuple[int, bool, float]:
+    """Classify the separation of two edges in the input graph.
+
+    Returns the index of the preferred direction in `DIRECTIONS` (-1 if the
+    edges are not separable), whether the first edge lies ahead of the second
+    in that direction, and the minimum gap between their nodes along it.
+    """
+    edges, xs, ys = network.edges, network.xs, network.ys
+    edge1, edge2 = edges[o], edges[i]
+    e1sx, e1sy = xs[edge1.source], ys[edge1.source]
+    e1tx, e1ty = xs[edge1.target], ys[edge1.target]
+    e2sx, e2sy = xs[edge2.source], ys[edge2.source]
+    e2tx, e2ty = xs[edge2.target], ys[edge2.target]
+
+    # Calculate distances in all 4 directions for both edges in the input graph
+    direction_distances = [
+        [e1sx - e2sx, e1sx - e2tx, e1tx - e2sx, e1tx - e2tx],
+        [e1sy - e2sy, e1sy - e2ty, e1ty - e2sy, e1ty - e2ty],
+        [
+            (e1sx - e1sy) - (e2sx - e2sy),
+            (e1sx - e1sy) - (e2tx - e2ty),
+            (e1tx - e1ty) - (e2sx - e2sy),
+            (e1tx - e1ty) - (e2tx - e2ty)
+        ],
+        [
+            (e1sx + e1sy) - (e2sx + e2sy),
+            (e1sx + e1sy) - (e2tx + e2ty),
+            (e1tx + e1ty) - (e2sx + e2sy),
+            (e1tx + e1ty) - (e2tx + e2ty)
+        ]
+    ]
+
+    # Find preferred direction with longest distance, where the edges don't overlap
+    best, best_positive, best_gap = -1, 0, -1.0
+    for direction, distances in enumerate(direction_distances):
+        positive = sum(1 for d in distances if d > 0)
+        gap = min(abs(d) for d in distances)
+        if positive in (0, 4) and gap > best_gap:
+            best, best_positive, best_gap = direction, positive, gap
+    return best, best_positive >= 3, max(best_gap, 0.0)
+
+def classify_pairs(network: Network, pairs: Sequence[Tuple[int, int]]) -> Tuple[List[int], List[bool], List[float]]:
+    """Classify the separation of many edge pairs at once, see `classify_pair`."""
+    if numpy is None or not pairs:
+        classified = [classify_pair(network, o, i) for o, i in pairs]
+        return [c[0] for c in classified], [c[1] for c in classified], [c[2] for c in classified]
+
+    xs = numpy.frombuffer(network.xs, dtype=float)
+    ys = numpy.frombuffer(network.ys, dtype=float)
+    sources = numpy.frombuffer(network.sources, dtype=numpy.intc)
+    targets = numpy.frombuffer(network.targets, dtype=numpy.intc)
+    index = numpy.asarray(pairs, dtype=numpy.intp)
+    nodes1 = (sources[index[:, 0]], targets[index[:, 0]])
+    nodes2 = (sources[index[:, 1]], targets[index[:, 1]])
+
+    # Node coordinates projected on the 4 directions, shape (direction, pair)
+    def project(nodes):
+        return numpy.stack([xs[nodes], ys[nodes], xs[nodes] - ys[nodes], xs[nodes] + ys[nodes]])
+
+    # Distances of the 4 node pairs (s-s, s-t, t-s, t-t), shape (direction, pair, node pair)
+    p1s, p1t = project(nodes1[0]), project(nodes1[1])
+    p2s, p2t = project(nodes2[0]), project(nodes2[1])
+    distances = numpy.stack([p1s - p2s, p1s - p2t, p1t - p2s, p1t - p2t], axis=-1)
+
+    positive = (distances > 0).sum(axis=-1)
+    gaps = numpy.abs(distances).min(axis=-1)
+    separable = (positive == 0) | (positive == 4)
+    scores = numpy.where(separable, gaps, -1.0)
+
+    # First direction with the longest gap, like `max` over the directions
+    best = scores.argmax(axis=0)
+    columns = numpy.arange(len(pairs))
+    best_gap = scores[best, columns]
+    directions = numpy.where(best_gap >= 0, best, -1)
+    ahead = positive[best, columns] >= 3
+    return directions.tolist(), ahead.tolist(), numpy.maximum(best_gap, 0.0).tolist()
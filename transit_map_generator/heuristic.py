@@ -0,0 +1,243 @@
+from typing import Dict, Any, Callable, List, Tuple
+import math
+
+from .network import Network
+from .revise_solution import with_coordinates
+from .separation import MIN_SEPARATION, find_conflicts
+from .warm_start import DIRECTION_BINARIES
+
+# edge vector of each direction id for an edge of length 1 (the maximum norm, like the `l` variables)
+DIRECTION_VECTORS = [(a - b, c - d) for a, b, c, d in (DIRECTION_BINARIES[i] for i in range(8))]
+
+# relaxation rounds of the heuristic layout, the last ones only fit the edges without pushing nodes apart
+ITERATIONS = 300
+FIT_ROUNDS = 60
+
+# crowded node pairs are searched within this many minimum edge lengths, every this many rounds
+REPULSION_RADIUS = 2
+REPULSION_REFRESH = 10
+
+# local search rounds separating conflicting edges, each followed by this many relaxation rounds
+REPAIR_ROUNDS = 30
+REPAIR_ITERATIONS = 80
+
+def import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Make sure 'numpy' is installed to use the heuristic engine")
+    return numpy
+
+def allowed_directions(network: Network) -> List[Tuple[int, int]]:
+    """Directions each edge may take: its main and secondary direction.
+
+    These are the directions the octilinearity constraints leave to the MILP.
+    """
+    return [
+        (edge.source_directions[0], edge.source_directions[1] if len(edge.source_directions) > 1 else edge.source_directions[0])
+        for edge in network.edges
+    ]
+
+def close_pairs(network: Network, points: List[Tuple[float, float]], radius: float) -> Tuple[List[int], List[int]]:
+    """Unconnected node pairs (i < j) in neighbouring cells of a grid of `radius` cells."""
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((math.floor(x / radius), math.floor(y / radius)), []).append(i)
+    firsts, seconds = [], []
+    for (cx, cy), members in cells.items():
+        nearby = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in cells.get((cx + dx, cy + dy), ())]
+        for i in members:
+            for j in nearby:
+                if i < j and not network.connected(i, j):
+                    firsts.append(i)
+                    seconds.append(j)
+    return firsts, seconds
+
+def length_violations(network: Network, settings: Dict[str, Any],
+                      coordinates: List[Tuple[float, float]], tolerance: float = 1e-4) -> List[int]:
+    """Edges whose length (the maximum norm, like the `l` variables) is outside the edge length bounds."""
+    violations = []
+    for e, edge in enumerate(network.edges):
+        (sx, sy), (tx, ty) = coordinates[edge.source], coordinates[edge.target]
+        length = max(abs(tx - sx), abs(ty - sy))
+        if not (settings['min_edge_length'] * edge.weight - tolerance <= length
+                <= settings['max_edge_length'] * edge.weight + tolerance):
+            violations.append(e)
+    return violations
+
+def create_heuristic_layout(network: Network, settings: Dict[str, Any]) -> Callable[..., Dict[str, Any]]:
+    """Create a function laying out the network without a solver, in the format of the revised solver solution.
+
+    The input geometry is scaled so that the median edge has the minimum edge
+    length. Each relaxation round greedily snaps every edge to the closer of
+    its two allowed directions (see `allowed_directions`), with its length
+    clipped to the minimum and maximum edge length, and moves the nodes
+    towards the positions realizing the snapped edges (a Jacobi step of their
+    least squares fit), while pushing apart unconnected nodes closer than the
+    minimum edge length. A local search then separates conflicting edge pairs
+    (see `separation.find_conflicts`) or edges outside the length bounds (see
+    `length_violations`) and relaxes again, keeping the layout with the fewest
+    of both. Finally, the snapped edges are laid out along a spanning forest,
+    so that all tree edges are exactly octilinear and within the length
+    bounds, and only edges closing a cycle may keep a small error.
+    """
+    numpy = import_numpy()
+    num_nodes = len(network.node_ids)
+    sources = numpy.frombuffer(network.sources, dtype=numpy.intc).astype(numpy.intp)
+    targets = numpy.frombuffer(network.targets, dtype=numpy.intc).astype(numpy.intp)
+    weights = numpy.array([edge.weight for edge in network.edges], dtype=float)
+    lower = settings['min_edge_length'] * weights
+    upper = settings['max_edge_length'] * weights
+    distance = settings['min_edge_length']
+
+    # Allowed direction vectors of each edge, shape (edge, candidate, 2)
+    directions = numpy.array(DIRECTION_VECTORS, dtype=float)[numpy.array(allowed_directions(network), dtype=numpy.intp).reshape(-1, 2)]
+    norms = numpy.linalg.norm(directions, axis=2)
+    rows = numpy.arange(len(network.edges))
+    degrees = numpy.maximum(numpy.bincount(numpy.concatenate([sources, targets]), minlength=num_nodes), 1)[:, None]
+
+    def snap(points: Any) -> Any:
+        """Edge vectors snapped to their closest allowed direction, with the length clipped to the bounds."""
+        vectors = points[targets] - points[sources]
+        projections = numpy.einsum('ecx,ex->ec', directions, vectors) / norms
+        best = projections.argmax(axis=1)
+        lengths = numpy.clip(projections[rows, best] / norms[rows, best], lower, upper)
+        return directions[rows, best] * lengths[:, None]
+
+    def repulsion(points: Any, firsts: Any, seconds: Any) -> Any:
+        """Displacement pushing apart the node pairs closer than the minimum edge length, halfway each."""
+        displacement = numpy.zeros_like(points)
+        if not len(firsts):
+            return displacement
+        deltas = points[firsts] - points[seconds]
+        # Coinciding nodes are pushed apart along a fixed direction
+        deltas[numpy.abs(deltas).max(axis=1) < 1e-9] = (1.0, 0.5)
+        lengths = numpy.linalg.norm(deltas, axis=1)
+        push = (numpy.maximum(distance - lengths, 0.0) / lengths / 2)[:, None] * deltas
+        numpy.add.at(displacement, firsts, push)
+        numpy.add.at(displacement, seconds, -push)
+        return displacement
+
+    def relax(points: Any, iterations: int) -> Any:
+        """Alternate snapping and fitting the edges, pushing crowded nodes apart except in the last rounds."""
+        points = points.copy()
+        firsts = seconds = numpy.zeros(0, dtype=numpy.intp)
+        for round_ in range(iterations):
+            # Move both ends of each edge halfway towards its snapped vector, averaged per node
+            residuals = (points[targets] - points[sources] - snap(points)) / 2
+            displacement = numpy.zeros_like(points)
+            numpy.add.at(displacement, sources, residuals)
+            numpy.add.at(displacement, targets, -residuals)
+            displacement /= degrees
+            if round_ < iterations - FIT_ROUNDS:
+                if round_ % REPULSION_REFRESH == 0:
+                    firsts, seconds = (numpy.array(nodes, dtype=numpy.intp)
+                                       for nodes in close_pairs(network, points.tolist(), REPULSION_RADIUS * distance))
+                displacement += repulsion(points, firsts, seconds)
+            points += displacement
+        return points
+
+    def place_along_tree(points: Any) -> Any:
+        """Node positions realizing the snapped edge vectors exactly along a spanning forest.
+
+        The forest takes the edges with the least room within the length
+        bounds first, so the errors of the edges closing a cycle fall on the
+        edges that can absorb them best.
+        """
+        vectors = snap(points)
+        lengths = numpy.abs(vectors).max(axis=1)
+        room = numpy.minimum(lengths - lower, upper - lengths)
+        snapped = vectors.tolist()
+        # Kruskal's algorithm on a union-find of the nodes
+        parents = list(range(num_nodes))
+
+        def find(node: int) -> int:
+            while parents[node] != node:
+                parents[node] = parents[parents[node]]
+                node = parents[node]
+            return node
+
+        tree: List[List[int]] = [[] for _ in range(num_nodes)]
+        for e in numpy.argsort(room, kind='stable').tolist():
+            edge = network.edges[e]
+            source, target = find(edge.source), find(edge.target)
+            if source != target:
+                parents[source] = target
+                tree[edge.source].append(e)
+                tree[edge.target].append(e)
+
+        result = points.tolist()
+        placed = [False] * num_nodes
+        for root in range(num_nodes):
+            if placed[root]:
+                continue
+            placed[root] = True
+            queue = [root]
+            for node in queue:
+                for e in tree[node]:
+                    edge = network.edges[e]
+                    other = edge.target if edge.source == node else edge.source
+                    if placed[other]:
+                        continue
+                    sign = 1 if edge.source == node else -1
+                    result[other] = [result[node][0] + sign * snapped[e][0], result[node][1] + sign * snapped[e][1]]
+                    placed[other] = True
+                    queue.append(other)
+        # Move the first node to the origin, like the fixed first node of the MILP
+        x0, y0 = result[0]
+        return [(round(x - x0, 5), round(y - y0, 5)) for x, y in result]
+
+    def conflicts(coordinates: List[Tuple[float, float]]) -> List[Tuple[int, int]]:
+        layout = {'nodes': [{'metadata': {'x': x, 'y': y}} for x, y in coordinates]}
+        return sorted(find_conflicts(network, layout))
+
+    def separate(points: Any, pairs: List[Tuple[int, int]], edges: List[int]) -> Any:
+        """Move the nodes of each conflicting edge pair apart, along the vector between the edge midpoints,
+        and the nodes of each edge outside the length bounds apart or together, along the edge."""
+        points = points.copy()
+        displacement = numpy.zeros_like(points)
+        for o, i in pairs:
+            first, second = network.edges[o], network.edges[i]
+            away = (points[first.source] + points[first.target] - points[second.source] - points[second.target]) / 2
+            length = numpy.linalg.norm(away)
+            away = away / length if length > 1e-9 else numpy.array([0.5, 1.0])
+            for node in (first.source, first.target):
+                displacement[node] += away * MIN_SEPARATION
+            for node in (second.source, second.target):
+                displacement[node] -= away * MIN_SEPARATION
+        for e in edges:
+            edge = network.edges[e]
+            vector = points[edge.target] - points[edge.source]
+            length = numpy.abs(vector).max()
+            along = vector / length if length > 1e-9 else numpy.array([1.0, 0.0])
+            stretch = (numpy.clip(length, lower[e], upper[e]) - length) / 2 * along
+            displacement[edge.target] += stretch
+            displacement[edge.source] -= stretch
+        return points + displacement / degrees
+
+    def heuristic_layout(iterations: int = ITERATIONS, repair_rounds: int = REPAIR_ROUNDS) -> Dict[str, Any]:
+        """Layout of the network, in `iterations` relaxation rounds and up to `repair_rounds` local search rounds."""
+        points = numpy.column_stack([numpy.frombuffer(network.xs, dtype=float), numpy.frombuffer(network.ys, dtype=float)])
+        if not network.edges:
+            return with_coordinates(network.graph, ((0.0, 0.0) for _ in range(num_nodes)))
+
+        # Scale the median edge to the minimum edge length (the MILP minimizes the lengths)
+        lengths = numpy.abs(points[targets] - points[sources]).max(axis=1) / weights
+        positive = lengths[lengths > 0]
+        if len(positive):
+            points = (points - points[:1]) * (distance / numpy.median(positive))
+
+        points = relax(points, iterations)
+        best = place_along_tree(points)
+        best_defects = conflicts(best), length_violations(network, settings, best)
+        for _ in range(repair_rounds):
+            if not any(best_defects):
+                break
+            points = relax(separate(points, *best_defects), REPAIR_ITERATIONS)
+            coordinates = place_along_tree(points)
+            found = conflicts(coordinates), length_violations(network, settings, coordinates)
+            if sum(map(len, found)) < sum(map(len, best_defects)):
+                best, best_defects = coordinates, found
+        return with_coordinates(network.graph, best)
+
+    return heuristic_layout
@@ -0,0 +1,76 @@
+from typing import Dict, Any, FrozenSet, Optional, Set, Tuple
+
+from .revise_solution import with_coordinates
+
+def edge_key(edge: Dict[str, Any]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Identity of an edge regardless of its orientation: its endpoints and lines."""
+    return frozenset((edge['source'], edge['target'])), frozenset(edge['metadata']['lines'])
+
+def node_coordinates(graph: Dict[str, Any]) -> Dict[str, Tuple[float, float]]:
+    """Coordinates of the nodes of a graph by id (first occurrence wins)."""
+    coordinates: Dict[str, Tuple[float, float]] = {}
+    for node in graph['nodes']:
+        coordinates.setdefault(node['id'], (node['metadata']['x'], node['metadata']['y']))
+    return coordinates
+
+def changed_nodes(previous: Dict[str, Any], edited: Dict[str, Any],
+                  previous_input: Optional[Dict[str, Any]] = None) -> Set[str]:
+    """Find the nodes of the edited (prepared) graph touched by an edit of the previously solved one.
+
+    These are new nodes and the endpoints of added or removed edges (also
+    if only their lines changed). With the `previous_input`, nodes whose
+    input coordinates moved count as changed, too.
+    """
+    node_ids = {node['id'] for node in edited['nodes']}
+    previous_ids = {node['id'] for node in previous['nodes']}
+    changed = node_ids - previous_ids
+
+    previous_edges = {edge_key(edge) for edge in previous['edges']}
+    edited_edges = {edge_key(edge) for edge in edited['edges']}
+    for endpoints, _ in previous_edges ^ edited_edges:
+        changed |= endpoints & node_ids
+
+    if previous_input is not None:
+        previous_coordinates = node_coordinates(previous_input)
+        for node_id, xy in node_coordinates(edited).items():
+            if node_id in previous_coordinates and previous_coordinates[node_id] != xy:
+                changed.add(node_id)
+    return changed
+
+def neighborhood(graph: Dict[str, Any], seeds: Set[str], hops: int) -> Set[str]:
+    """Nodes at most `hops` edges away from the seed nodes."""
+    neighbors: Dict[str, Set[str]] = {}
+    for edge in graph['edges']:
+        neighbors.setdefault(edge['source'], set()).add(edge['target'])
+        neighbors.setdefault(edge['target'], set()).add(edge['source'])
+
+    region = set(seeds)
+    frontier = set(seeds)
+    for _ in range(hops):
+        frontier = {n for node in frontier for n in neighbors.get(node, ())} - region
+        if not frontier:
+            break
+        region |= frontier
+    return region
+
+def local_subgraph(graph: Dict[str, Any], region: Set[str]) -> Dict[str, Any]:
+    """Subgraph of the edges with an endpoint in the region, including their other (boundary) endpoints.
+
+    Nodes and edges keep their order in the graph.
+    """
+    edges = [edge for edge in graph['edges'] if edge['source'] in region or edge['target'] in region]
+    node_ids = set(region)
+    for edge in edges:
+        node_ids.add(edge['source'])
+        node_ids.add(edge['target'])
+    subgraph = {key: value for key, value in graph.items() if key not in ('nodes', 'edges')}
+    subgraph['nodes'] = [node for node in graph['nodes'] if node['id'] in node_ids]
+    subgraph['edges'] = edges
+    return subgraph
+
+def merge_layout(graph: Dict[str, Any], previous: Dict[str, Any], local: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Layout of the graph with the coordinates of the locally solved nodes, and of the previous layout otherwise."""
+    coordinates = node_coordinates(previous)
+    if local is not None:
+        coordinates.update(node_coordinates(local))
+    return with_coordinates(graph, (coordinates[node['id']] for node in graph['nodes']))
@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+from array import array
+import math
+
+# A linear term (coefficient, variable family, index) refers to variable `{family}{index}`
+Term = Tuple[float, str, int]
+# A constraint row (terms, sense, rhs) with sense one of '<=', '>=', '='
+Row = Tuple[Tuple[Term, ...], str, float]
+
+# one-byte codes used in the columnar storage
+SENSES = {'<=': ord('L'), '>=': ord('G'), '=': ord('E')}
+VTYPES = {'continuous': ord('C'), 'integer': ord('I'), 'binary': ord('B')}
+
+@dataclass
+class Family:
+    """A family of variables sharing a name prefix, bounds and type."""
+    name: str
+    count: int
+    lower: Optional[float]
+    upper: Optional[float]
+    kind: str = 'continuous'  # 'continuous', 'integer' or 'binary'
+
+class Model:
+    """Sparse MILP in columnar form.
+
+    Columns are laid out family by family, with bound arrays, a variable
+    type vector and objective coefficients. The constraint matrix is kept as
+    COO arrays (row, col, coef) in row order, with one sense and rhs per row.
+    """
+
+    def __init__(self, families: List[Family]):
+        self.families = families
+        self.offsets: Dict[str, int] = {}
+
+        # Columns
+        self.lower = array('d')
+        self.upper = array('d')
+        self.vtype = bytearray()
+        for family in families:
+            self.offsets[family.name] = len(self.lower)
+            self.lower.extend([-math.inf if family.lower is None else family.lower] * family.count)
+            self.upper.extend([math.inf if family.upper is None else family.upper] * family.count)
+            self.vtype.extend([VTYPES[family.kind]] * family.count)
+        self.objective = array('d', bytes(8 * len(self.lower)))
+
+        # Rows
+        self.row = array('i')
+        self.col = array('i')
+        self.coef = array('d')
+        self.sense = bytearray()
+        self.rhs = array('d')
+
+    @property
+    def num_columns(self) -> int:
+        return len(self.lower)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.rhs)
+
+    def column(self, family: str, index: int) -> int:
+        """Column index of variable `{family}{index}`."""
+        return self.offsets[family] + index
+
+    def add_row(self, terms: Tuple[Term, ...], sense: str, rhs: float) -> None:
+        """Append a constraint row."""
+        row = len(self.rhs)
+        offsets = self.offsets
+        for coef, family, index in terms:
+            self.row.append(row)
+            self.col.append(offsets[family] + index)
+            self.coef.append(coef)
+        self.sense.append(SENSES[sense])
+        self.rhs.append(rhs)
+
+    def add_column_row(self, entries: Iterable[Tuple[int, float]], sense: str, rhs: float) -> None:
+        """Append a constraint row given by (column, coefficient) entries."""
+        row = len(self.rhs)
+        for column, coef in entries:
+            self.row.append(row)
+            self.col.append(column)
+            self.coef.append(coef)
+        self.sense.append(SENSES[sense])
+        self.rhs.append(rhs)
+
+    def add_rows(self, rows: Iterable[Row]) -> None:
+        """Append constraint rows."""
+        for terms, sense, rhs in rows:
+            self.add_row(terms, sense, rhs)
+
+    def add_objective(self, terms: Iterable[Term]) -> None:
+        """Add terms to the (minimized) objective."""
+        for coef, family, index in terms:
+            self.objective[self.offsets[family] + index] += coef
+
+    def row_starts(self) -> array:
+        """Start of each row in the COO arrays (CSR row pointers), with a final end marker."""
+        starts = array('l', bytes(array('l').itemsize * (self.num_rows + 1)))
+        for row in self.row:
+            starts[row + 1] += 1
+        for i in range(self.num_rows):
+            starts[i + 1] += starts[i]
+        return starts
+
+    def column_name(self, column: int, short: bool = False) -> str:
+        """Name of a column, either `{family}{index}` or the short numeric id `x{column}`."""
+        if short:
+            return f"x{column}"
+        for family in reversed(self.families):
+            offset = self.offsets[family.name]
+            if column >= offset and family.count:
+                return f"{family.name}{column - offset}"
+        raise IndexError(column)
+
+    def column_names(self, short: bool = False) -> List[str]:
+        """Names of all columns, in column order."""
+        if short:
+            return [f"x{j}" for j in range(self.num_columns)]
+        return [f"{family.name}{i}" for family in self.families for i in range(family.count)]
+
+    def column_index(self, name: str) -> Optional[int]:
+        """Column index of a (full or short) variable name, None if unknown."""
+        if name.startswith('x') and name[1:].isdigit():
+            return int(name[1:])
+        family = name.rstrip('0123456789')
+        index = name[len(family):]
+        if family not in self.offsets or not index:
+            return None
+        return self.offsets[family] + int(index)
+
+class NoSolutionError(RuntimeError):
+    """The solver terminated without a feasible solution."""
+
+class Solution:
+    """Solved variable values, as one array over all model columns."""
+
+    def __init__(self, model: Model, values: array, objective: Optional[float] = None, status: Optional[str] = None):
+        self.model = model
+        self.values = values
+        self.objective = objective
+        # solver status, e.g. whether a limit was reached (None: unknown)
+        self.status = status
+
+    def __getitem__(self, family: str) -> array:
+        """Values of one variable family."""
+        offset = self.model.offsets[family]
+        count = next(f.count for f in self.model.families if f.name == family)
+        return self.values[offset:offset + count]
+
+    def __contains__(self, family: str) -> bool:
+        return family in self.model.offsets
+
+    @classmethod
+    def from_names(cls, model: Model, named_values: Dict[str, float],
+                   objective: Optional[float] = None, status: Optional[str] = None) -> 'Solution':
+        """Collect values given by (full or short) variable name; missing variables are 0."""
+        values = array('d', bytes(8 * model.num_columns))
+        for name, value in named_values.items():
+            column = model.column_index(name)
+            if column is not None and column < len(values):
+                values[column] = value
+        return cls(model, values, objective, status)
@@ -0,0 +1,87 @@
+from typing import Dict, Any, List, Set, Tuple
+from array import array
+
+class EdgeRecord:
+    """Compact edge record referencing its nodes by index."""
+    __slots__ = ('index', 'source', 'target', 'lines', 'source_directions', 'target_directions', 'weight')
+
+    def __init__(self, index: int, source: int, target: int, lines: frozenset,
+                 source_directions: List[int], target_directions: List[int], weight: int = 1):
+        self.index = index
+        self.source = source
+        self.target = target
+        self.lines = lines
+        self.source_directions = source_directions
+        self.target_directions = target_directions
+        # number of input edges represented by a contracted chain edge
+        self.weight = weight
+
+    def shares_lines(self, other: 'EdgeRecord') -> bool:
+        """Check if both edges serve at least one common line."""
+        return not self.lines.isdisjoint(other.lines)
+
+    def is_adjacent(self, other: 'EdgeRecord') -> bool:
+        """Check if both edges share at least one node."""
+        return (self.source == other.source or self.source == other.target or
+                self.target == other.source or self.target == other.target)
+
+class Network:
+    """Index-backed view of a prepared graph, compiled once and shared by all LP stages."""
+
+    def __init__(self, graph: Dict[str, Any]):
+        self.graph = graph
+
+        # Node id <-> index maps and contiguous coordinate arrays
+        self.node_ids: List[str] = [n['id'] for n in graph['nodes']]
+        self.node_index: Dict[str, int] = {}
+        for i, node_id in enumerate(self.node_ids):
+            self.node_index.setdefault(node_id, i)
+        self.xs = array('d', (n['metadata']['x'] for n in graph['nodes']))
+        self.ys = array('d', (n['metadata']['y'] for n in graph['nodes']))
+
+        # Edge endpoints as contiguous index arrays, for vectorized geometry
+        self.sources = array('i')
+        self.targets = array('i')
+
+        # Compact edge records, per-node incidence lists and undirected node pairs
+        self.edges: List[EdgeRecord] = []
+        self.incidence: List[List[int]] = [[] for _ in self.node_ids]
+        self.node_pairs: Set[Tuple[int, int]] = set()
+        self._edge_index: Dict[Tuple[str, str, Tuple[str, ...]], int] = {}
+
+        for i, edge in enumerate(graph['edges']):
+            source = self.node_index[edge['source']]
+            target = self.node_index[edge['target']]
+            lines = edge['metadata']['lines']
+            self.edges.append(EdgeRecord(
+                i, source, target, frozenset(lines),
+                edge.get('sourceDirections', [0, 0]),
+                edge.get('targetDirections', [4, 4]),
+                edge['metadata'].get('weight', 1)
+            ))
+            self.sources.append(source)
+            self.targets.append(target)
+            self.incidence[source].append(i)
+            if target != source:
+                self.incidence[target].append(i)
+            self.node_pairs.add((source, target) if source < target else (target, source))
+            self._edge_index.setdefault((edge['source'], edge['target'], tuple(lines)), i)
+
+    def edge_index(self, edge: Dict[str, Any]) -> int:
+        """Get the index of an edge dict in the graph."""
+        key = (edge['source'], edge['target'], tuple(edge['metadata']['lines']))
+        if key not in self._edge_index:
+            raise ValueError("Edge not found in graph")
+        return self._edge_index[key]
+
+    def degree(self, node: int) -> int:
+        """Number of edges incident to the node at the given index."""
+        return len(self.incidence[node])
+
+    def connected(self, u: int, v: int) -> bool:
+        """Check if the nodes at the given indices are joined by an edge."""
+        return ((u, v) if u < v else (v, u)) in self.node_pairs
+
+def compile_network(graph: Dict[str, Any]) -> Network:
+    """Compile a prepared graph into an index-backed network."""
+    return Network(graph)
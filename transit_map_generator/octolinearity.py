@@ -1,173 +1,132 @@
-from typing import Dict, Any, List, Callable
-from .util import node_index, edge_index
-
-def create_set_product(settings: Dict[str, Any]) -> Callable[[str, str, str], List[str]]:
-    """Create constraints to linearize the product of a continuous and a binary variable."""
-    def set_product(product: str, continuous: str, binary: str) -> List[str]:
-        upper_bound = settings['max_edge_length'] + 1
+from typing import Dict, Any, List, Callable, Tuple
+from .network import Network, EdgeRecord
+from .model import Row
+
+def fix(family: str, index: int, value: float) -> Row:
+    """Fix a variable to the given value."""
+    return (((1, family, index),), '=', value)
+
+def equal(family1: str, index1: int, family2: str, index2: int) -> Row:
+    """Force two variables to be equal."""
+    return (((1, family1, index1), (-1, family2, index2)), '=', 0)
+
+# direction variables fixed by the main direction of an edge, and additionally by its secondary direction
+MAIN_FIXES = {
+    0: (('a', 0), ('b', 1)),  # 9 o'clock
+    1: (('a', 0), ('c', 0)),  # 7.5 o'clock
+    2: (('c', 0), ('d', 1)),  # 6 o'clock
+    3: (('b', 0), ('c', 0)),  # 4.5 o'clock
+    4: (('a', 1), ('b', 0)),  # 3 o'clock
+    5: (('b', 0), ('d', 0)),  # 1.5 o'clock
+    6: (('c', 1), ('d', 0)),  # 12 o'clock
+    7: (('a', 0), ('d', 0)),  # 10.5 o'clock
+}
+SECONDARY_FIXES = {
+    (0, 7): ('d', 0), (0, 1): ('c', 0),
+    (1, 2): ('d', 1), (1, 0): ('b', 1),
+    (2, 3): ('b', 0), (2, 1): ('a', 0),
+    (3, 4): ('a', 1), (3, 2): ('d', 1),
+    (4, 5): ('d', 0), (4, 3): ('c', 0),
+    (5, 6): ('c', 1), (5, 4): ('a', 1),
+    (6, 7): ('a', 0), (6, 5): ('b', 0),
+    (7, 0): ('b', 1), (7, 6): ('c', 1),
+}
+
+def fixed_binaries(source_directions: List[int]) -> List[Tuple[str, int]]:
+    """Direction variables (`a`, `b`, `c`, `d`) fixed by the main and secondary direction of an edge, with their values."""
+    main_direction = source_directions[0]
+    secondary_direction = len(source_directions) > 1 and source_directions[1] or 0
+    if main_direction not in MAIN_FIXES:
+        raise ValueError('Unknown direction')
+    fixes = list(MAIN_FIXES[main_direction])
+    if (main_direction, secondary_direction) in SECONDARY_FIXES:
+        fixes.append(SECONDARY_FIXES[(main_direction, secondary_direction)])
+    return fixes
+
+def create_set_product(settings: Dict[str, Any]) -> Callable[..., List[Row]]:
+    """Create constraints to linearize the product of a continuous and a binary variable.
+
+    The big-M is the upper bound of the (edge length) continuous variable,
+    the tightest valid one, unless the `big_m` setting gives a constant.
+    """
+    def set_product(product: str, continuous: str, binary: str, index: int, weight: int = 1) -> List[Row]:
+        upper_bound = settings.get('big_m') or settings['max_edge_length'] * weight
         return [
-            f"{product} - {upper_bound} {binary} <= 0",
-            f"{product} - {continuous} <= 0",
-            f"{product} - {continuous} - {upper_bound} {binary} >= -{upper_bound}"
+            (((1, product, index), (-upper_bound, binary, index)), '<=', 0),
+            (((1, product, index), (-1, continuous, index)), '<=', 0),
+            (((1, product, index), (-1, continuous, index), (-upper_bound, binary, index)), '>=', -upper_bound)
         ]
     return set_product
 
-def create_octolinearity_constraints(settings: Dict[str, Any]) -> Callable[[Dict[str, Any], Dict[str, Any]], List[str]]:
+def create_octolinearity_constraints(settings: Dict[str, Any]) -> Callable[[Network, EdgeRecord], List[Row]]:
     """Create constraints to maintain octolinear edge directions."""
     set_product = create_set_product(settings)
     
-    def octolinearity_constraints(graph: Dict[str, Any], edge: Dict[str, Any]) -> List[str]:
+    def octolinearity_constraints(network: Network, edge: EdgeRecord) -> List[Row]:
         constraints = []
-        e = edge_index(graph, edge)
+        e = edge.index
 
         # Set helper variables for products
-        constraints.extend(set_product(f"pa{e}", f"l{e}", f"a{e}"))
-        constraints.extend(set_product(f"pb{e}", f"l{e}", f"b{e}"))
-        constraints.extend(set_product(f"pc{e}", f"l{e}", f"c{e}"))
-        constraints.extend(set_product(f"pd{e}", f"l{e}", f"d{e}"))
+        constraints.extend(set_product('pa', 'l', 'a', e, edge.weight))
+        constraints.extend(set_product('pb', 'l', 'b', e, edge.weight))
+        constraints.extend(set_product('pc', 'l', 'c', e, edge.weight))
+        constraints.extend(set_product('pd', 'l', 'd', e, edge.weight))
 
         # Add coordinate constraints
         constraints.extend([
-            f"vx{node_index(graph, edge['target'])} - vx{node_index(graph, edge['source'])} - pa{e} + pb{e} = 0",
-            f"vy{node_index(graph, edge['target'])} - vy{node_index(graph, edge['source'])} - pc{e} + pd{e} = 0"
+            (((1, 'vx', edge.target), (-1, 'vx', edge.source), (-1, 'pa', e), (1, 'pb', e)), '=', 0),
+            (((1, 'vy', edge.target), (-1, 'vy', edge.source), (-1, 'pc', e), (1, 'pd', e)), '=', 0)
         ])
 
         # Basic constraints that limit sum of direction variables
         constraints.extend([
-            f"a{e} + b{e} <= 1",
-            f"c{e} + d{e} <= 1"
+            (((1, 'a', e), (1, 'b', e)), '<=', 1),
+            (((1, 'c', e), (1, 'd', e)), '<=', 1)
         ])
 
-        # Get main and secondary directions
-        sourceDirections = edge.get('sourceDirections', [0, 0])
-        main_direction = sourceDirections[0]
-        secondary_direction = len(sourceDirections) > 1 and sourceDirections[1] or 0
-
-        # Add constraints based on direction
-        if main_direction == 0:  # 9 o'clock
-            constraints.extend([
-                f"a{e} = 0",
-                f"b{e} = 1"
-            ])
-            if secondary_direction == 7:
-                constraints.append(f"d{e} = 0")
-            if secondary_direction == 1:
-                constraints.append(f"c{e} = 0")
-
-        elif main_direction == 1:  # 7.5 o'clock
-            constraints.extend([
-                f"a{e} = 0",
-                f"c{e} = 0"
-            ])
-            if secondary_direction == 2:
-                constraints.append(f"d{e} = 1")
-            if secondary_direction == 0:
-                constraints.append(f"b{e} = 1")
-
-        elif main_direction == 2:  # 6 o'clock
-            constraints.extend([
-                f"c{e} = 0",
-                f"d{e} = 1"
-            ])
-            if secondary_direction == 3:
-                constraints.append(f"b{e} = 0")
-            if secondary_direction == 1:
-                constraints.append(f"a{e} = 0")
-
-        elif main_direction == 3:  # 4.5 o'clock
-            constraints.extend([
-                f"b{e} = 0",
-                f"c{e} = 0"
-            ])
-            if secondary_direction == 4:
-                constraints.append(f"a{e} = 1")
-            if secondary_direction == 2:
-                constraints.append(f"d{e} = 1")
-
-        elif main_direction == 4:  # 3 o'clock
-            constraints.extend([
-                f"a{e} = 1",
-                f"b{e} = 0"
-            ])
-            if secondary_direction == 5:
-                constraints.append(f"d{e} = 0")
-            if secondary_direction == 3:
-                constraints.append(f"c{e} = 0")
-
-        elif main_direction == 5:  # 1.5 o'clock
-            constraints.extend([
-                f"b{e} = 0",
-                f"d{e} = 0"
-            ])
-            if secondary_direction == 6:
-                constraints.append(f"c{e} = 1")
-            if secondary_direction == 4:
-                constraints.append(f"a{e} = 1")
-
-        elif main_direction == 6:  # 12 o'clock
-            constraints.extend([
-                f"c{e} = 1",
-                f"d{e} = 0"
-            ])
-            if secondary_direction == 7:
-                constraints.append(f"a{e} = 0")
-            if secondary_direction == 5:
-                constraints.append(f"b{e} = 0")
-
-        elif main_direction == 7:  # 10.5 o'clock
-            constraints.extend([
-                f"a{e} = 0",
-                f"d{e} = 0"
-            ])
-            if secondary_direction == 0:
-                constraints.append(f"b{e} = 1")
-            if secondary_direction == 6:
-                constraints.append(f"c{e} = 1")
-
-        else:
-            raise ValueError('Unknown direction')
+        # Fix the direction variables excluded by the main and secondary directions
+        constraints.extend(fix(family, e, value) for family, value in fixed_binaries(edge.source_directions))
 
         # Force angle to 180° for some pairs of adjacent edges
-        adjacent_line_edges = [e for e in graph['edges'] if 
-            bool(set(e['metadata']['lines']) & set(edge['metadata']['lines'])) and 
-            len(set([e['source'], e['target']]) & set([edge['source'], edge['target']])) == 1]
+        edge_nodes = {edge.source, edge.target}
+        adjacent_line_edges = [
+            network.edges[i]
+            for i in sorted(set(network.incidence[edge.source] + network.incidence[edge.target]))
+            if edge.shares_lines(network.edges[i]) and
+            len({network.edges[i].source, network.edges[i].target} & edge_nodes) == 1
+        ]
 
         # TODO: remove this
         adjacent_line_edges = []
 
         for a_edge in adjacent_line_edges:
             degrees = [
-                len([e for e in graph['edges'] if node in [e['source'], e['target']]])
-                for node in [edge['source'], edge['target'], a_edge['source'], a_edge['target']]
+                network.degree(node)
+                for node in [edge.source, edge.target, a_edge.source, a_edge.target]
             ]
-            middle_node_id = list(set([edge['source'], edge['target']]) & 
-                                set([a_edge['source'], a_edge['target']]))[0]
-            middle = next(n for n in graph['nodes'] if n['id'] == middle_node_id)
-            
+            middle_node_index = list(edge_nodes & {a_edge.source, a_edge.target})[0]
+            middle = network.graph['nodes'][middle_node_index]
+
             if all(d == 2 for d in degrees) or middle.get('dummy', False):
-                if edge['target'] == a_edge['source'] or edge['source'] == a_edge['target']:
-                    # Check if both edges have sourceDirections and they are equal
-                    edge_source_dirs = edge.get('sourceDirections', None)
-                    a_edge_source_dirs = a_edge.get('sourceDirections', None)
-                    if edge_source_dirs is not None and a_edge_source_dirs is not None and edge_source_dirs == a_edge_source_dirs:
-                        a_e = edge_index(graph, a_edge)
+                if edge.target == a_edge.source or edge.source == a_edge.target:
+                    # Check if both edges have equal source directions
+                    if edge.source_directions == a_edge.source_directions:
+                        a_e = a_edge.index
                         constraints.extend([
-                            f"a{e} - a{a_e} = 0",
-                            f"b{e} - b{a_e} = 0",
-                            f"c{e} - c{a_e} = 0",
-                            f"d{e} - d{a_e} = 0"
+                            equal('a', e, 'a', a_e),
+                            equal('b', e, 'b', a_e),
+                            equal('c', e, 'c', a_e),
+                            equal('d', e, 'd', a_e)
                         ])
                 else:
                     # Check if both edges have their respective directions and they are equal
-                    edge_target_dirs = edge.get('targetDirections', None)
-                    a_edge_source_dirs = a_edge.get('sourceDirections', None)
-                    if edge_target_dirs is not None and a_edge_source_dirs is not None and edge_target_dirs == a_edge_source_dirs:
-                        a_e = edge_index(graph, a_edge)
+                    if edge.target_directions == a_edge.source_directions:
+                        a_e = a_edge.index
                         constraints.extend([
-                            f"a{e} - b{a_e} = 0",
-                            f"b{e} - a{a_e} = 0",
-                            f"c{e} - d{a_e} = 0",
-                            f"d{e} - c{a_e} = 0"
+                            equal('a', e, 'b', a_e),
+                            equal('b', e, 'a', a_e),
+                            equal('c', e, 'd', a_e),
+                            equal('d', e, 'c', a_e)
                         ])
 
         return constraints
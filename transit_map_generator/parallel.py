@@ -0,0 +1,45 @@
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import os
+
+# number of shards queued per worker, bounds the memory of results waiting to be consumed
+SHARDS_PER_WORKER = 2
+
+def resolve_jobs(jobs: int) -> int:
+    """Number of worker processes, with 0 or less meaning one per CPU."""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+def ordered_map(function: Callable[[Any], Any], tasks: Iterable[Any], jobs: int,
+                initializer: Callable[..., None], initargs: Tuple[Any, ...]) -> Iterator[Any]:
+    """Apply `function` to the tasks in a process pool, yielding the results in task order.
+
+    Tasks are drawn lazily and only a few shards per worker are in flight at
+    any time, so neither the tasks nor the results are held in memory at once.
+    """
+    window = SHARDS_PER_WORKER * jobs
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        pending: 'deque[Future]' = deque()
+        try:
+            for task in tasks:
+                pending.append(executor.submit(function, task))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split a stream into lists of at most `size` items."""
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,30 @@
+from typing import Dict, TextIO
+
+from .model import Model, NoSolutionError, Solution
+
+def parse_scip_solution(solution_stream: TextIO, model: Model) -> Solution:
+    """Parse a solution file written by SCIP into an array of column values."""
+    # SCIP solution format is:
+    # solution status: <status>
+    # objective value: <value>
+    # <variable> <value> (obj:<coefficient>)
+    named_values: Dict[str, float] = {}
+    objective = None
+    status = None
+    for line in solution_stream:
+        if line.startswith('solution status:'):
+            status = line.split(':', 1)[1].strip()
+            continue
+        if line.startswith('no solution available'):
+            raise NoSolutionError(f"SCIP found no solution (status: {status})")
+        if line.startswith('objective value:'):
+            objective = float(line.split(':', 1)[1])
+            continue
+
+        # Parse variable and value
+        parts = line.strip().split()
+        if len(parts) >= 2:
+            variable, value = parts[:2]
+            named_values[variable] = float(value)
+
+    return Solution.from_names(model, named_values, objective, status)
@@ -0,0 +1,98 @@
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Union
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # no inter-process locking, the statistics are still replaced atomically
+    fcntl = None
+
+# SCIP shell commands of the solver configurations raced in a portfolio
+PROFILES: Dict[str, List[str]] = {
+    'default': [],
+    'feasibility': ['set emphasis feasibility'],
+    'heuristics': ['set heuristics emphasis aggressive'],
+    'seed-1': ['set randomization randomseedshift 1'],
+    'seed-2': ['set randomization randomseedshift 2'],
+    'pscost': ['set branching pscost priority 1000000'],
+    'optimality': ['set emphasis optimality'],
+}
+
+class Portfolio:
+    """Solver configurations to race on the same problem, and the file of their win statistics.
+
+    The statistics count for each profile its races, its wins, how many of
+    these proved optimality and the total seconds to the win.
+    """
+
+    def __init__(self, profiles: Sequence[str], stats_path: Optional[str] = None):
+        unknown = [name for name in profiles if name not in PROFILES]
+        if unknown:
+            raise ValueError(f"Unknown portfolio profiles: {', '.join(unknown)}, use some of: {', '.join(PROFILES)}")
+        self.profiles = {name: PROFILES[name] for name in profiles}
+        self.stats_path = Path(stats_path) if stats_path else None
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.stats_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Win statistics by profile, empty without a statistics file."""
+        if self.stats_path is None:
+            return {}
+        try:
+            return json.loads(self.stats_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, winner: str, seconds: float, optimal: bool, profiles: Optional[Iterable[str]] = None) -> None:
+        """Count a race of the `profiles` (default: all) won by `winner` after `seconds`."""
+        if self.stats_path is None:
+            return
+        with self._lock():
+            stats = self.stats()
+            for name in (self.profiles if profiles is None else profiles):
+                entry = stats.setdefault(name, {'races': 0, 'wins': 0, 'optimal': 0, 'win_seconds': 0.0})
+                entry['races'] += 1
+                if name == winner:
+                    entry['wins'] += 1
+                    entry['optimal'] += int(optimal)
+                    entry['win_seconds'] = round(entry['win_seconds'] + seconds, 3)
+            fd, tmp_path = tempfile.mkstemp(dir=self.stats_path.parent, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'w') as stream:
+                    json.dump(stats, stream, indent=2)
+                os.replace(tmp_path, self.stats_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+def select_profiles(count: int, stats_path: Optional[str] = None) -> List[str]:
+    """The `count` profiles with the highest recorded win rate, in `PROFILES` order without statistics."""
+    stats = Portfolio([], stats_path).stats()
+
+    def win_rate(name: str) -> float:
+        entry = stats.get(name)
+        return entry['wins'] / entry['races'] if entry and entry['races'] else 0.0
+
+    order = list(PROFILES)
+    return sorted(order, key=lambda name: (-win_rate(name), order.index(name)))[:count]
+
+def create_portfolio(profiles: Union[int, Sequence[str], None], stats_path: Optional[str] = None) -> Optional[Portfolio]:
+    """Portfolio of the named profiles, or of the given number of best profiles (see `select_profiles`)."""
+    if not profiles:
+        return None
+    if isinstance(profiles, int):
+        profiles = select_profiles(profiles, stats_path)
+    return Portfolio(profiles, stats_path)
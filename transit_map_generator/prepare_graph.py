@@ -2,29 +2,42 @@ from typing import Dict, Any, List
 
 from .planarize import planarize
 from .add_directions import add_directions
+from .contract import contract_chains
+from .network import Network, compile_network
+
+def normalize_edge(edge: Dict[str, Any]) -> Dict[str, Any]:
+    """Edge with metadata and its lines as list of ids, the edge itself if it already is."""
+    metadata = edge.get('metadata', {})
+    lines = metadata.get('lines', [])
+    if 'metadata' in edge and isinstance(lines, list) and not any(isinstance(line, dict) for line in lines):
+        return edge
+    if isinstance(lines, list):
+        lines = [line['id'] if isinstance(line, dict) else line for line in lines]
+    return {**edge, 'metadata': {**metadata, 'lines': lines}}
+
+def prepare_graph(network_graph: Dict[str, Any], contract: bool = False) -> Dict[str, Any]:
+    """Prepare the network graph by adding directions, optionally contracting degree-2 chains (see `contract_chains`).
+
+    The input graph is never modified. The prepared graph shares the node dicts
+    and unchanged values with it, so it must not be modified while in use.
+    """
+    # Ensure each node has metadata and each edge a list of line ids, copying
+    # only the nodes and edges that need it (the input graph is left untouched)
+    network_graph = {
+        **network_graph,
+        'nodes': [node if 'metadata' in node else {**node, 'metadata': {}} for node in network_graph['nodes']],
+        'edges': [normalize_edge(edge) for edge in network_graph['edges']]
+    }
 
-def prepare_graph(network_graph: Dict[str, Any]) -> Dict[str, Any]:
-    """Prepare the network graph by adding directions."""
-    # Ensure each node has metadata
-    for node in network_graph['nodes']:
-        if 'metadata' not in node:
-            node['metadata'] = {}
-    
-    # Ensure each edge has metadata and lines
-    for edge in network_graph['edges']:
-        if 'metadata' not in edge:
-            edge['metadata'] = {}
-        if 'lines' not in edge['metadata']:
-            edge['metadata']['lines'] = []
-        
-        # Convert line objects to line IDs
-        if isinstance(edge['metadata']['lines'], list):
-            edge['metadata']['lines'] = [
-                line['id'] if isinstance(line, dict) else line
-                for line in edge['metadata']['lines']
-            ]
-    
     # Add directions to the graph edges
     network_graph = add_directions(network_graph)
+
+    # Contract chains into weighted edges, with directions between their ends
+    if contract:
+        network_graph = add_directions(contract_chains(network_graph))
     
-    return network_graph 
+    return network_graph
+
+def prepare_network(network_graph: Dict[str, Any], contract: bool = False) -> Network:
+    """Prepare the network graph and compile it into an index-backed network."""
+    return compile_network(prepare_graph(network_graph, contract))
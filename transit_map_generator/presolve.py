@@ -0,0 +1,380 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from collections import deque
+import math
+
+from .model import Family, Model, NoSolutionError, Row, Solution, SENSES, VTYPES
+
+# tolerance of bound and activity comparisons
+EPSILON = 1e-9
+
+# rounds of row propagation and duplicate detection, each round only runs if the previous one found equalities
+MAX_ROUNDS = 8
+
+LE, GE, EQ = '<=', '>=', '='
+
+class ReducedModel(Model):
+    """Model over a subset of the columns of another model, under their original names.
+
+    Reduced column `j` is column `columns[j]` of the original model. Short
+    names (`x{j}`) number the reduced columns.
+    """
+
+    def __init__(self, original: Model, columns: List[int]):
+        # Keep the families, with the counts of their retained columns
+        family_of = [family.name for family in original.families for _ in range(family.count)]
+        counts: Dict[str, int] = {}
+        for column in columns:
+            counts[family_of[column]] = counts.get(family_of[column], 0) + 1
+        super().__init__([
+            Family(family.name, counts.get(family.name, 0), None, None, family.kind) for family in original.families
+        ])
+        self.original = original
+        self.columns = array('i', columns)
+        names = original.column_names()
+        self.names = [names[column] for column in columns]
+        self.name_index = {name: j for j, name in enumerate(self.names)}
+
+    def column_name(self, column: int, short: bool = False) -> str:
+        return f"x{column}" if short else self.names[column]
+
+    def column_names(self, short: bool = False) -> List[str]:
+        return [f"x{j}" for j in range(self.num_columns)] if short else list(self.names)
+
+    def column_index(self, name: str) -> Optional[int]:
+        if name.startswith('x') and name[1:].isdigit():
+            return int(name[1:])
+        return self.name_index.get(name)
+
+class Presolved:
+    """A presolved model and the postsolve mapping its solutions back to all columns of the original model.
+
+    Eliminated columns are either fixed to a value or aggregated as
+    `scale * other + constant` of another original column, resolved in
+    reverse order of elimination.
+    """
+
+    def __init__(self, original: Model, model: ReducedModel, eliminated: List[Tuple[int, int, float, float]],
+                 objective_offset: float, removed_rows: int):
+        self.original = original
+        self.model = model
+        # (column, other column or -1 if fixed, scale, constant) in order of elimination
+        self.eliminated = eliminated
+        self.objective_offset = objective_offset
+        self.removed_rows = removed_rows
+
+    def postsolve(self, solution: Solution) -> Solution:
+        """Solution of the original model from a solution of the presolved one."""
+        values = array('d', bytes(8 * self.original.num_columns))
+        for j, column in enumerate(self.model.columns):
+            values[column] = solution.values[j]
+        for column, other, scale, constant in reversed(self.eliminated):
+            values[column] = constant if other < 0 else scale * values[other] + constant
+        objective = solution.objective + self.objective_offset if solution.objective is not None else None
+        return Solution(self.original, values, objective, solution.status)
+
+    def reduce(self, solution: Solution) -> Solution:
+        """Values of the retained columns of a (partial) solution of the original model, e.g. a MIP start."""
+        return Solution(self.model, array('d', (solution.values[column] for column in self.model.columns)),
+                        solution.objective, solution.status)
+
+def normalized(terms: Dict[int, float], sense: str, rhs: float) -> Tuple[Tuple[Tuple[int, float], ...], str, float]:
+    """Row scaled to a first coefficient of 1 (by column), flipping the sense if scaled by a negative factor."""
+    items = sorted(terms.items())
+    factor = items[0][1]
+    if factor < 0:
+        sense = {LE: GE, GE: LE, EQ: EQ}[sense]
+    return tuple((column, coef / factor) for column, coef in items), sense, rhs / factor
+
+def presolve(model: Model, rows: Optional[Iterable[Row]] = None) -> Presolved:
+    """Reduce the model: substitute fixed columns, drop redundant rows and collapse duplicate rows.
+
+    Uses the given `rows` instead of the rows stored in the model. Singleton
+    rows become bounds, integer bounds are tightened by row activities (e.g.
+    the direction helpers of adjacent edges with fixed directions), columns
+    with equal bounds are substituted, continuous columns of two-term
+    equalities (e.g. the products of fixed direction binaries) are aggregated,
+    rows that always hold are dropped and duplicate rows are merged. Raises
+    `NoSolutionError` if a row can never hold.
+    """
+    num_columns = model.num_columns
+    lower = list(model.lower)
+    upper = list(model.upper)
+    integral = [model.vtype[j] != VTYPES['continuous'] for j in range(num_columns)]
+    objective = list(model.objective)
+    objective_offset = 0.0
+
+    # Rows as column -> coefficient maps, with the rows of each column
+    row_terms: List[Optional[Dict[int, float]]] = []
+    row_sense: List[str] = []
+    row_rhs: List[float] = []
+    column_rows: List[set] = [set() for _ in range(num_columns)]
+    # Rows waiting for propagation
+    queue: deque = deque()
+    queued: List[bool] = []
+
+    def add(terms: Dict[int, float], sense: str, rhs: float) -> int:
+        r = len(row_terms)
+        row_terms.append(terms)
+        row_sense.append(sense)
+        row_rhs.append(rhs)
+        queued.append(False)
+        for column in terms:
+            column_rows[column].add(r)
+        return r
+
+    offsets = model.offsets
+    if rows is None:
+        senses = {code: sense for sense, code in SENSES.items()}
+        starts = model.row_starts()
+        for r in range(model.num_rows):
+            terms: Dict[int, float] = {}
+            for k in range(starts[r], starts[r + 1]):
+                terms[model.col[k]] = terms.get(model.col[k], 0.0) + model.coef[k]
+            add({column: coef for column, coef in terms.items() if coef != 0}, senses[model.sense[r]], model.rhs[r])
+    else:
+        for row_entries, sense, rhs in rows:
+            terms = {}
+            for coef, family, index in row_entries:
+                column = offsets[family] + index
+                terms[column] = terms.get(column, 0.0) + coef
+            add({column: coef for column, coef in terms.items() if coef != 0}, sense, rhs)
+    num_rows = len(row_terms)
+
+    eliminated: List[Tuple[int, int, float, float]] = []
+    removed = [False] * num_columns
+
+    def enqueue(r: int) -> None:
+        if row_terms[r] is not None and not queued[r]:
+            queued[r] = True
+            queue.append(r)
+
+    def drop(r: int) -> None:
+        for column in row_terms[r]:
+            column_rows[column].discard(r)
+        row_terms[r] = None
+
+    def infeasible(r: int) -> None:
+        raise NoSolutionError(f"Presolve found the problem infeasible (constraint {r})")
+
+    def substitute(column: int, other: int, scale: float, constant: float) -> None:
+        """Eliminate a column as `scale * other + constant` (a fixed value if `other` is -1)."""
+        nonlocal objective_offset
+        removed[column] = True
+        eliminated.append((column, other, scale, constant))
+        objective_offset += objective[column] * constant
+        if other >= 0:
+            objective[other] += objective[column] * scale
+        objective[column] = 0.0
+        for r in list(column_rows[column]):
+            terms = row_terms[r]
+            coef = terms.pop(column)
+            row_rhs[r] -= coef * constant
+            if other >= 0:
+                merged = terms.get(other, 0.0) + coef * scale
+                if abs(merged) <= EPSILON:
+                    terms.pop(other, None)
+                    column_rows[other].discard(r)
+                else:
+                    terms[other] = merged
+                    column_rows[other].add(r)
+            enqueue(r)
+        column_rows[column].clear()
+
+    def set_bounds(column: int, new_lower: float, new_upper: float) -> None:
+        """Tighten the bounds of a column, fixing it if they meet."""
+        if integral[column]:
+            new_lower = math.ceil(new_lower - 1e-6) if not math.isinf(new_lower) else new_lower
+            new_upper = math.floor(new_upper + 1e-6) if not math.isinf(new_upper) else new_upper
+        new_lower, new_upper = max(lower[column], new_lower), min(upper[column], new_upper)
+        if new_lower > new_upper + 1e-6:
+            raise NoSolutionError(f"Presolve found the problem infeasible (bounds of {model.column_name(column)})")
+        if new_lower == lower[column] and new_upper == upper[column]:
+            return
+        lower[column], upper[column] = new_lower, max(new_lower, new_upper)
+        for r in column_rows[column]:
+            enqueue(r)
+        if upper[column] - lower[column] <= EPSILON:
+            substitute(column, -1, 0.0, lower[column])
+
+    def activity(terms: Dict[int, float]) -> Tuple[float, float, int, int]:
+        """Finite parts of the minimum and maximum row activity, and the numbers of infinite contributions."""
+        minimum = maximum = 0.0
+        minimum_inf = maximum_inf = 0
+        for column, coef in terms.items():
+            low, high = (lower[column], upper[column]) if coef > 0 else (upper[column], lower[column])
+            if math.isinf(low):
+                minimum_inf += 1
+            else:
+                minimum += coef * low
+            if math.isinf(high):
+                maximum_inf += 1
+            else:
+                maximum += coef * high
+        return minimum, maximum, minimum_inf, maximum_inf
+
+    def propagate(r: int) -> None:
+        terms, sense, rhs = row_terms[r], row_sense[r], row_rhs[r]
+        if not terms:
+            if (sense != GE and rhs < -1e-6) or (sense != LE and rhs > 1e-6):
+                infeasible(r)
+            drop(r)
+            return
+
+        # Singleton rows become bounds
+        if len(terms) == 1:
+            (column, coef), = terms.items()
+            value = rhs / coef
+            drop(r)
+            if sense == EQ:
+                set_bounds(column, value, value)
+            elif (sense == LE) == (coef > 0):
+                set_bounds(column, -math.inf, value)
+            else:
+                set_bounds(column, value, math.inf)
+            return
+
+        minimum, maximum, minimum_inf, maximum_inf = activity(terms)
+        if sense != GE and not minimum_inf and minimum > rhs + 1e-6:
+            infeasible(r)
+        if sense != LE and not maximum_inf and maximum < rhs - 1e-6:
+            infeasible(r)
+        # Rows always holding within the bounds are redundant
+        holds_upper = sense == GE or (not maximum_inf and maximum <= rhs + EPSILON)
+        holds_lower = sense == LE or (not minimum_inf and minimum >= rhs - EPSILON)
+        if holds_upper and holds_lower:
+            drop(r)
+            return
+
+        # Continuous columns of two-term equalities are aggregated into the other column
+        if sense == EQ and len(terms) == 2:
+            (first, first_coef), (second, second_coef) = terms.items()
+            candidates = [(c, coef, o, o_coef) for c, coef, o, o_coef in
+                          [(first, first_coef, second, second_coef), (second, second_coef, first, first_coef)]
+                          if not integral[c]]
+            if candidates:
+                # Eliminate the column with fewer rows
+                column, coef, other, other_coef = min(candidates, key=lambda c: len(column_rows[c[0]]))
+                scale, constant = -other_coef / coef, rhs / coef
+                drop(r)
+                # The other column keeps the bounds of the eliminated one
+                low, high = lower[column], upper[column]
+                bounds = sorted([(low - constant) / scale, (high - constant) / scale])
+                substitute(column, other, scale, constant)
+                set_bounds(other, bounds[0], bounds[1])
+                return
+
+        # Tighten the bounds of integer columns by the activity of the other columns
+        for column in [column for column in terms if integral[column]]:
+            for bounded in (LE, GE):
+                # Fixing a column substitutes it in this row, or may drop the row
+                if sense == {LE: GE, GE: LE}[bounded] or row_terms[r] is None or column not in row_terms[r]:
+                    continue
+                coef, rhs = row_terms[r][column], row_rhs[r]
+                minimum, maximum, minimum_inf, maximum_inf = activity(row_terms[r])
+                extreme, infinite = (minimum, minimum_inf) if bounded == LE else (maximum, maximum_inf)
+                # Bound implied by the extreme activity of the other columns: coef * column <= rhs - rest (or >=)
+                upper_bound = (coef > 0) == (bounded == LE)
+                own = lower[column] if upper_bound else upper[column]
+                if infinite > (1 if math.isinf(own) else 0):
+                    continue
+                bound = (rhs - (extreme - (0.0 if math.isinf(own) else coef * own))) / coef
+                if upper_bound:
+                    set_bounds(column, -math.inf, bound)
+                else:
+                    set_bounds(column, bound, math.inf)
+
+    def merge_duplicates() -> bool:
+        """Merge rows with equal (scaled) terms into their tightest bounds, returning whether equalities emerged."""
+        groups: Dict[Tuple[Tuple[int, float], ...], List[int]] = {}
+        for r, terms in enumerate(row_terms):
+            if terms:
+                key, _, _ = normalized(terms, row_sense[r], row_rhs[r])
+                groups.setdefault(key, []).append(r)
+        found = False
+        for key, members in groups.items():
+            if len(members) < 2:
+                continue
+            upper_rhs, lower_rhs = math.inf, -math.inf
+            for r in members:
+                _, sense, rhs = normalized(row_terms[r], row_sense[r], row_rhs[r])
+                if sense != GE:
+                    upper_rhs = min(upper_rhs, rhs)
+                if sense != LE:
+                    lower_rhs = max(lower_rhs, rhs)
+            if lower_rhs > upper_rhs + 1e-6:
+                infeasible(members[0])
+            for r in members:
+                drop(r)
+            terms = dict(key)
+            if abs(upper_rhs - lower_rhs) <= EPSILON:
+                enqueue(add(terms, EQ, upper_rhs))
+                found = True
+                continue
+            if not math.isinf(upper_rhs):
+                add(terms, LE, upper_rhs)
+            if not math.isinf(lower_rhs):
+                add(terms, GE, lower_rhs)
+        return found
+
+    for r in range(num_rows):
+        enqueue(r)
+    for _ in range(MAX_ROUNDS):
+        while queue:
+            r = queue.popleft()
+            queued[r] = False
+            if row_terms[r] is not None:
+                propagate(r)
+        if not merge_duplicates():
+            break
+
+    # Columns in no row take their best bound
+    for column in range(num_columns):
+        if removed[column] or column_rows[column]:
+            continue
+        if objective[column] > 0 and not math.isinf(lower[column]):
+            substitute(column, -1, 0.0, lower[column])
+        elif objective[column] < 0 and not math.isinf(upper[column]):
+            substitute(column, -1, 0.0, upper[column])
+        elif objective[column] == 0:
+            substitute(column, -1, 0.0, min(max(0.0, lower[column]), upper[column]))
+
+    # Build the reduced model from the remaining columns and rows
+    columns = [column for column in range(num_columns) if not removed[column]]
+    reduced = ReducedModel(model, columns)
+    index = {column: j for j, column in enumerate(columns)}
+    for j, column in enumerate(columns):
+        reduced.lower[j] = lower[column]
+        reduced.upper[j] = upper[column]
+        reduced.objective[j] = objective[column]
+    remaining = 0
+    for r, terms in enumerate(row_terms):
+        if terms:
+            reduced.add_column_row(((index[column], coef) for column, coef in sorted(terms.items())), row_sense[r], row_rhs[r])
+            remaining += 1
+    return Presolved(model, reduced, eliminated, objective_offset, num_rows - remaining)
+
+def max_violation(model: Model, solution: Solution) -> float:
+    """Largest violation of a row, column bound or integrality of the model by the solution (0 if feasible)."""
+    values = solution.values
+    violation = 0.0
+    for j in range(model.num_columns):
+        value = values[j]
+        violation = max(violation, model.lower[j] - value, value - model.upper[j])
+        if model.vtype[j] != VTYPES['continuous']:
+            violation = max(violation, abs(value - round(value)))
+    starts = model.row_starts()
+    for r in range(model.num_rows):
+        row_activity = math.fsum(model.coef[k] * values[model.col[k]] for k in range(starts[r], starts[r + 1]))
+        excess = row_activity - model.rhs[r]
+        sense = model.sense[r]
+        violation = max(violation, abs(excess) if sense == SENSES[EQ] else excess if sense == SENSES[LE] else -excess)
+    return violation
+
+def presolve_report(presolved: Presolved) -> str:
+    """One-line summary of the reductions."""
+    original, reduced = presolved.original, presolved.model
+    return (
+        f"Presolve: {original.num_columns - reduced.num_columns} of {original.num_columns} variables and "
+        f"{presolved.removed_rows} of {reduced.num_rows + presolved.removed_rows} constraints removed"
+    )
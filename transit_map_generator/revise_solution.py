@@ -1,33 +1,34 @@
-from typing import Dict, Any, TextIO, Callable
-import json
+from typing import Dict, Any, Callable, Iterable, Tuple
+from array import array
 
-def create_revise_solution(graph: Dict[str, Any], settings: Dict[str, Any]) -> Callable[[TextIO], Dict[str, Any]]:
-    """Create a function to revise the SCIP solution."""
-    def revise_solution(solution_stream: TextIO) -> Dict[str, Any]:
-        # Create a deep copy of the input graph to avoid modifying the original
-        graph_copy = json.loads(json.dumps(graph))
-        
-        # Parse the SCIP solution file
-        solution = {}
-        for line in solution_stream:
-            # Skip objective value line
-            if line.startswith('objective value:') or line.startswith('solution status:'):
-                continue
-            
-            # Parse variable and value
-            parts = line.strip().split()
-            if len(parts) >= 2:
-                variable, value = parts[:2]
-                solution[variable] = float(value)
-        
-        # Update node coordinates
-        for i, node in enumerate(graph_copy['nodes']):
-            # Get the new coordinates from the solution
-            # Subtract the offset to get back to the original coordinate space
-            if f'vx{i}' in solution and f'vy{i}' in solution:
-                node['metadata']['x'] = round(solution[f'vx{i}'] - settings['offset'], 5)
-                node['metadata']['y'] = round(solution[f'vy{i}'] - settings['offset'], 5)
-        
-        return graph_copy
-    
-    return revise_solution 
+from .model import Solution
+
+def solution_coordinates(solution: Solution, settings: Dict[str, Any]) -> Tuple[array, array]:
+    """Solved node coordinates in node order, moved back from the solver's offset."""
+    offset = settings['offset']
+    xs = array('d', (round(x - offset, 5) for x in solution['vx']))
+    ys = array('d', (round(y - offset, 5) for y in solution['vy']))
+    return xs, ys
+
+def with_coordinates(graph: Dict[str, Any], coordinates: Iterable[Tuple[float, float]]) -> Dict[str, Any]:
+    """Layout of the graph with the given node coordinates, in node order.
+
+    The graph is left untouched. The layout is a new graph dict with new node
+    dicts and node metadata dicts; the edges, lines and all other values are
+    shared with the graph, so treat both as read-only (or copy them) after
+    this call.
+    """
+    layout = dict(graph)
+    layout['nodes'] = [
+        {**node, 'metadata': {**node['metadata'], 'x': x, 'y': y}}
+        for node, (x, y) in zip(graph['nodes'], coordinates)
+    ]
+    return layout
+
+def create_revise_solution(graph: Dict[str, Any], settings: Dict[str, Any]) -> Callable[[Solution], Dict[str, Any]]:
+    """Create a function to revise the solver solution."""
+    def revise_solution(solution: Solution) -> Dict[str, Any]:
+        # Write the solved coordinates once into a layout sharing everything else with the graph
+        return with_coordinates(graph, zip(*solution_coordinates(solution, settings)))
+
+    return revise_solution
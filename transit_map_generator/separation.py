@@ -0,0 +1,59 @@
+from typing import Dict, Any, List, Set, Tuple
+import math
+
+from .network import Network
+from .spatial import box_pairs
+
+# occlusion constraints separate edges by at least 1 along one of the four
+# directions, i.e. by at least 1/sqrt(2) in the diagonal case
+MIN_SEPARATION = 1 / math.sqrt(2)
+
+def _orientation(ax: float, ay: float, bx: float, by: float, cx: float, cy: float) -> float:
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def _point_segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def segment_distance(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+    """Euclidean distance between two segments (x1, y1, x2, y2), 0 if they cross."""
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    d1 = _orientation(ax1, ay1, ax2, ay2, bx1, by1)
+    d2 = _orientation(ax1, ay1, ax2, ay2, bx2, by2)
+    d3 = _orientation(bx1, by1, bx2, by2, ax1, ay1)
+    d4 = _orientation(bx1, by1, bx2, by2, ax2, ay2)
+    if ((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0)):
+        return 0.0
+    return min(
+        _point_segment_distance(ax1, ay1, bx1, by1, bx2, by2),
+        _point_segment_distance(ax2, ay2, bx1, by1, bx2, by2),
+        _point_segment_distance(bx1, by1, ax1, ay1, ax2, ay2),
+        _point_segment_distance(bx2, by2, ax1, ay1, ax2, ay2)
+    )
+
+def find_conflicts(network: Network, solution: Dict[str, Any],
+                   min_separation: float = MIN_SEPARATION) -> Set[Tuple[int, int]]:
+    """Find non-adjacent edge pairs that cross or come too close in a revised solution graph."""
+    nodes = solution['nodes']
+    segments: List[Tuple[float, float, float, float]] = []
+    boxes = []
+    for e in network.edges:
+        source = nodes[e.source]['metadata']
+        target = nodes[e.target]['metadata']
+        segment = (source['x'], source['y'], target['x'], target['y'])
+        segments.append(segment)
+        margin = min_separation / 2
+        boxes.append((
+            min(segment[0], segment[2]) - margin, min(segment[1], segment[3]) - margin,
+            max(segment[0], segment[2]) + margin, max(segment[1], segment[3]) + margin
+        ))
+
+    epsilon = 1e-6
+    return {
+        (o, i) for o, i in box_pairs(boxes, max(min_separation, 1.0))
+        if not network.edges[o].is_adjacent(network.edges[i]) and
+        segment_distance(segments[o], segments[i]) < min_separation - epsilon
+    }
@@ -0,0 +1,120 @@
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import math
+
+from .network import Network
+
+Box = Tuple[float, float, float, float]
+
+@dataclass
+class PairReport:
+    """Statistics of the edge pair enumeration, and the number of generated rows per constraint family."""
+    total_pairs: int
+    adjacent_pairs: int
+    candidate_pairs: int = 0
+    pruned_pairs: int = 0
+    occlusion_constraints: int = 0
+    rows: Dict[str, int] = field(default_factory=dict)
+
+    def finish(self) -> None:
+        """Derive the number of pruned pairs once all candidates were counted."""
+        self.pruned_pairs = self.total_pairs - self.adjacent_pairs - self.candidate_pairs
+
+def median_edge_length(network: Network) -> float:
+    """Median length of the non-degenerate edges in input coordinates."""
+    xs, ys = network.xs, network.ys
+    lengths = sorted(
+        l for l in (
+            math.hypot(xs[e.target] - xs[e.source], ys[e.target] - ys[e.source])
+            for e in network.edges
+        ) if l > 0
+    )
+    if not lengths:
+        return 1.0
+    return lengths[len(lengths) // 2]
+
+def adjacent_pairs(network: Network) -> List[Tuple[int, int]]:
+    """Find all pairs (o < i) of edges sharing a node, in index order, using the incidence lists."""
+    pairs = set()
+    for incident in network.incidence:
+        for a in range(len(incident)):
+            for b in range(a + 1, len(incident)):
+                o, i = incident[a], incident[b]
+                pairs.add((o, i) if o < i else (i, o))
+    return sorted(pairs)
+
+def candidate_pairs(network: Network, radius: Optional[float]) -> Iterator[Tuple[int, int]]:
+    """Stream pairs of non-adjacent edges whose bounding boxes are at most `radius` median edge lengths apart."""
+    edges = network.edges
+    if radius is None or not math.isfinite(radius):
+        for o in range(len(edges)):
+            for i in range(o + 1, len(edges)):
+                if not edges[o].is_adjacent(edges[i]):
+                    yield o, i
+        return
+
+    # Expand each bounding box by half the radius, so overlapping boxes are close enough
+    scale = median_edge_length(network)
+    margin = max(radius, 0) * scale / 2
+    xs, ys = network.xs, network.ys
+    boxes = []
+    for e in edges:
+        x1, x2 = sorted((xs[e.source], xs[e.target]))
+        y1, y2 = sorted((ys[e.source], ys[e.target]))
+        boxes.append((x1 - margin, y1 - margin, x2 + margin, y2 + margin))
+
+    for o, i in box_pairs(boxes, max(2 * margin, scale)):
+        if not edges[o].is_adjacent(edges[i]):
+            yield o, i
+
+def box_pairs(boxes: List[Box], cell: float) -> Iterator[Tuple[int, int]]:
+    """Stream all pairs (o < i) of overlapping bounding boxes using a uniform grid of the given cell size.
+
+    Each pair is reported once, from the cell holding the lower left corner of
+    the boxes' intersection, so no set of seen pairs is needed.
+    """
+    # Bucket the boxes into a uniform grid
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    for index, (x1, y1, x2, y2) in enumerate(boxes):
+        for cx in range(math.floor(x1 / cell), math.floor(x2 / cell) + 1):
+            for cy in range(math.floor(y1 / cell), math.floor(y2 / cell) + 1):
+                grid.setdefault((cx, cy), []).append(index)
+
+    # Compare only boxes sharing a grid cell
+    for (cx, cy), bucket in grid.items():
+        for a in range(len(bucket)):
+            o = bucket[a]
+            ox1, oy1, ox2, oy2 = boxes[o]
+            for b in range(a + 1, len(bucket)):
+                i = bucket[b]
+                ix1, iy1, ix2, iy2 = boxes[i]
+                if ox1 <= ix2 and ix1 <= ox2 and oy1 <= iy2 and iy1 <= oy2:
+                    if math.floor(max(ox1, ix1) / cell) == cx and math.floor(max(oy1, iy1) / cell) == cy:
+                        yield (o, i) if o < i else (i, o)
+
+def occlusion_candidates(network: Network, radius: Optional[float], adjacent: List[Tuple[int, int]],
+                         occlusion_pairs: Optional[Set[Tuple[int, int]]] = None) -> Tuple[Iterator[Tuple[int, int]], PairReport]:
+    """Stream the non-adjacent edge pairs that need occlusion constraints.
+
+    These are the pairs at most `radius` median edge lengths apart, or only
+    `occlusion_pairs` if given. The report is complete once the stream is exhausted.
+    """
+    num_edges = len(network.edges)
+    report = PairReport(total_pairs=num_edges * (num_edges - 1) // 2, adjacent_pairs=len(adjacent))
+
+    if occlusion_pairs is None:
+        pairs: Iterator[Tuple[int, int]] = candidate_pairs(network, radius)
+    else:
+        edges = network.edges
+        pairs = (
+            (o, i) for o, i in sorted(occlusion_pairs)
+            if not edges[o].is_adjacent(edges[i])
+        )
+
+    def counted() -> Iterator[Tuple[int, int]]:
+        for pair in pairs:
+            report.candidate_pairs += 1
+            yield pair
+        report.finish()
+
+    return counted(), report
@@ -0,0 +1,145 @@
+from typing import Dict, Any, Callable, ContextManager, Iterable, Iterator, List, Optional
+from contextlib import contextmanager, nullcontext
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # no peak memory on this platform
+    resource = None
+
+from .model import Model
+from .spatial import PairReport
+
+# callback receiving each stage and model record as it is recorded, e.g. to forward it to a tracing system
+StatsHook = Callable[[Dict[str, Any]], None]
+
+def peak_rss(who: str = 'self') -> Optional[int]:
+    """Peak resident set size in bytes of this process, or of its terminated children (e.g. SCIP)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF)
+    # kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+def children_cpu() -> float:
+    """CPU seconds of the terminated child processes."""
+    times = os.times()
+    return times.children_user + times.children_system
+
+class Stats:
+    """Wall and CPU time, peak memory and model sizes of the stages of a layout.
+
+    Stage records have the `stage` name (`prepare`, `generate`, `solve`,
+    `revise`, `render`, ...), `wall_seconds`, `cpu_seconds` of this process,
+    `child_cpu_seconds` of solver processes and the peak RSS of this process
+    and of the solver processes (`peak_rss_bytes`, `child_peak_rss_bytes`,
+    high-water marks since the process started). A stage runs once per solve,
+    so lazy occlusion rounds and fallbacks add several records. Model records
+    have the variable and constraint counts per family of each solved model
+    and the size of its LP file. Each record is also passed to the `hooks`.
+    """
+
+    def __init__(self, hooks: Iterable[StatsHook] = ()):
+        self.hooks = list(hooks)
+        self.stages: List[Dict[str, Any]] = []
+        self.models: List[Dict[str, Any]] = []
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        for hook in self.hooks:
+            hook(record)
+
+    def add_stage(self, stage: str, wall_seconds: float, cpu_seconds: float, child_cpu_seconds: float = 0.0) -> None:
+        """Record a stage measured by the caller."""
+        record = {
+            'kind': 'stage',
+            'stage': stage,
+            'wall_seconds': round(wall_seconds, 6),
+            'cpu_seconds': round(cpu_seconds, 6),
+            'child_cpu_seconds': round(child_cpu_seconds, 6),
+            'peak_rss_bytes': peak_rss(),
+            'child_peak_rss_bytes': peak_rss('children')
+        }
+        self.stages.append(record)
+        self._emit(record)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Measure the enclosed code as one run of a stage."""
+        wall, cpu, child_cpu = time.perf_counter(), time.process_time(), children_cpu()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - wall, time.process_time() - cpu, children_cpu() - child_cpu)
+
+    def add_model(self, model: Model, report: PairReport, lp_bytes: Optional[int] = None,
+                  presolved: Optional[Model] = None) -> None:
+        """Record the size of a solved model, with the LP file size if the backend wrote one.
+
+        With a `presolved` model, the record also has the sizes of the model the
+        solver received (and the LP file is the presolved one).
+        """
+        record = {
+            'kind': 'model',
+            'variables': {family.name: family.count for family in model.families},
+            'constraints': dict(report.rows),
+            'num_variables': model.num_columns,
+            'num_constraints': sum(report.rows.values()),
+            'occlusion_candidates': report.candidate_pairs,
+            'lp_bytes': lp_bytes
+        }
+        if presolved is not None:
+            record.update(presolved_variables=presolved.num_columns, presolved_constraints=presolved.num_rows)
+        self.models.append(record)
+        self._emit(record)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Summed times of each stage, in the order the stages first ran."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'], {'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                        'child_cpu_seconds': 0.0})
+            total['runs'] += 1
+            for key in ('wall_seconds', 'cpu_seconds', 'child_cpu_seconds'):
+                total[key] = round(total[key] + record[key], 6)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """All records and the stage totals, ready for `json.dumps`."""
+        return {
+            'stages': self.stages,
+            'totals': self.totals(),
+            'models': self.models,
+            'peak_rss_bytes': peak_rss(),
+            'child_peak_rss_bytes': peak_rss('children')
+        }
+
+def measure(stats: Optional[Stats], stage: str) -> ContextManager[Any]:
+    """Measure a stage if stats are collected."""
+    return stats.stage(stage) if stats is not None else nullcontext()
+
+class TimedRows:
+    """Iterate rows, accumulating the wall and CPU time spent producing them.
+
+    Streamed rows are produced while the backend consumes them, this separates
+    their generation from writing and solving.
+    """
+
+    def __init__(self, rows: Iterable[Any]):
+        self.rows = rows
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def __iter__(self) -> Iterator[Any]:
+        iterator = iter(self.rows)
+        while True:
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.wall_seconds += time.perf_counter() - wall
+                self.cpu_seconds += time.process_time() - cpu
+            yield row
@@ -1,40 +1,177 @@
-from typing import Dict, Any, Union
-import json
-import subprocess
-import tempfile
-from pathlib import Path
+from typing import Dict, Any, List, TextIO, Tuple
+from io import StringIO
+import math
+
+# number of elements collected before writing them to the output stream at once
+BUFFERED_ELEMENTS = 4096
+
+# Geometry of the map, in units of the mean edge length
+LINE_SPACING = 1 / 7
+STATION_RADIUS = 0.1
+TRANSIT_RADIUS = 0.13
+TRANSIT_RADIUS_STEP = 0.055
+PADDING = 0.6
+PIXELS_PER_UNIT = 20
+
+STYLE = '''
+\t.line {
+\t\tstroke: #333;
+\t\tstroke-width: .09;
+\t\tfill: none;
+\t\tstroke-linejoin: round;
+\t\tstroke-linecap: round;
+\t}
+\t.station {
+\t\tstroke: none;
+\t}
+\t.transit {
+\t\tstroke: #555;
+\t\tstroke-width: .05;
+\t\tfill: #fff;
+\t}
+'''
+
+ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+
+def escape(value: Any) -> str:
+    """Escape a value for an SVG attribute."""
+    return str(value).translate(ESCAPES)
+
+def js_number(value: float) -> str:
+    """Format a number like JavaScript does, as svg-transit-map did."""
+    if value == 0:
+        return '0'
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    text = repr(value)
+    if 'e' in text:
+        mantissa, exponent = text.split('e')
+        text = f"{mantissa}e{'-' if exponent[0] == '-' else '+'}{exponent.lstrip('+-').lstrip('0')}"
+    return text
+
+def round3(value: float) -> float:
+    """Round to 3 decimals, halves up like JavaScript's `Math.round`."""
+    return math.floor(value * 1000 + 0.5) / 1000
+
+class ElementBuffer:
+    """Collect SVG elements and write them to a stream in large chunks."""
+
+    def __init__(self, output_stream: TextIO, size: int = BUFFERED_ELEMENTS):
+        self.output_stream = output_stream
+        self.size = size
+        self.elements: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.elements.append(text)
+        if len(self.elements) >= self.size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.elements:
+            self.output_stream.write(''.join(self.elements))
+            self.elements = []
+
+def write_svg(graph: Dict[str, Any], output_stream: TextIO, invert_y: bool = False) -> None:
+    """Render a solved layout as SVG map, streaming the elements to the output.
+
+    Coordinates are scaled to a mean edge length of 1. Lines of the same
+    `group` share one stroke, parallel strokes are spread across their edge,
+    and stations served by several groups are drawn as transit stations
+    sized by the number of parallel strokes at the station.
+    """
+    flip = -1 if invert_y else 1
+    nodes = graph['nodes']
+    points: Dict[str, Tuple[float, float]] = {
+        node['id']: (node['metadata']['x'], node['metadata']['y'] * flip) for node in nodes
+    }
+    length = sum(math.dist(points[edge['source']], points[edge['target']]) for edge in graph['edges'])
+    scale = len(graph['edges']) / length if length > 0 else 1
+    for node_id, (x, y) in points.items():
+        points[node_id] = (x * scale, y * scale)
+
+    # Strokes of the edges, and the groups and parallel strokes at each station
+    lines = {line['id']: line for line in graph.get('lines', [])}
+
+    def group_of(line_id: str) -> str:
+        return lines.get(line_id, {}).get('group') or line_id
+
+    station_groups: Dict[str, Dict[str, str]] = {node['id']: {} for node in nodes}
+    parallel: Dict[str, int] = {node['id']: 0 for node in nodes}
+    strokes: List[List[str]] = []
+    for edge in graph['edges']:
+        first_lines: Dict[str, str] = {}
+        for line_id in edge['metadata']['lines']:
+            first_lines.setdefault(group_of(line_id), line_id)
+        strokes.append(list(first_lines.values()))
+        for node_id in (edge['source'], edge['target']):
+            for group, line_id in first_lines.items():
+                station_groups[node_id].setdefault(group, line_id)
+            parallel[node_id] = max(parallel[node_id], len(first_lines))
+
+    buffer = ElementBuffer(output_stream)
+    write = buffer.write
+
+    # Header
+    if points:
+        xs = [round3(x) for x, _ in points.values()]
+        ys = [round3(y) for _, y in points.values()]
+        left, top = round3(min(xs) - PADDING), round3(min(ys) - PADDING)
+        width = round3(max(xs) - min(xs) + 2 * PADDING)
+        height = round3(max(ys) - min(ys) + 2 * PADDING)
+    else:
+        left = top = width = height = 0.0
+    write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{js_number(round3(width * PIXELS_PER_UNIT))}" '
+        f'height="{js_number(round3(height * PIXELS_PER_UNIT))}" '
+        f'viewBox="{js_number(left)} {js_number(top)} {js_number(width)} {js_number(height)}">'
+    )
+    write(f'<style>{STYLE}</style><g>')
+
+    # Lines
+    stroke_attributes = {
+        line_id: f'class="line {escape(line_id)}" style="stroke: {escape(lines.get(line_id, {}).get("color", "#333"))};"'
+        for line_id in {line_id for edge_strokes in strokes for line_id in edge_strokes}
+    }
+    for edge, edge_strokes in zip(graph['edges'], strokes):
+        sx, sy = points[edge['source']]
+        tx, ty = points[edge['target']]
+        distance = math.hypot(tx - sx, ty - sy)
+        nx, ny = ((sy - ty) / distance, (tx - sx) / distance) if distance > 0 else (0.0, 0.0)
+        if (tx, ty) < (sx, sy):
+            # Keep the lines on the same side whatever the direction of the edge
+            nx, ny = -nx, -ny
+        for k, line_id in enumerate(edge_strokes):
+            offset = (k - (len(edge_strokes) - 1) / 2) * LINE_SPACING
+            dx, dy = nx * offset, ny * offset
+            write(
+                f'<path {stroke_attributes[line_id]} d="M{js_number(round3(sx + dx))} {js_number(round3(sy + dy))}'
+                f'L{js_number(round3(tx + dx))} {js_number(round3(ty + dy))}"></path>'
+            )
+
+    # Stations
+    for node in nodes:
+        x, y = points[node['id']]
+        groups = station_groups[node['id']]
+        attributes = [f'data-id="{escape(node["id"])}"']
+        if node.get('label') is not None:
+            attributes.append(f'data-label="{escape(node["label"])}"')
+        x, y = round3(x), round3(y)
+        if x:
+            attributes.append(f'cx="{js_number(x)}"')
+        if y:
+            attributes.append(f'cy="{js_number(y)}"')
+        if len(groups) > 1:
+            radius = round3(TRANSIT_RADIUS + TRANSIT_RADIUS_STEP * (parallel[node['id']] - 1))
+            write(f'<circle class="station transit" {" ".join(attributes)} r="{js_number(radius)}" fill="#333"></circle>')
+        else:
+            color = lines.get(next(iter(groups.values())), {}).get('color', '#333') if groups else '#333'
+            write(f'<circle class="station" {" ".join(attributes)} r="{js_number(STATION_RADIUS)}" fill="{escape(color)}"></circle>')
+
+    write('</g></svg>')
+    buffer.flush()
 
 def graph_to_svg(graph: Dict[str, Any], invert_y: bool = False) -> str:
-    """Convert the graph to an SVG representation using svg-transit-map."""
-    # Create a temporary file to store the graph JSON
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
-        json.dump(graph, tmp_file)
-        tmp_path = tmp_file.name
-    
-    try:
-        # Build the command
-        cmd = ['svg-transit-map']
-        if invert_y:
-            cmd.append('--invert-y')
-        
-        # Run svg-transit-map
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Feed the graph JSON to stdin
-        with open(tmp_path) as f:
-            svg_output, stderr = process.communicate(f.read())
-            
-        if process.returncode != 0:
-            raise RuntimeError(f"svg-transit-map failed: {stderr}")
-        
-        return svg_output
-        
-    finally:
-        # Clean up temporary file
-        Path(tmp_path).unlink() 
+    """Convert the graph to an SVG representation."""
+    output = StringIO()
+    write_svg(graph, output, invert_y)
+    return output.getvalue()
@@ -0,0 +1,97 @@
+from typing import Dict, Any, List, Tuple
+import math
+import random
+
+# colors of the synthetic lines, repeated for more lines
+PALETTE = ['#e2001a', '#0098a1', '#ffd900', '#55a822', '#672f17', '#6f4e9c', '#3690c0', '#ff7300']
+
+def network_builder() -> Tuple[Dict[str, Any], Any]:
+    """Empty network and a function adding a line through points, sharing the stations at equal points."""
+    network: Dict[str, Any] = {'nodes': [], 'edges': [], 'lines': []}
+    stations: Dict[Tuple[float, float], str] = {}
+    edges: Dict[frozenset, Dict[str, Any]] = {}
+
+    def station(point: Tuple[float, float]) -> str:
+        if point not in stations:
+            stations[point] = f"s{len(stations)}"
+            network['nodes'].append({
+                'id': stations[point],
+                'label': f"Station {len(stations)}",
+                'metadata': {'x': point[0], 'y': point[1]}
+            })
+        return stations[point]
+
+    def add_line(points: List[Tuple[float, float]]) -> None:
+        line_id = f"L{len(network['lines']) + 1}"
+        network['lines'].append({'id': line_id, 'color': PALETTE[len(network['lines']) % len(PALETTE)]})
+        ids = [station(point) for point in points]
+        for source, target in zip(ids, ids[1:]):
+            key = frozenset((source, target))
+            if key not in edges:
+                edges[key] = {'source': source, 'target': target, 'metadata': {'lines': []}}
+                network['edges'].append(edges[key])
+            edges[key]['metadata']['lines'].append(line_id)
+
+    return network, add_line
+
+def jitter(rng: random.Random, amount: float) -> float:
+    return round(rng.uniform(-amount, amount), 3)
+
+def grid_network(lines: int, stations: int, seed: int = 0) -> Dict[str, Any]:
+    """Grid city: alternately horizontal and vertical lines of `stations` stations each.
+
+    Lines cross at shared transfer stations. Station positions are slightly
+    jittered (reproducibly by `seed`), so that not all edges are octilinear.
+    """
+    rng = random.Random(seed)
+    network, add_line = network_builder()
+    horizontal = (lines + 1) // 2
+    vertical = lines // 2
+    positions = {
+        (x, y): (x + jitter(rng, 0.2), y + jitter(rng, 0.2))
+        for x in range(stations) for y in range(stations)
+    }
+    for k in range(lines):
+        count = horizontal if k % 2 == 0 else vertical
+        offset = (k // 2 + 1) * stations // (count + 1)
+        if k % 2 == 0:
+            add_line([positions[(x, offset)] for x in range(stations)])
+        else:
+            add_line([positions[(offset, y)] for y in range(stations)])
+    return network
+
+def radial_network(lines: int, stations: int, seed: int = 0) -> Dict[str, Any]:
+    """Radial city: `lines` lines of `stations` stations each through a common central station.
+
+    The lines cross the center at evenly spread angles, with slightly
+    jittered stations (reproducibly by `seed`).
+    """
+    rng = random.Random(seed)
+    network, add_line = network_builder()
+    half = stations // 2
+    for k in range(lines):
+        angle = math.pi * k / lines
+        points = []
+        for j in range(-half, stations - half):
+            if j == 0:
+                points.append((0.0, 0.0))
+                continue
+            points.append((
+                round(j * math.cos(angle) + jitter(rng, 0.15), 3),
+                round(j * math.sin(angle) + jitter(rng, 0.15), 3)
+            ))
+        add_line(points)
+    return network
+
+GENERATORS = {'grid': grid_network, 'radial': radial_network}
+
+def synthetic_network(spec: str) -> Dict[str, Any]:
+    """Synthetic network of a spec like `grid:4x10` or `radial:6x15` (lines x stations per line)."""
+    kind, _, size = spec.partition(':')
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown synthetic network '{kind}', use one of: {', '.join(GENERATORS)}")
+    try:
+        lines, stations = (int(part) for part in size.split('x'))
+    except ValueError:
+        raise ValueError(f"Invalid synthetic network size '{size}', use LINESxSTATIONS like 4x10")
+    return GENERATORS[kind](lines, stations)
@@ -1,85 +1,445 @@
 import os
-import tempfile
-from pathlib import Path
-from typing import Dict, Any, Optional
-import subprocess
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Set, Tuple, Union
 
-from .prepare_graph import prepare_graph
-from .generate_lp import create_generate_lp
+from .prepare_graph import prepare_graph, prepare_network
+from .network import compile_network
+from .bounds import resolve_settings
+from .generate_lp import create_build_problem, create_generate_lp, create_stream_problem
 from .revise_solution import create_revise_solution
+from .spatial import PairReport
+from .separation import find_conflicts
+from .model import Model, NoSolutionError, Solution
+from .contract import expand_chains
+from .decompose import connected_components, stitch_components
+from .incremental import changed_nodes, local_subgraph, merge_layout, neighborhood, node_coordinates
+from .warm_start import create_warm_start
+from .heuristic import create_heuristic_layout, length_violations
+from .presolve import Presolved, presolve, presolve_report
+from .cache import SolutionCache, apply_layout, layout_entry, solution_key
+from .backends import SolverBackend, get_backend, run_scip
+from .parallel import resolve_jobs
+from .portfolio import create_portfolio
+from .stats import Stats, TimedRows, children_cpu, measure
 
 # solver settings
 SETTINGS = {
-    'offset': 10000,
-    'max_width': 300,
-    'max_height': 300,
+    # solver coordinate of the first node and the coordinate range around it
+    # (None: derived from the network, see `bounds.resolve_settings`)
+    'offset': None,
+    'max_width': None,
+    'max_height': None,
     'min_edge_length': 1,
-    'max_edge_length': 8
+    'max_edge_length': 8,
+    # bound the coordinates of each node by the paths to the first node along
+    # the edge directions of the input geometry (see `bounds.coordinate_windows`)
+    'coordinate_windows': True,
+    # big-M of the product and direction constraints (None: the tightest
+    # valid one per constraint)
+    'big_m': None,
+    # occlusion constraints are only generated for edge pairs at most this many
+    # median input edge lengths apart (None: all pairs); a radius may miss
+    # pairs that the layout moves closer together
+    'occlusion_radius': None
 }
 
 # script default options
 DEFAULTS = {
+    # directory keeping the problem and solution files of the scip backend,
+    # for debugging (None: the problem is piped to scip, nothing is written)
     'work_dir': None,
-    'verbose': False
+    'verbose': False,
+    'settings': None,
+    # solve without occlusion constraints first and only add those of
+    # conflicting edge pairs in subsequent rounds
+    'lazy_occlusion': False,
+    # solver backend, see `backends.BACKENDS`
+    'backend': 'scip',
+    # limit of solver threads per solve (None: solver default), and a
+    # semaphore bounding the concurrently running solvers (e.g. of a batch)
+    'solver_threads': None,
+    'solver_slots': None,
+    # solver limits: wall-clock seconds, relative gap and branch-and-bound
+    # nodes (None: no limit); the best layout found so far is returned
+    'time_limit': None,
+    'gap_limit': None,
+    'node_limit': None,
+    # called with each improved layout while solving (not with incremental
+    # re-layout or decomposition)
+    'on_incumbent': None,
+    # race several SCIP configurations on each problem: profile names (see
+    # `portfolio.PROFILES`) or a number of the best ones, and a JSON file
+    # recording their wins
+    'portfolio': None,
+    'portfolio_stats': None,
+    # number of worker processes generating the constraints (0: one per CPU)
+    'jobs': 1,
+    # layout engine: 'milp' (solved exactly) or 'heuristic' (octilinear
+    # preview in milliseconds to seconds, without a solver, see `heuristic`)
+    'engine': 'milp',
+    # MIP start: None, 'input' (closest directions of the input geometry),
+    # 'heuristic' (the heuristic layout) or a previously solved layout graph
+    # of the same network
+    'warm_start': None,
+    # directory of the solution cache (None: no caching) and its size limit in bytes
+    'cache_dir': None,
+    'cache_size': 256 * 2**20,
+    # incremental re-layout: a previously solved layout graph, optionally its
+    # input graph (to detect moved nodes), and the number of edges around the
+    # changed nodes that are re-optimized
+    'previous': None,
+    'previous_input': None,
+    'relayout_hops': 2,
+    # solve with chains of degree-2 nodes contracted into single edges, and
+    # place their nodes evenly along the solved edges
+    'contract_chains': False,
+    # solve the connected components separately (concurrently with `jobs`)
+    # and stitch their layouts with separated bounding boxes
+    'decompose': False,
+    # `stats.Stats` collecting the time and memory of each stage and the
+    # model sizes (None: not collected)
+    'stats': None,
+    # reduce the model before handing it to the solver: substitute fixed
+    # variables, drop the rows they make redundant and merge duplicate rows
+    'presolve': False
 }
 
 class Solver:
-    def __init__(self, network_graph: Dict[str, Any]):
-        self.graph = prepare_graph(network_graph)
-        self.generate_lp = create_generate_lp(self.graph, SETTINGS)
-        self.revise_solution = create_revise_solution(self.graph, SETTINGS)
-
-def run_scip(cwd: str, verbose: bool = False) -> None:
-    """Run SCIP solver on the problem file and generate solution."""
-    problem_path = os.path.join(cwd, 'problem.lp')
-    solution_path = os.path.join(cwd, 'solution.sol')
-    
-    cmd = [
-        'scip',
-        '-c', f'read {problem_path}',
-        '-c', 'optimize',
-        '-c', f'write solution {solution_path}',
-        '-c', 'quit'
-    ]
-    
+    def __init__(self, network_graph: Dict[str, Any], settings: Optional[Dict[str, Any]] = None,
+                 backend: Union[str, SolverBackend] = 'scip',
+                 jobs: int = 1, fixed: Optional[Dict[int, Tuple[float, float]]] = None, contract: bool = False,
+                 stats: Optional[Stats] = None, presolve: bool = False):
+        self.jobs = resolve_jobs(jobs)
+        self.stats = stats
+        self.presolve = presolve
+        with measure(stats, 'prepare'):
+            self.network = prepare_network(network_graph, contract)
+            self.settings = resolve_settings(self.network, {**SETTINGS, **(settings or {})})
+        self.graph = self.network.graph
+        self.stream_problem = create_stream_problem(self.network, self.settings, fixed)
+        self.build_problem = create_build_problem(self.network, self.settings, fixed)
+        self.generate_lp = create_generate_lp(self.network, self.settings, fixed)
+        self.revise_solution = create_revise_solution(self.graph, self.settings)
+        self.warm_start = create_warm_start(self.network, self.settings)
+        self.backend = get_backend(backend)
+
+def print_pair_report(report: PairReport) -> None:
+    """Log the edge pair enumeration statistics to stderr."""
+    print(
+        f"Edge pairs: {report.total_pairs} total, {report.adjacent_pairs} adjacent, "
+        f"{report.candidate_pairs} occlusion candidates, {report.pruned_pairs} pruned",
+        file=sys.stderr
+    )
+
+def mip_start(solver: Solver, model: Model, warm_start: Any) -> Optional[Solution]:
+    """MIP start for the `warm_start` option."""
+    if not warm_start:
+        return None
+    if warm_start == 'input':
+        return solver.warm_start(model)
+    if warm_start == 'heuristic':
+        return solver.warm_start(model, create_heuristic_layout(solver.network, solver.settings)())
+    return solver.warm_start(model, warm_start)
+
+def solve(solver: Solver, work_dir: Optional[str], verbose: bool = False, occlusion_pairs: Optional[Set[Tuple[int, int]]] = None,
+          warm_start: Any = None, on_incumbent: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[Dict[str, Any], PairReport]:
+    """Build the problem, solve it with the solver backend and revise the solution.
+
+    With presolve, the backend solves the reduced model and its solutions are
+    mapped back to the full model. `on_incumbent` is called with the revised
+    layout of each improved solution.
+    """
+    presolved: Optional[Presolved] = None
+
+    def full_solution(solution: Solution) -> Solution:
+        return presolved.postsolve(solution) if presolved is not None else solution
+
+    report_incumbent = on_incumbent and (lambda solution: on_incumbent(solver.revise_solution(full_solution(solution))))
+    stats = solver.stats
+    started = time.perf_counter(), time.process_time()
+    # Let the workers format the LP lines as well
+    formatted = solver.jobs > 1 and solver.backend.writes_lp and not solver.presolve
+    model, rows, report = solver.stream_problem(occlusion_pairs, solver.jobs, short_names=True if formatted else None)
+    if stats is not None:
+        rows = timed = TimedRows(rows)
+        generated = time.perf_counter() - started[0], time.process_time() - started[1]
+    start = mip_start(solver, model, warm_start)
+
+    # Reduce the model, the reduced model holds the remaining rows
+    solved_model = model
+    if solver.presolve:
+        presolving = time.perf_counter(), time.process_time()
+        presolved = presolve(model, rows)
+        solved_model, rows = presolved.model, None
+        start = start and presolved.reduce(start)
+        if stats is not None:
+            stats.add_stage('presolve', time.perf_counter() - presolving[0] - timed.wall_seconds,
+                            time.process_time() - presolving[1] - timed.cpu_seconds)
+        if verbose:
+            print(presolve_report(presolved), file=sys.stderr)
+
+    solving = time.perf_counter(), time.process_time(), children_cpu()
+    if stats is not None:
+        consumed = timed.wall_seconds, timed.cpu_seconds
+    if formatted:
+        solution = solver.backend.solve(model, work_dir, verbose, blocks=rows, start=start, on_incumbent=report_incumbent)
+    else:
+        solution = solver.backend.solve(solved_model, work_dir, verbose, rows, start=start, on_incumbent=report_incumbent)
+    solution = full_solution(solution)
+    if verbose:
+        print_pair_report(report)
+    if stats is not None:
+        # Rows are generated while the backend (or presolve) reads them
+        stats.add_stage('generate', generated[0] + timed.wall_seconds, generated[1] + timed.cpu_seconds)
+        stats.add_stage(
+            'solve', time.perf_counter() - solving[0] - (timed.wall_seconds - consumed[0]),
+            time.process_time() - solving[1] - (timed.cpu_seconds - consumed[1]), children_cpu() - solving[2]
+        )
+        stats.add_model(model, report, solver.backend.lp_bytes, presolved.model if presolved is not None else None)
+    with measure(stats, 'revise'):
+        return solver.revise_solution(solution), report
+
+def solve_lazy(solver: Solver, work_dir: Optional[str], verbose: bool = False, warm_start: Any = None,
+               on_incumbent: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[Dict[str, Any], List[Dict[str, int]]]:
+    """Solve without occlusion constraints, then add those of conflicting edge pairs and re-solve until the layout is clean."""
+    occlusion_pairs: Set[Tuple[int, int]] = set()
+    rounds: List[Dict[str, int]] = []
+    previous_constraints = 0
+
+    while True:
+        solution, report = solve(solver, work_dir, verbose, occlusion_pairs, warm_start, on_incumbent)
+        conflicts = find_conflicts(solver.network, solution) - occlusion_pairs
+        rounds.append({
+            'round': len(rounds) + 1,
+            'constraints_added': report.occlusion_constraints - previous_constraints,
+            'conflicts': len(conflicts)
+        })
+        previous_constraints = report.occlusion_constraints
+        if verbose:
+            print(
+                f"Separation round {len(rounds)}: {rounds[-1]['constraints_added']} occlusion constraints added, "
+                f"{len(conflicts)} new conflicting edge pairs",
+                file=sys.stderr
+            )
+
+        if not conflicts:
+            return solution, rounds
+        occlusion_pairs |= conflicts
+
+def solve_incremental(network_graph: Dict[str, Any], options: Dict[str, Any]) -> Tuple[Dict[str, Any], Set[str]]:
+    """Re-layout only the neighborhood of the nodes changed since the previous layout.
+
+    All other nodes keep their previous coordinates. If the local problem is
+    infeasible or the merged layout has new conflicts, the region grows until
+    the layout is clean, at most to the whole network. Returns the layout and
+    the re-optimized nodes.
+    """
+    previous = options['previous']
+    graph = prepare_graph(network_graph)
+    network = compile_network(graph)
+    node_ids = set(network.node_ids)
+    changed = changed_nodes(previous, graph, options['previous_input'])
+    hops = options['relayout_hops']
+    # Derive the settings from the whole network, so that all subgraphs share the offset
+    settings = resolve_settings(network, {**SETTINGS, **(options['settings'] or {})})
+    offset = settings['offset']
+
+    while True:
+        region = neighborhood(graph, changed, hops)
+        if not region:
+            return merge_layout(graph, previous), region
+        if region >= node_ids:
+            solver = Solver(graph, settings, options['backend'], options['jobs'], stats=options['stats'],
+                            presolve=options['presolve'])
+            solution, _ = solve(solver, options['work_dir'], options['verbose'], warm_start=options['warm_start'])
+            return solution, region
+
+        # Solve the subgraph around the region, with its boundary nodes fixed
+        subgraph = local_subgraph(graph, region)
+        coordinates = node_coordinates(previous)
+        fixed = {
+            i: (coordinates[node['id']][0] + offset, coordinates[node['id']][1] + offset)
+            for i, node in enumerate(subgraph['nodes']) if node['id'] not in region
+        }
+        solver = Solver(subgraph, settings, options['backend'], options['jobs'], fixed, stats=options['stats'],
+                        presolve=options['presolve'])
+        if options['verbose']:
+            print(f"Incremental re-layout of {len(region)} nodes ({len(fixed)} fixed boundary nodes)", file=sys.stderr)
+        try:
+            local, _ = solve(solver, options['work_dir'], options['verbose'])
+        except NoSolutionError:
+            hops += 1
+            continue
+
+        # Grow the region by the edges in conflict with re-optimized ones
+        layout = merge_layout(graph, previous, local)
+        conflicting = set()
+        for pair in find_conflicts(network, layout):
+            nodes = {network.node_ids[n] for e in pair for n in (network.edges[e].source, network.edges[e].target)}
+            if nodes & region:
+                conflicting |= nodes
+        if not conflicting:
+            return layout, region
+        if conflicting <= changed:
+            hops += 1
+        changed |= conflicting
+
+def solve_network(solver: Solver, network_graph: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Solve the network of the solver in the mode given by the options and expand contracted chains."""
+    on_incumbent = options['on_incumbent'] and (lambda layout: options['on_incumbent'](expand_chains(layout)))
+
+    def solve_with(solver: Solver) -> Dict[str, Any]:
+        if options['previous'] is not None:
+            return solve_incremental(network_graph, options)[0]
+        if options['lazy_occlusion']:
+            return solve_lazy(solver, options['work_dir'], options['verbose'], options['warm_start'], on_incumbent)[0]
+        return solve(solver, options['work_dir'], options['verbose'], warm_start=options['warm_start'],
+                     on_incumbent=on_incumbent)[0]
+
     try:
-        process = subprocess.Popen(
-            cmd,
-            cwd=cwd,
-            stdout=subprocess.PIPE if not verbose else None,
-            stderr=subprocess.PIPE,
-            text=True
+        solution = solve_with(solver)
+    except NoSolutionError:
+        # Straightened chains can make the occlusion constraints infeasible
+        if 'contracted' not in solver.graph:
+            raise
+        if options['verbose']:
+            print("Contracted network is infeasible, solving the full network", file=sys.stderr)
+        solution = solve_with(Solver(network_graph, options['settings'], options['backend'], solver.jobs,
+                                     stats=options['stats'], presolve=solver.presolve))
+    with measure(options['stats'] if 'contracted' in solution else None, 'expand'):
+        return expand_chains(solution)
+
+def solve_component(component: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Solve one connected component in its own work dir, if any (process pool task)."""
+    if options['work_dir']:
+        os.makedirs(options['work_dir'], exist_ok=True)
+    solver = Solver(component, options['settings'], options['backend'], contract=options['contract_chains'],
+                    stats=options['stats'], presolve=options['presolve'])
+    return solve_network(solver, component, options)
+
+def solve_components(components: List[Dict[str, Any]], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Solve the connected components, concurrently in `jobs` processes.
+
+    Each component is solved in a `component-<i>` subdirectory of the work
+    dir, if any, largest components first. Stats are only collected without
+    worker processes.
+    """
+    jobs = min(resolve_jobs(options['jobs']), len(components))
+    tasks = [
+        (component, {**options, 'work_dir': options['work_dir'] and os.path.join(options['work_dir'], f"component-{i}"),
+                     'on_incumbent': None, 'stats': options['stats'] if jobs <= 1 else None})
+        for i, component in enumerate(components)
+    ]
+    order = sorted(range(len(tasks)), key=lambda i: -len(components[i]['edges']))
+    if jobs <= 1:
+        return [solve_component(*task) for task in tasks]
+    layouts: List[Dict[str, Any]] = [{}] * len(tasks)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {i: executor.submit(solve_component, *tasks[i]) for i in order}
+        for i in order:
+            layouts[i] = futures[i].result()
+    return layouts
+
+def heuristic_map(network_graph: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Lay out the network with the heuristic engine, optionally with contracted chains.
+
+    The heuristic may leave conflicting edges or edges outside the length
+    bounds, which are reported to stderr.
+    """
+    settings = {**SETTINGS, **(options['settings'] or {})}
+    with measure(options['stats'], 'prepare'):
+        network = prepare_network(network_graph, options['contract_chains'])
+    with measure(options['stats'], 'heuristic'):
+        layout = create_heuristic_layout(network, settings)()
+    conflicts = find_conflicts(network, layout)
+    violations = length_violations(network, settings, [(node['metadata']['x'], node['metadata']['y']) for node in layout['nodes']])
+    if conflicts or violations:
+        print(
+            f"Heuristic layout: {len(conflicts)} conflicting edge pairs, "
+            f"{len(violations)} edges outside the edge length bounds",
+            file=sys.stderr
         )
-        _, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            raise RuntimeError(f"SCIP solver failed: {stderr}")
-            
-    except FileNotFoundError:
-        raise RuntimeError("Make sure 'scip' is in your PATH")
+    with measure(options['stats'] if 'contracted' in layout else None, 'expand'):
+        return expand_chains(layout)
 
 def transit_map(network_graph: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Generate a transit map layout from a network graph."""
     # Merge options with defaults
     options = {**DEFAULTS, **(options or {})}
+    if options['engine'] == 'heuristic':
+        return heuristic_map(network_graph, options)
+    if options['engine'] != 'milp':
+        raise ValueError(f"Unknown layout engine '{options['engine']}', use 'milp' or 'heuristic'")
+    options['backend'] = get_backend(
+        options['backend'], options['solver_threads'], options['solver_slots'],
+        {'time': options['time_limit'], 'gap': options['gap_limit'], 'nodes': options['node_limit']},
+        create_portfolio(options['portfolio'], options['portfolio_stats'])
+    )
     
-    # Create temporary directory if not provided
-    if not options['work_dir']:
-        options['work_dir'] = tempfile.mkdtemp(prefix='transit-map-')
-    
-    solver = Solver(network_graph)
-    
-    # Write problem file
-    problem_path = Path(options['work_dir']) / 'problem.lp'
-    with open(problem_path, 'w') as lp_stream:
-        solver.generate_lp(lp_stream)
-    
-    # Run solver
-    run_scip(options['work_dir'], options['verbose'])
-    
-    # Read solution file
-    solution_path = Path(options['work_dir']) / 'solution.sol'
-    with open(solution_path, 'r') as sol_stream:
-        solution = solver.revise_solution(sol_stream)
+    solver = Solver(
+        network_graph, options['settings'], options['backend'], options['jobs'],
+        contract=options['contract_chains'] and options['previous'] is None, stats=options['stats'],
+        presolve=options['presolve']
+    )
+
+    # Return a cached layout of the same network and settings, as given: the
+    # settings derived from the network depend on its node order. Incremental
+    # re-layout keeps the previous coordinates and bypasses the cache
+    use_cache = options['cache_dir'] and options['previous'] is None
+    cache = SolutionCache(options['cache_dir'], options['cache_size']) if use_cache else None
+    if cache is not None:
+        key = solution_key(solver.graph, {**SETTINGS, **(options['settings'] or {})}, options)
+        entry = cache.get(key)
+        if entry is not None:
+            return expand_chains(apply_layout(solver.graph, entry))
+
+    components = []
+    if options['decompose'] and options['previous'] is None:
+        with measure(options['stats'], 'prepare'):
+            graph = prepare_graph(network_graph)
+            components = connected_components(graph)
+    if len(components) > 1:
+        if options['verbose']:
+            sizes = ', '.join(str(len(component['nodes'])) for component in components)
+            print(f"Solving {len(components)} components ({sizes} nodes)", file=sys.stderr)
+        with measure(options['stats'] if resolve_jobs(options['jobs']) > 1 else None, 'components'):
+            layouts = solve_components(components, options)
+        with measure(options['stats'], 'stitch'):
+            solution = stitch_components(graph, components, layouts, solver.settings['min_edge_length'])
+    else:
+        solution = solve_network(solver, network_graph, options)
+
+    if cache is not None:
+        cache.put(key, layout_entry(solution))
     
-    return solution 
+    return solution
+
+def transit_map_anytime(network_graph: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Generate progressively better layouts of a network graph, see `transit_map`.
+
+    Yields the layout of each improved solution as the solver finds it, and
+    the final layout last. The solver runs in a background thread.
+    """
+    layouts: 'queue.Queue[Tuple[str, Any]]' = queue.Queue()
+
+    def run() -> None:
+        try:
+            on_incumbent = lambda layout: layouts.put(('incumbent', layout))
+            layouts.put(('final', transit_map(network_graph, {**(options or {}), 'on_incumbent': on_incumbent})))
+        except BaseException as e:
+            layouts.put(('error', e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        kind, value = layouts.get()
+        if kind == 'error':
+            raise value
+        yield value
+        if kind == 'final':
+            thread.join()
+            return
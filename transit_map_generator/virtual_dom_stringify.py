@@ -1,20 +1,31 @@
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, TextIO, Union
+from io import StringIO
 
 def _stringify_properties(props: Dict[str, str]) -> str:
     """Convert properties dictionary to SVG attribute string."""
     return ' '.join(f'{k}="{v}"' for k, v in props.items())
 
-def _stringify_children(children: List[Dict[str, Any]]) -> str:
-    """Convert child elements to SVG string."""
-    return ''.join(svg_to_string(child) for child in children)
+def write_vdom(vdom: Dict[str, Any], output_stream: TextIO) -> None:
+    """Write a virtual DOM representation as SVG to a stream, without recursion."""
+    # Pending elements, and closing tags as strings
+    stack: List[Union[Dict[str, Any], str]] = [vdom]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            output_stream.write(item)
+            continue
+        tag = item['tagName']
+        props = _stringify_properties(item.get('properties', {}))
+        children = item.get('children', [])
+        if children:
+            output_stream.write(f'<{tag} {props}>')
+            stack.append(f'</{tag}>')
+            stack.extend(reversed(children))
+        else:
+            output_stream.write(f'<{tag} {props}/>')
 
 def svg_to_string(vdom: Dict[str, Any]) -> str:
     """Convert virtual DOM representation to SVG string."""
-    tag = vdom['tagName']
-    props = _stringify_properties(vdom.get('properties', {}))
-    children = _stringify_children(vdom.get('children', []))
-    
-    if children:
-        return f'<{tag} {props}>{children}</{tag}>'
-    else:
-        return f'<{tag} {props}/>' 
+    output = StringIO()
+    write_vdom(vdom, output)
+    return output.getvalue()
@@ -0,0 +1,105 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from array import array
+import math
+
+from .network import Network
+from .model import Model, Solution
+from .spatial import adjacent_pairs
+from .generate_lp import is_consecutive
+
+# direction binaries (a, b, c, d) of each direction id (see `add_directions.ang`),
+# with edge vector (a - b, c - d) times the edge length
+DIRECTION_BINARIES = {
+    0: (0, 1, 0, 0),  # 9 o'clock
+    1: (0, 1, 0, 1),  # 7.5 o'clock
+    2: (0, 0, 0, 1),  # 6 o'clock
+    3: (1, 0, 0, 1),  # 4.5 o'clock
+    4: (1, 0, 0, 0),  # 3 o'clock
+    5: (1, 0, 1, 0),  # 1.5 o'clock
+    6: (0, 0, 1, 0),  # 12 o'clock
+    7: (0, 1, 1, 0),  # 10.5 o'clock
+}
+
+def vector_binaries(dx: float, dy: float) -> Tuple[int, int, int, int]:
+    """Direction binaries (a, b, c, d) of an octilinear edge vector."""
+    return int(dx > 0), int(dx < 0), int(dy > 0), int(dy < 0)
+
+def create_warm_start(network: Network, settings: Dict[str, Any]) -> Callable[[Model, Optional[Dict[str, Any]]], Solution]:
+    """Create a function that builds a (partial) MIP start for the model of the given network."""
+
+    def warm_start(model: Model, layout: Optional[Dict[str, Any]] = None) -> Solution:
+        """Build a MIP start from a previously solved `layout` of the network, or else from the input geometry.
+
+        Unknown values are NaN. From the input geometry, only the direction
+        binaries (the closest direction of each edge) and the angle variables
+        of adjacent edges are set, the solver completes the rest. A layout
+        of the same network yields a complete solution.
+        """
+        values = array('d', [math.nan]) * model.num_columns
+        offsets = model.offsets
+        edges = network.edges
+
+        def assign(family: str, index: int, value: float) -> None:
+            values[offsets[family] + index] = value
+
+        # Direction binaries of each edge, None if unknown
+        binaries: List[Optional[Tuple[int, ...]]] = [None] * len(edges)
+        if layout is None:
+            for edge in edges:
+                binaries[edge.index] = DIRECTION_BINARIES[edge.source_directions[0]]
+        else:
+            # Coordinates of the layout, translated to fix the first node at the offset
+            coordinates: Dict[str, Tuple[float, float]] = {}
+            for node in layout['nodes']:
+                coordinates.setdefault(node['id'], (node['metadata']['x'], node['metadata']['y']))
+            if network.node_ids[0] not in coordinates:
+                raise ValueError("Layout does not contain the first node of the network")
+            x0, y0 = coordinates[network.node_ids[0]]
+            known = [node_id in coordinates for node_id in network.node_ids]
+            for i, node_id in enumerate(network.node_ids):
+                if known[i]:
+                    x, y = coordinates[node_id]
+                    assign('vx', i, x - x0 + settings['offset'])
+                    assign('vy', i, y - y0 + settings['offset'])
+
+            # Edge lengths, directions and their products
+            for edge in edges:
+                if not (known[edge.source] and known[edge.target]):
+                    continue
+                (sx, sy), (tx, ty) = coordinates[network.node_ids[edge.source]], coordinates[network.node_ids[edge.target]]
+                dx, dy = round(tx - sx, 5), round(ty - sy, 5)
+                length = max(abs(dx), abs(dy))
+                binaries[edge.index] = vector_binaries(dx, dy)
+                assign('l', edge.index, length)
+                for name, binary in zip(['a', 'b', 'c', 'd'], binaries[edge.index]):
+                    assign(f"p{name}", edge.index, length * binary)
+
+        for edge in edges:
+            if binaries[edge.index] is not None:
+                for name, binary in zip(['a', 'b', 'c', 'd'], binaries[edge.index]):
+                    assign(name, edge.index, binary)
+
+        # Angle variables of adjacent edge pairs, derived from their directions
+        for suffix, (o, i) in enumerate(adjacent_pairs(network)):
+            outer, inner = binaries[o], binaries[i]
+            if outer is None or inner is None:
+                continue
+            # Compare the directions as seen from the shared node
+            if not is_consecutive(edges[o], edges[i]):
+                inner = (inner[1], inner[0], inner[3], inner[2])
+            q = 0
+            for name, first, second in zip(['a', 'b', 'c', 'd'], outer, inner):
+                both = first + second
+                assign(f"u{name}", suffix, 1 if both == 2 else 0)
+                assign(f"o{name}", suffix, 1 if both == 1 else 0)
+                q += 1 if both == 1 else 0
+            assign('q', suffix, q)
+
+            # Not-equal indicator, undefined for equal directions
+            difference = (3 * (outer[0] - outer[1]) + outer[2] - outer[3]) + (3 * (inner[0] - inner[1]) + inner[2] - inner[3])
+            if difference != 0:
+                assign('h', suffix, 1 if difference > 0 else 0)
+
+        return Solution(model, values)
+
+    return warm_start
@@ -0,0 +1,254 @@
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from array import array
+from pathlib import Path
+import gzip
+import math
+
+from .model import Model, Row, Solution, VTYPES, SENSES
+
+# number of objective terms per LP line, to stay below reader line limits
+TERMS_PER_LINE = 100
+# number of lines collected before writing them to the output stream at once
+BUFFERED_LINES = 4096
+
+LP_SENSES = {code: sense for sense, code in SENSES.items()}
+
+def format_number(value: float) -> str:
+    """Format a number without a trailing '.0' for integral floats."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def format_term(coef: float, name: str, first: bool) -> str:
+    """Format one term of a linear expression in LP syntax."""
+    sign = '-' if coef < 0 else '+'
+    magnitude = abs(coef)
+    term = name if magnitude == 1 else f"{format_number(magnitude)} {name}"
+    if first and sign == '+':
+        return term
+    return f"{sign} {term}"
+
+def format_rows(rows: Iterable[Row], names: List[str], offsets: Dict[str, int]) -> Iterator[str]:
+    """Format constraint rows as (indented) lines of the LP constraint section."""
+    for terms, sense, rhs in rows:
+        expression = ' '.join(
+            format_term(coef, names[offsets[family] + index], k == 0)
+            for k, (coef, family, index) in enumerate(terms)
+        )
+        yield f" {expression} {sense} {format_number(rhs)}"
+
+class LineBuffer:
+    """Collect output lines and write them to a stream in large chunks."""
+
+    def __init__(self, output_stream: TextIO, size: int = BUFFERED_LINES):
+        self.output_stream = output_stream
+        self.size = size
+        self.lines: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.lines.append(text)
+        if len(self.lines) >= self.size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.lines:
+            self.lines.append('')
+            self.output_stream.write('\n'.join(self.lines))
+            self.lines = []
+
+def write_lp(model: Model, output_stream: TextIO, short_names: bool = False,
+             rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None) -> None:
+    """Write the model in CPLEX LP format.
+
+    If `rows` is given, these are streamed to the output instead of the rows
+    stored in the model, so they never have to be held in memory at once.
+    Alternatively, `blocks` are constraint lines already formatted with
+    `format_rows`, each block ending with a newline.
+    """
+    names = model.column_names(short_names)
+    buffer = LineBuffer(output_stream)
+
+    def write(text: str) -> None:
+        buffer.write(text)
+
+    def write_tab(text: str) -> None:
+        buffer.write(' ' + text)
+
+    # 1. Objective function
+    write('Minimize')
+    terms = [(coef, names[j]) for j, coef in enumerate(model.objective) if coef != 0]
+    if not terms and names:
+        write_tab(f"0 {names[0]}")
+    for start in range(0, len(terms), TERMS_PER_LINE):
+        write_tab(' '.join(
+            format_term(coef, name, start + k == 0)
+            for k, (coef, name) in enumerate(terms[start:start + TERMS_PER_LINE])
+        ))
+
+    # 2. Constraints
+    write('Subject To')
+    if blocks is not None:
+        buffer.flush()
+        for block in blocks:
+            output_stream.write(block)
+    elif rows is not None:
+        for line in format_rows(rows, names, model.offsets):
+            write(line)
+    else:
+        row, col, coef = model.row, model.col, model.coef
+        k = 0
+        for r in range(model.num_rows):
+            parts = []
+            while k < len(row) and row[k] == r:
+                parts.append(format_term(coef[k], names[col[k]], not parts))
+                k += 1
+            write_tab(f"{' '.join(parts)} {LP_SENSES[model.sense[r]]} {format_number(model.rhs[r])}")
+
+    # 3. Bounds
+    write('Bounds')
+    binary = VTYPES['binary']
+    for j, name in enumerate(names):
+        lower, upper = model.lower[j], model.upper[j]
+        if model.vtype[j] == binary and lower == 0 and upper == 1:
+            continue
+        if lower == upper:
+            write_tab(f"{name} = {format_number(lower)}")
+        elif math.isinf(upper):
+            write_tab(f"{format_number(lower) if not math.isinf(lower) else '-inf'} <= {name}")
+        else:
+            write_tab(
+                f"{format_number(lower) if not math.isinf(lower) else '-inf'} <= {name} <= "
+                f"{format_number(upper)}"
+            )
+
+    # 4. Integer variables
+    write('General')
+    integer = VTYPES['integer']
+    for j, name in enumerate(names):
+        if model.vtype[j] == integer:
+            write_tab(name)
+
+    # 5. Binary variables
+    write('Binary')
+    for j, name in enumerate(names):
+        if model.vtype[j] == binary:
+            write_tab(name)
+
+    # 6. End
+    write('End')
+    buffer.flush()
+
+def write_mps(model: Model, output_stream: TextIO, short_names: bool = False,
+              rows: Optional[Iterable[Row]] = None) -> None:
+    """Write the model in free MPS format.
+
+    MPS lists the matrix column by column, so `rows`, if given, are first
+    collected into the model.
+    """
+    if rows is not None:
+        model.add_rows(rows)
+    names = model.column_names(short_names)
+    buffer = LineBuffer(output_stream)
+
+    def write(text: str) -> None:
+        buffer.write(text)
+
+    write('NAME transit-map')
+
+    # Rows
+    write('ROWS')
+    write(' N obj')
+    for r in range(model.num_rows):
+        write(f" {chr(model.sense[r])} c{r}")
+
+    # Columns, by transposing the COO entries with a counting sort
+    starts = array('l', bytes(array('l').itemsize * (model.num_columns + 1)))
+    for j in model.col:
+        starts[j + 1] += 1
+    for j in range(model.num_columns):
+        starts[j + 1] += starts[j]
+    fill = array('l', starts)
+    entries = array('l', bytes(array('l').itemsize * len(model.col)))
+    for k, j in enumerate(model.col):
+        entries[fill[j]] = k
+        fill[j] += 1
+
+    write('COLUMNS')
+    integer_marker = False
+    continuous = VTYPES['continuous']
+    for j, name in enumerate(names):
+        is_integer = model.vtype[j] != continuous
+        if is_integer != integer_marker:
+            write(f" MARKER 'MARKER' '{'INTORG' if is_integer else 'INTEND'}'")
+            integer_marker = is_integer
+        parts: List[str] = []
+        if model.objective[j] != 0 or starts[j] == starts[j + 1]:
+            parts.append(f"obj {format_number(model.objective[j])}")
+        for k in entries[starts[j]:starts[j + 1]]:
+            parts.append(f"c{model.row[k]} {format_number(model.coef[k])}")
+        for part in parts:
+            write(f" {name} {part}")
+    if integer_marker:
+        write(" MARKER 'MARKER' 'INTEND'")
+
+    # Right hand sides
+    write('RHS')
+    for r in range(model.num_rows):
+        if model.rhs[r] != 0:
+            write(f" rhs c{r} {format_number(model.rhs[r])}")
+
+    # Bounds
+    write('BOUNDS')
+    binary = VTYPES['binary']
+    for j, name in enumerate(names):
+        lower, upper = model.lower[j], model.upper[j]
+        if model.vtype[j] == binary and lower == 0 and upper == 1:
+            write(f" BV bnd {name}")
+        elif lower == upper:
+            write(f" FX bnd {name} {format_number(lower)}")
+        else:
+            if math.isinf(lower):
+                write(f" MI bnd {name}")
+            elif lower != 0 or model.vtype[j] != continuous:
+                write(f" LO bnd {name} {format_number(lower)}")
+            if not math.isinf(upper):
+                write(f" UP bnd {name} {format_number(upper)}")
+            elif model.vtype[j] != continuous:
+                write(f" PL bnd {name}")
+
+    write('ENDATA')
+    buffer.flush()
+
+def write_sol(solution: Solution, output_stream: TextIO, short_names: bool = False) -> None:
+    """Write a (partial) solution in SCIP's solution format, with NaN values written as unknown."""
+    buffer = LineBuffer(output_stream)
+    for name, value in zip(solution.model.column_names(short_names), solution.values):
+        buffer.write(f"{name} {'unknown' if math.isnan(value) else format_number(value)}")
+    buffer.flush()
+
+WRITERS = {'lp': write_lp, 'mps': write_mps}
+
+def model_format(path: str) -> str:
+    """Model file format from a path like `problem.lp`, `problem.mps` or `problem.mps.gz`."""
+    suffixes = Path(path).suffixes
+    if suffixes and suffixes[-1] == '.gz':
+        suffixes = suffixes[:-1]
+    extension = suffixes[-1][1:] if suffixes else 'lp'
+    if extension not in WRITERS:
+        raise ValueError(f"Unknown model format '{extension}', use one of: {', '.join(WRITERS)}")
+    return extension
+
+def write_model(model: Model, path: str, short_names: bool = False,
+                rows: Optional[Iterable[Row]] = None, blocks: Optional[Iterable[str]] = None) -> None:
+    """Write the model to a file, choosing the format by extension and gzip-compressing `.gz` files.
+
+    Formatted constraint `blocks` are only supported by the LP format.
+    """
+    writer = WRITERS[model_format(path)]
+    if blocks is not None and writer is not write_lp:
+        raise ValueError("Formatted constraint blocks can only be written to LP files")
+    with (gzip.open(path, 'wt') if str(path).endswith('.gz') else open(path, 'w')) as stream:
+        if blocks is not None:
+            write_lp(model, stream, short_names, blocks=blocks)
+        else:
+            writer(model, stream, short_names, rows)